@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+""" Example program that uses the Nrf905CaptureAnalyzer class to print a report on a capture file. """
+
+import sys
+
+from nrf905.nrf905_capture import Nrf905CaptureAnalyzer
+
+
+def main():
+    """ Prints the packet error rate per address, latency and inter-arrival
+        percentiles and the throughput of the capture file given on the
+        command line.
+    """
+    if len(sys.argv) < 2:
+        print("Usage: nrf905-analyze.py capture_file [window_s]")
+        return
+    window_s = 1.0
+    if len(sys.argv) > 2:
+        window_s = float(sys.argv[2])
+    analyzer = Nrf905CaptureAnalyzer(sys.argv[1])
+    print("Records:", analyzer.get_record_count())
+    print()
+    print("Address     OK        Errors    Lost      PER")
+    for (address, (ok, errors, lost, rate)) in sorted(analyzer.packet_error_rate().items()):
+        print("%08x    %-9d %-9d %-9d %.4f" % (address, ok, errors, lost, rate))
+    print()
+    print("DR to delivery latency (us):", analyzer.latency_percentiles())
+    print("Inter-arrival time (us):", analyzer.inter_arrival_percentiles())
+    (start_us, packets, byte_counts) = analyzer.throughput(window_s)
+    if len(packets):
+        print("Throughput per %gs window: mean %.1f packets, %.1f bytes, peak %d packets"
+              % (window_s, packets.mean(), byte_counts.mean(), packets.max()))
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+""" Gateway program that owns the nRF905 device and shares it with other processes. """
+
+from nrf905.nrf905_gateway import Nrf905Gateway
+from nrf905.nrf905_hardware import Nrf905Hardware
+
+# Shared memory name for Nrf905GatewayReader and socket for Nrf905GatewayClient.
+SHARED_MEMORY_NAME = "nrf905"
+SOCKET_PATH = "/tmp/nrf905.sock"
+# Bodge: should come from the command line arg.
+RECEIVE_ADDRESS = 0xe7e7e7e7
+
+
+def main():
+    """ Receive continuously, publishing every packet to the shared memory
+        ring.  Packets sent by clients are transmitted between receptions.
+        Loop until a key is pressed.
+    """
+
+    def transmit(data):
+        hardware.transmit(data).result()
+        hardware.receive(RECEIVE_ADDRESS).result()
+
+    gateway = Nrf905Gateway(SHARED_MEMORY_NAME, SOCKET_PATH, transmit)
+    hardware = Nrf905Hardware(executor=gateway)
+    hardware.open()
+    hardware.receive(RECEIVE_ADDRESS)
+    gateway.start()
+    input("Press enter to quit...")
+    # Stop taking requests before the hardware goes, then stop the I/O
+    # thread before the ring it publishes into is freed.
+    gateway.stop()
+    hardware.term()
+    gateway.close()
+
+
+if __name__ == "__main__":
+
+    main()
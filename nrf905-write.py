@@ -2,6 +2,7 @@
 """ Example program that uses the Nrf905 class to print out whatever is being received by the nRF905 device. """
 
 from nrf905.nrf905 import Nrf905
+from nrf905.nrf905_frame import Nrf905Frame
 
 
 def main():
@@ -12,7 +13,8 @@ def main():
     receiver = Nrf905()
     receiver.open(434)
     # Bodge: should come from the command line arg.
-    data_bytes = [20] * 32
+    frame = Nrf905Frame()
+    data_bytes = list(frame.pack(1, 0, 0, bytes([20] * frame.get_data_max())))
     receiver.write(data_bytes)
     receiver.close()
 
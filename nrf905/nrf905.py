@@ -1,3 +1,6 @@
+from nrf905.nrf905_spi import Nrf905Spi
+
+
 class Nrf905:
     """ The interface to control a nRF905 device.  This class does all the
     parameter checking and state checking.  The actual byte bashing is done in
@@ -69,12 +72,10 @@ class Nrf905:
         if self.__is_open:
             raise StateError("Frequency NOT set. Device in use.")
         else:
-            # TODO Verify frequency 
-            if mode == 0 or mode == 8 or mode == 16:
-                self.__crc_mode = mode
-                print("CRC mode set", mode)
-            else:
-                raise ValueError("CRC mode must be one of 0, 8, 16")
+            # Raises ValueError if the nRF905 cannot be tuned to frequency.
+            Nrf905Spi.frequency_to_channel(frequency)
+            self.__frequency = frequency
+            print("Frequency set", frequency)
 
     def open(self, frequency, callback=None):
         # print("open")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+import os
+import struct
+
+import numpy
+
+
+class Nrf905Capture:
+    """ The capture file format.
+
+    A capture file is a sequence of fixed size, little endian records with
+    no file header, so it can be appended to and memory mapped directly:
+        Field           Type    Notes
+        time_us         int64   Wall clock time of the DR edge, microseconds
+        delivered_us    int64   Wall clock time the packet was delivered
+        address         uint32  Source address (RX) or destination (TX)
+        sequence        uint16  Sequence number from the packet header
+        direction       uint8   RECEIVE or TRANSMIT
+        status          uint8   OK, ERROR (e.g. AM without DR) or DROPPED
+        length          uint8   Payload length in bytes
+        reserved        7 bytes Set to 0
+    Records are written in time order.
+    """
+
+    RECEIVE = 0
+    TRANSMIT = 1
+
+    OK = 0
+    ERROR = 1
+    DROPPED = 2
+
+    RECORD = struct.Struct("<qqIHBBB7x")
+    DTYPE = numpy.dtype([
+        ("time_us", "<i8"),
+        ("delivered_us", "<i8"),
+        ("address", "<u4"),
+        ("sequence", "<u2"),
+        ("direction", "u1"),
+        ("status", "u1"),
+        ("length", "u1"),
+        ("reserved", "u1", (7,))
+    ])
+
+
+class Nrf905CaptureWriter:
+    """ Appends records to a capture file. """
+
+    def __init__(self, path):
+        self.__file = open(path, "ab")
+
+    def close(self):
+        self.__file.close()
+
+    def write(self, time_us, delivered_us, address, sequence,
+              direction=Nrf905Capture.RECEIVE, status=Nrf905Capture.OK, length=0):
+        self.__file.write(Nrf905Capture.RECORD.pack(
+            time_us, delivered_us, address, sequence & 0xffff, direction, status, length))
+
+    def flush(self):
+        self.__file.flush()
+
+
+class Nrf905CaptureAnalyzer:
+    """ Analyses capture files of any size.
+
+    The file is memory mapped as a NumPy structured array and processed in
+    chunks of CHUNK_RECORDS records, so memory use does not grow with the
+    size of the capture and no Python object is made per record.
+
+    Latency and inter-arrival times are collected in histograms with
+    logarithmic bins from 1us to 1000s, so percentiles are accurate to the
+    bin width (about 2%).
+    """
+
+    CHUNK_RECORDS = 4 * 1024 * 1024
+    # Bin edges in microseconds, 100 bins per decade.
+    HISTOGRAM_EDGES_US = numpy.logspace(0, 9, 901)
+
+    def __init__(self, path):
+        if os.path.getsize(path) == 0:
+            # An empty file cannot be memory mapped.
+            self.__records = numpy.zeros(0, dtype=Nrf905Capture.DTYPE)
+        else:
+            self.__records = numpy.memmap(path, dtype=Nrf905Capture.DTYPE, mode="r")
+
+    def get_record_count(self):
+        return len(self.__records)
+
+    def get_records(self):
+        """ Returns the memory mapped structured array of all records. """
+        return self.__records
+
+    def packet_error_rate(self):
+        """ Returns a dictionary of address: (ok, errors, lost, rate) for
+        received packets.  Lost packets are found from gaps in the sequence
+        numbers of the intact packets from each address, less the packets
+        recorded as errors.
+        """
+        totals = dict()
+        last_sequence = dict()
+        for chunk in self.__chunks():
+            chunk = chunk[chunk["direction"] == Nrf905Capture.RECEIVE]
+            if len(chunk) == 0:
+                continue
+            (addresses, inverse) = numpy.unique(chunk["address"], return_inverse=True)
+            status = chunk["status"]
+            ok = numpy.bincount(inverse, weights=(status == Nrf905Capture.OK), minlength=len(addresses))
+            errors = numpy.bincount(inverse, weights=(status == Nrf905Capture.ERROR), minlength=len(addresses))
+            # Sequence gaps, only for packets that arrived intact.
+            intact = status == Nrf905Capture.OK
+            order = numpy.argsort(inverse[intact], kind="stable")
+            groups = inverse[intact][order]
+            sequences = chunk["sequence"][intact][order].astype(numpy.int64)
+            lost = numpy.zeros(len(addresses))
+            if len(groups):
+                same = groups[1:] == groups[:-1]
+                gaps = self.__sequence_gaps(numpy.diff(sequences))
+                lost = numpy.bincount(groups[1:][same], weights=gaps[same], minlength=len(addresses))
+                # Gaps across the chunk boundary.
+                first = numpy.flatnonzero(numpy.concatenate(([True], ~same)))
+                last = numpy.concatenate((first[1:] - 1, [len(groups) - 1]))
+                for (start, end) in zip(first, last):
+                    address = int(addresses[groups[start]])
+                    previous = last_sequence.get(address)
+                    if previous is not None:
+                        lost[groups[start]] += self.__sequence_gaps(sequences[start] - previous)
+                    last_sequence[address] = int(sequences[end])
+            for index in range(len(addresses)):
+                total = totals.setdefault(int(addresses[index]), [0, 0, 0])
+                total[0] += int(ok[index])
+                total[1] += int(errors[index])
+                total[2] += int(lost[index])
+        result = dict()
+        for (address, (ok, errors, missing)) in totals.items():
+            lost = max(missing - errors, 0)
+            rate = 0.0
+            if ok + errors + lost:
+                rate = (errors + lost) / (ok + errors + lost)
+            result[address] = (ok, errors, lost, rate)
+        return result
+
+    def latency_histogram(self):
+        """ Returns the histogram of DR edge to delivery latency for
+        received packets, as counts per HISTOGRAM_EDGES_US bin.
+        """
+        counts = numpy.zeros(len(self.HISTOGRAM_EDGES_US) - 1, dtype=numpy.int64)
+        for chunk in self.__chunks():
+            chunk = chunk[(chunk["direction"] == Nrf905Capture.RECEIVE) &
+                          (chunk["status"] == Nrf905Capture.OK)]
+            latency = chunk["delivered_us"] - chunk["time_us"]
+            counts += numpy.histogram(latency, self.HISTOGRAM_EDGES_US)[0]
+        return counts
+
+    def inter_arrival_histogram(self, address=None):
+        """ Returns the histogram of time between received packets, for all
+        addresses or only the given one.
+        """
+        counts = numpy.zeros(len(self.HISTOGRAM_EDGES_US) - 1, dtype=numpy.int64)
+        previous = None
+        for chunk in self.__chunks():
+            mask = chunk["direction"] == Nrf905Capture.RECEIVE
+            if address is not None:
+                mask &= chunk["address"] == address
+            times = chunk["time_us"][mask]
+            if len(times) == 0:
+                continue
+            if previous is not None:
+                times = numpy.concatenate(([previous], times))
+            counts += numpy.histogram(numpy.diff(times), self.HISTOGRAM_EDGES_US)[0]
+            previous = times[-1]
+        return counts
+
+    def latency_percentiles(self, percentiles=(50, 90, 99, 99.9)):
+        """ Returns a dictionary of percentile: DR to delivery latency in
+        microseconds.
+        """
+        return self.percentiles(self.latency_histogram(), percentiles)
+
+    def inter_arrival_percentiles(self, percentiles=(50, 90, 99, 99.9), address=None):
+        """ Returns a dictionary of percentile: inter-arrival time in
+        microseconds.
+        """
+        return self.percentiles(self.inter_arrival_histogram(address), percentiles)
+
+    def percentiles(self, counts, percentiles):
+        """ Returns a dictionary of percentile: upper bin edge from a
+        histogram made with HISTOGRAM_EDGES_US.
+        """
+        cumulative = numpy.cumsum(counts)
+        result = dict()
+        for percentile in percentiles:
+            value = None
+            if len(cumulative) and cumulative[-1] > 0:
+                index = numpy.searchsorted(cumulative, cumulative[-1] * percentile / 100)
+                value = float(self.HISTOGRAM_EDGES_US[index + 1])
+            result[percentile] = value
+        return result
+
+    def throughput(self, window_s=1.0, direction=Nrf905Capture.RECEIVE):
+        """ Returns a tuple of (start_us, packets, bytes) where packets and
+        bytes are arrays of the totals of delivered packets in each window.
+        """
+        window_us = int(window_s * 1000000)
+        if window_us <= 0:
+            raise ValueError("window_s must be positive")
+        if len(self.__records) == 0:
+            return (0, numpy.zeros(0, numpy.int64), numpy.zeros(0, numpy.int64))
+        start_us = int(self.__records["time_us"][0])
+        count = (int(self.__records["time_us"][-1]) - start_us) // window_us + 1
+        packets = numpy.zeros(count, dtype=numpy.int64)
+        byte_counts = numpy.zeros(count, dtype=numpy.int64)
+        for chunk in self.__chunks():
+            chunk = chunk[(chunk["direction"] == direction) &
+                          (chunk["status"] == Nrf905Capture.OK)]
+            windows = (chunk["time_us"] - start_us) // window_us
+            packets += numpy.bincount(windows, minlength=count)[:count]
+            byte_counts += numpy.bincount(windows, weights=chunk["length"], minlength=count)[:count].astype(numpy.int64)
+        return (start_us, packets, byte_counts)
+
+    def collision_estimate(self, airtime_us):
+        """ Returns a tuple of (collisions, fraction of received packets).
+        Two packets whose DR edges are less than airtime_us apart must have
+        overlapped on air, so at least one of them was collided with.
+        """
+        collisions = 0
+        total = 0
+        previous = None
+        for chunk in self.__chunks():
+            times = chunk["time_us"][chunk["direction"] == Nrf905Capture.RECEIVE]
+            if len(times) == 0:
+                continue
+            total += len(times)
+            if previous is not None:
+                times = numpy.concatenate(([previous], times))
+            collisions += int(numpy.count_nonzero(numpy.diff(times) < airtime_us))
+            previous = times[-1]
+        fraction = 0.0
+        if total:
+            fraction = collisions / total
+        return (collisions, fraction)
+
+    def __sequence_gaps(self, steps):
+        """ Returns the number of packets missing for each step between
+        sequence numbers.  Repeated sequence numbers are not gaps.
+        """
+        steps = steps % 65536
+        return numpy.where(steps == 0, 0, steps - 1)
+
+    def __chunks(self):
+        for start in range(0, len(self.__records), self.CHUNK_RECORDS):
+            yield self.__records[start:start + self.CHUNK_RECORDS]
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+import collections
+import struct
+import zlib
+
+
+class Nrf905Codec:
+    """ Optional payload codec so that more samples fit in a 32 byte frame.
+
+    Three codecs can be used, alone or together:
+        VARINT      Sample values are zigzag encoded and packed 7 bits per
+                    byte, so small values take one byte instead of four.
+        DELTA       Each sample is sent as the difference from the last
+                    sample the receiver acknowledged.
+        DICTIONARY  The frame body is deflated using a dictionary shared by
+                    both ends.  Only used when it makes the frame smaller.
+
+    Which codecs are used is negotiated per address with negotiate().  Until
+    then, no codec is used for an address.
+
+    A sample frame is laid out as:
+        Byte    Field
+        0       Codecs used for this frame
+        1       Stream number
+        2       Sequence number, 0 to 255
+        3       Sequence number of the reference sample (DELTA only)
+        4-      Values, deltas or deflated body
+
+    The sender keeps the last HISTORY samples sent on each stream and
+    acknowledge() makes one of them the reference for the following deltas.
+    The receiver keeps the samples decoded on each stream that are no more
+    than HISTORY sequence numbers old, so it can decode against whichever
+    reference the sender used.  Once the reference is older than that, the
+    sender sends samples in full until the next acknowledge().  Keeping
+    within HISTORY also stops the 8 bit sequence number wrapping round onto
+    an old sample.
+    """
+
+    NONE = 0x00
+    VARINT = 0x01
+    DELTA = 0x02
+    DICTIONARY = 0x04
+    ALL = VARINT | DELTA | DICTIONARY
+
+    HISTORY = 8
+    PAYLOAD_WIDTH_MAX = 32
+
+    HEADER = struct.Struct("<BBB")
+    REFERENCE = struct.Struct("<B")
+
+    def __init__(self, dictionary=b"", supported=ALL,
+                 payload_width=PAYLOAD_WIDTH_MAX):
+        if supported & ~self.ALL:
+            raise ValueError("Unknown codec")
+        if payload_width < 1 or payload_width > self.PAYLOAD_WIDTH_MAX:
+            raise ValueError("payload_width must be in the range 1 to 32")
+        if not dictionary:
+            supported &= ~self.DICTIONARY
+        self.__dictionary = bytes(dictionary)
+        self.__supported = supported
+        self.__payload_width = payload_width
+        # Key is address, value is the agreed codecs.
+        self.__agreed = dict()
+        # Key is (address, stream), value is the stream state.
+        self.__transmit_streams = dict()
+        self.__receive_streams = dict()
+
+    def get_supported(self):
+        """ Returns the codecs this end supports.  Send this to the other
+        end so it can call negotiate().
+        """
+        return self.__supported
+
+    def negotiate(self, address, remote_supported):
+        """ Agrees the codecs to use with address.  Returns the codecs that
+        both ends support.
+        """
+        agreed = self.__supported & remote_supported
+        self.__agreed[address] = agreed
+        return agreed
+
+    def get_codecs(self, address):
+        """ Returns the codecs agreed with address. """
+        return self.__agreed.get(address, self.NONE)
+
+    def encode_sample(self, address, stream, sample):
+        """ Returns the frame for a sample, a list of integers, sent on the
+        given stream to address.
+        Raises ValueError if the frame does not fit in the payload width.
+        """
+        codecs = self.get_codecs(address)
+        state = self.__transmit_streams.get((address, stream))
+        if state is None:
+            state = Nrf905CodecStream()
+            self.__transmit_streams[(address, stream)] = state
+        sequence = state.sequence
+        used = codecs & self.VARINT
+        reference = b""
+        values = sample
+        if codecs & self.DELTA and state.reference is not None:
+            (reference_sequence, reference_sample) = state.reference
+            if (sequence - reference_sequence) & 0xff > self.HISTORY:
+                # The receiver no longer holds it.  Wait for a newer one.
+                state.reference = None
+            elif len(reference_sample) == len(sample):
+                used |= self.DELTA
+                reference = self.REFERENCE.pack(reference_sequence)
+                values = [value - base for (value, base) in zip(sample, reference_sample)]
+        body = self.__pack_values(values, used)
+        (body, used) = self.__compress(body, used | (codecs & self.DICTIONARY))
+        frame = self.HEADER.pack(used, stream, sequence) + reference + body
+        if len(frame) > self.__payload_width:
+            raise ValueError("Encoded sample does not fit in the payload")
+        # Only a sample that is sent uses up a sequence number and can be a
+        # reference.
+        state.sequence = (sequence + 1) & 0xff
+        state.remember(sequence, sample, self.HISTORY)
+        return frame
+
+    def acknowledge(self, address, stream, sequence):
+        """ Makes the sample sent with sequence the reference for the
+        following deltas.  Returns False if the sample is no longer held.
+        """
+        state = self.__transmit_streams.get((address, stream))
+        if state is None:
+            return False
+        sample = state.history.get(sequence)
+        if sample is None:
+            return False
+        state.reference = (sequence, sample)
+        return True
+
+    def decode_sample(self, address, data):
+        """ Returns a tuple of (stream, sequence, sample) from a frame
+        received from address.
+        Raises ValueError if the frame cannot be decoded.
+        """
+        if len(data) < self.HEADER.size:
+            raise ValueError("Frame too short")
+        (used, stream, sequence) = self.HEADER.unpack_from(data)
+        offset = self.HEADER.size
+        reference_sample = None
+        state = self.__receive_streams.get((address, stream))
+        if state is None:
+            state = Nrf905CodecStream()
+            self.__receive_streams[(address, stream)] = state
+        state.forget(sequence, self.HISTORY)
+        if used & self.DELTA:
+            (reference_sequence,) = self.REFERENCE.unpack_from(data, offset)
+            offset += self.REFERENCE.size
+            reference_sample = state.history.get(reference_sequence)
+            if reference_sample is None:
+                raise ValueError("Reference sample not held")
+        body = self.__decompress(bytes(data[offset:]), used)
+        values = self.__unpack_values(body, used)
+        if reference_sample is not None:
+            if len(reference_sample) != len(values):
+                raise ValueError("Reference sample length mismatch")
+            values = [base + delta for (base, delta) in zip(reference_sample, values)]
+        state.remember(sequence, values, self.HISTORY)
+        return (stream, sequence, values)
+
+    def encode_bytes(self, address, data):
+        """ Returns a frame holding data, compressed with the shared
+        dictionary if agreed with address and smaller.
+        """
+        (body, used) = self.__compress(bytes(data), self.get_codecs(address) & self.DICTIONARY)
+        frame = bytes([used]) + body
+        if len(frame) > self.__payload_width:
+            raise ValueError("Encoded data does not fit in the payload")
+        return frame
+
+    def decode_bytes(self, address, data):
+        """ Returns the data from a frame made by encode_bytes(). """
+        if len(data) < 1:
+            raise ValueError("Frame too short")
+        return self.__decompress(bytes(data[1:]), data[0])
+
+    def __compress(self, body, used):
+        """ Deflates body if DICTIONARY is in used and it saves space.
+        Returns the body and the codecs actually used.
+        """
+        if used & self.DICTIONARY:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9,
+                                          zlib.Z_DEFAULT_STRATEGY, self.__dictionary)
+            compressed = compressor.compress(body) + compressor.flush()
+            if len(compressed) < len(body):
+                return (compressed, used)
+        return (body, used & ~self.DICTIONARY)
+
+    def __decompress(self, body, used):
+        if used & self.DICTIONARY:
+            if not self.__dictionary:
+                raise ValueError("No shared dictionary")
+            try:
+                decompressor = zlib.decompressobj(-15, self.__dictionary)
+                body = decompressor.decompress(body) + decompressor.flush()
+            except zlib.error as error:
+                raise ValueError("Corrupt compressed body") from error
+        return body
+
+    def __pack_values(self, values, used):
+        if used & self.VARINT:
+            return encode_varints(values)
+        return struct.pack("<%di" % len(values), *values)
+
+    def __unpack_values(self, body, used):
+        if used & self.VARINT:
+            return decode_varints(body)
+        if len(body) % 4:
+            raise ValueError("Body is not a whole number of values")
+        return list(struct.unpack("<%di" % (len(body) // 4), body))
+
+
+class Nrf905CodecStream:
+    """ The state of one stream at one end of a link. """
+
+    __slots__ = ("sequence", "history", "reference")
+
+    def __init__(self):
+        self.sequence = 0
+        # Key is sequence number, value is the sample.
+        self.history = collections.OrderedDict()
+        # Tuple of (sequence, sample) for the acknowledged sample.
+        self.reference = None
+
+    def remember(self, sequence, sample, limit):
+        self.history[sequence] = list(sample)
+        self.history.move_to_end(sequence)
+        while len(self.history) > limit:
+            self.history.popitem(last=False)
+
+    def forget(self, sequence, limit):
+        """ Forgets the samples more than limit sequence numbers before
+        sequence, and any left from the last time round.
+        """
+        for held in list(self.history):
+            age = (sequence - held) & 0xff
+            if age == 0 or age > limit:
+                del self.history[held]
+
+
+def encode_varints(values):
+    """ Returns bytes holding the zigzag encoded values, 7 bits per byte,
+    least significant group first.
+    """
+    result = bytearray()
+    for value in values:
+        value = (value << 1) ^ (value >> 63)
+        while value > 0x7f:
+            result.append((value & 0x7f) | 0x80)
+            value >>= 7
+        result.append(value)
+    return bytes(result)
+
+
+def decode_varints(data):
+    """ Returns the list of values from bytes made by encode_varints(). """
+    result = []
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            result.append((value >> 1) ^ -(value & 1))
+            value = 0
+            shift = 0
+    if shift:
+        raise ValueError("Truncated varint")
+    return result
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import collections
+
+from nrf905.nrf905_frame import Nrf905Frame
+
+
+class Nrf905Dedup:
+    """ Drops repeated frames before they reach the handler.
+
+    With AUTO_RETRAN set, or when the sender retries, the same frame arrives
+    several times.  Frames are identified by (source, sequence), given by
+    key_function(data), by default from the Nrf905Frame header.  Only the
+    first copy of each frame is passed on.
+
+    For each source the highest sequence number seen is kept with a bitmap
+    of which of the window_size sequence numbers before it have been seen,
+    so each check is a shift and a mask.  Sequence numbers wrap at
+    sequence_bits.  A frame more than window_size behind the highest is
+    stale, e.g. a late retransmission by a relay, and is dropped and
+    counted.  Only restart_frames stale frames in a row, each ahead of the
+    one before, are taken as the source restarting its count; the last of
+    them resets the source's window and is passed on.
+
+    Sources are kept in least recently used order and the oldest is
+    forgotten when there are more than sources_max, so memory use is bounded
+    at about sources_max * window_size bits.
+
+    An instance can be passed to Nrf905.open() as the callback, or given as
+    the handler of an Nrf905Executor, with the Nrf905Dispatcher or any other
+    callable as its handler.  It is not thread safe; use it from one thread
+    or one executor lane.
+    """
+
+    def __init__(self, handler, key_function=None, window_size=64, sources_max=1024,
+                 sequence_bits=16, restart_frames=3):
+        if window_size < 1:
+            raise ValueError("window_size must be 1 or more")
+        if sources_max < 1:
+            raise ValueError("sources_max must be 1 or more")
+        if sequence_bits < 1:
+            raise ValueError("sequence_bits must be 1 or more")
+        if restart_frames < 1:
+            raise ValueError("restart_frames must be 1 or more")
+        self.__handler = handler
+        if key_function is None:
+            key_function = Nrf905Frame().key
+        self.__key_function = key_function
+        self.__window_size = window_size
+        self.__window_mask = (1 << window_size) - 1
+        self.__sources_max = sources_max
+        self.__sequence_mask = (1 << sequence_bits) - 1
+        self.__sequence_half = 1 << (sequence_bits - 1)
+        self.__restart_frames = restart_frames
+        # Key is the source, value is [highest sequence, bitmap, last stale
+        # sequence, stale frames in a row].  Bit n of the bitmap is set if
+        # sequence highest - n has been seen.
+        self.__sources = collections.OrderedDict()
+        self.__passed_count = 0
+        self.__duplicate_count = 0
+        self.__restart_count = 0
+        self.__evicted_count = 0
+        self.__stale_count = 0
+
+    def __call__(self, data):
+        """ Passes data to the handler unless it is a duplicate.
+        Returns True if the handler was called.
+        """
+        (source, sequence) = self.__key_function(data)
+        if self.is_duplicate(source, sequence):
+            return False
+        self.__handler(data)
+        return True
+
+    def is_duplicate(self, source, sequence):
+        """ Records (source, sequence) as seen.
+        Returns True if it had already been seen.
+        """
+        sequence &= self.__sequence_mask
+        state = self.__sources.get(source)
+        if state is None:
+            self.__sources[source] = [sequence, 1, 0, 0]
+            if len(self.__sources) > self.__sources_max:
+                self.__sources.popitem(last=False)
+                self.__evicted_count += 1
+            self.__passed_count += 1
+            return False
+        self.__sources.move_to_end(source)
+        ahead = (sequence - state[0]) & self.__sequence_mask
+        behind = self.__sequence_mask + 1 - ahead
+        if ahead >= self.__sequence_half and behind >= self.__window_size:
+            return self.__stale(state, sequence)
+        state[3] = 0
+        if ahead == 0:
+            self.__duplicate_count += 1
+            return True
+        if ahead < self.__sequence_half:
+            # Newer than any seen so far, slide the window forward.
+            state[0] = sequence
+            state[1] = ((state[1] << ahead) | 1) & self.__window_mask
+            self.__passed_count += 1
+            return False
+        bit = 1 << behind
+        if state[1] & bit:
+            self.__duplicate_count += 1
+            return True
+        state[1] |= bit
+        self.__passed_count += 1
+        return False
+
+    def __stale(self, state, sequence):
+        """ Handles a frame too old to be in the window.  Returns True if it
+        is dropped.
+        """
+        stale_ahead = (sequence - state[2]) & self.__sequence_mask
+        if state[3] > 0 and 0 < stale_ahead < self.__window_size:
+            state[3] += 1
+        else:
+            state[3] = 1
+        state[2] = sequence
+        if state[3] < self.__restart_frames:
+            self.__stale_count += 1
+            return True
+        # The source has restarted its count.
+        state[0] = sequence
+        state[1] = 1
+        state[3] = 0
+        self.__restart_count += 1
+        self.__passed_count += 1
+        return False
+
+    def forget(self, source):
+        """ Removes the state for source, e.g. when it is known to have
+        restarted.  Returns True if the source was found.
+        """
+        return self.__sources.pop(source, None) is not None
+
+    def get_source_count(self):
+        return len(self.__sources)
+
+    def get_stats(self):
+        """ Returns a tuple of (frames passed, duplicates suppressed, source
+        restarts, sources forgotten to stay within sources_max, stale frames
+        dropped).
+        """
+        return (self.__passed_count, self.__duplicate_count, self.__restart_count,
+                self.__evicted_count, self.__stale_count)
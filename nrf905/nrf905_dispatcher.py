@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import struct
+
+
+class Nrf905Dispatcher:
+    """ Routes received packets to handlers by source address and message
+    type.
+
+    Each packet starts with a compact header:
+        Byte    Field
+        0       Message type, 0 to 255
+        1-4     Source address, LSB first (same as the nRF905 registers)
+    The rest of the packet is the payload.
+
+    Handlers are registered for a (source, message type) pair.  Either value
+    can be None to act as a wildcard.  When a packet arrives, the most
+    specific route is used:
+        1. (source, message type)
+        2. (source, None)
+        3. (None, message type)
+        4. (None, None)
+
+    The fallbacks are resolved once per (source, message type) pair and the
+    result is stored in a flat dictionary so routing a packet costs a single
+    dictionary lookup.  The stored results are discarded whenever a route is
+    added or removed.
+
+    Handlers are called with (source, message_type, payload) where payload
+    is a memoryview of the packet from byte 5, so no data is copied.  Only
+    the 5 byte header above is removed, whatever the frame format:
+        Compact packets     payload is the data that followed the header.
+        Nrf905Frame frames  payload starts with the rest of the frame
+                            header: version, flags, sequence (2 bytes, LSB
+                            first) and length, then the data padded to the
+                            payload width.  Pass it to
+                            Nrf905Frame.unpack_payload() to check the
+                            version and get the data.
+
+    An instance can be passed directly to Nrf905.open() as the callback.
+    """
+
+    HEADER = struct.Struct("<BI")
+    MESSAGE_TYPE_MAX = 255
+
+    # Limits the number of resolved routes that are stored.  Stops packets
+    # with corrupt headers from growing the table without limit.
+    RESOLVED_ROUTES_MAX = 4096
+
+    def __init__(self):
+        # Key is (source, message_type), value is the route.
+        self.__routes = dict()
+        # Key is the packed source and type, value is the route or None.
+        self.__resolved = dict()
+        self.__unrouted_count = 0
+        self.__short_count = 0
+
+    def register(self, handler, source=None, message_type=None):
+        """ Routes packets matching source and message_type to handler.
+        Replaces any handler already registered for the same pair.
+        """
+        if source is not None and (source < 0 or source > 0xffffffff):
+            raise ValueError("Source address out of range")
+        if message_type is not None:
+            if message_type < 0 or message_type > self.MESSAGE_TYPE_MAX:
+                raise ValueError("Message type out of range")
+        self.__routes[(source, message_type)] = Nrf905Route(handler)
+        self.__resolved.clear()
+
+    def unregister(self, source=None, message_type=None):
+        """ Removes the route for source and message_type.
+        Returns True if the route was found.
+        """
+        result = False
+        try:
+            del self.__routes[(source, message_type)]
+            self.__resolved.clear()
+            result = True
+        except KeyError:
+            pass
+        return result
+
+    def dispatch(self, data):
+        """ Routes one packet to its handler.
+        Returns True if a handler was called.
+        """
+        if len(data) < self.HEADER.size:
+            self.__short_count += 1
+            return False
+        view = memoryview(data)
+        (message_type, source) = self.HEADER.unpack_from(view)
+        key = (source << 8) | message_type
+        try:
+            route = self.__resolved[key]
+        except KeyError:
+            route = self.__resolve(source, message_type)
+            if len(self.__resolved) < self.RESOLVED_ROUTES_MAX:
+                self.__resolved[key] = route
+        if route is None:
+            self.__unrouted_count += 1
+            return False
+        payload = view[self.HEADER.size:]
+        route.packet_count += 1
+        route.byte_count += len(payload)
+        route.handler(source, message_type, payload)
+        return True
+
+    __call__ = dispatch
+
+    def get_route_counters(self):
+        """ Returns a dictionary of (source, message_type): (packets, bytes)
+        for every registered route.
+        """
+        result = dict()
+        for (key, route) in self.__routes.items():
+            result[key] = (route.packet_count, route.byte_count)
+        return result
+
+    def get_unrouted_count(self):
+        """ Returns the number of packets that had no matching route. """
+        return self.__unrouted_count
+
+    def get_short_count(self):
+        """ Returns the number of packets too short to hold a header. """
+        return self.__short_count
+
+    def __resolve(self, source, message_type):
+        routes = self.__routes
+        route = routes.get((source, message_type))
+        if route is None:
+            route = routes.get((source, None))
+        if route is None:
+            route = routes.get((None, message_type))
+        if route is None:
+            route = routes.get((None, None))
+        return route
+
+
+class Nrf905Route:
+    """ A handler and the counters for the packets sent to it. """
+
+    __slots__ = ("handler", "packet_count", "byte_count")
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.packet_count = 0
+        self.byte_count = 0
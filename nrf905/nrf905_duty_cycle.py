@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+
+from nrf905.nrf905_gpio import Nrf905Gpio
+
+
+class Nrf905DutyCycle:
+    """ Duty cycled receive mode for battery powered devices.
+
+    Instead of leaving the nRF905 in receive mode all the time, the device
+    cycles between a short listen window and a longer sleep period:
+
+        sleep_mode --> STANDBY --> SHOCKBURST_RX --> listen --> sleep_mode
+                  3ms          650us            listen_s      sleep_s
+
+    The STANDBY step is only needed when sleep_mode is POWER_DOWN.  Sleeping
+    in STANDBY costs more current but wakes 3ms sooner.
+
+    If the carrier is detected (CD pin) during the listen window, the device
+    stays in receive mode until no carrier has been seen for hold_s so that
+    the packet can be received.  wake() ends a sleep period early.
+
+    A transmitter has to keep sending for longer than
+    get_worst_case_latency_s() to be sure of being heard.  The time spent in
+    each mode is recorded so the actual current draw can be checked against
+    get_expected_current_a().
+
+    The settling times are enforced by the Nrf905Timing of the Nrf905Gpio
+    instance, which waits no longer than needed.
+
+    This module does not own the pigpio instance so all functions need the
+    instance passed in.
+
+    The mode changes are made from the cycling thread.  If io, an
+    Nrf905IoThread, is given they are submitted to it instead, so they are
+    kept in order with other users of that I/O thread.  Nrf905Hardware has
+    its own I/O thread and Nrf905Gpio, so this class cannot be used on a
+    device that an Nrf905Hardware is also using.
+    """
+
+    def __init__(self, gpio, listen_s=0.005, sleep_s=0.1, hold_s=0.02,
+                 sleep_mode=Nrf905Gpio.POWER_DOWN, io=None):
+        if listen_s <= 0 or sleep_s < 0 or hold_s <= 0:
+            raise ValueError("Times must be positive")
+        if sleep_mode != Nrf905Gpio.POWER_DOWN and sleep_mode != Nrf905Gpio.STANDBY:
+            raise ValueError("sleep_mode must be POWER_DOWN or STANDBY")
+        self.__gpio = gpio
+        self.__io = io
+        self.__listen_s = listen_s
+        self.__sleep_s = sleep_s
+        self.__hold_s = hold_s
+        self.__sleep_mode = sleep_mode
+        self.__mode = Nrf905Gpio.POWER_DOWN
+        self.__mode_start = time.monotonic()
+        self.__mode_times = dict.fromkeys(Nrf905Gpio.MODE_CURRENT_A, 0.0)
+        self.__cycle_count = 0
+        self.__carrier_count = 0
+        self.__carrier = threading.Event()
+        self.__wake = threading.Event()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def start(self, pi):
+        """ Starts cycling.  The CD callback is set up on the given pi. """
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__call(pi, self.__gpio.set_callback, Nrf905Gpio.CARRIER_DETECT,
+                    self.carrier_detect_callback)
+        self.__thread = threading.Thread(target=self.__run, args=(pi,),
+                                         daemon=True)
+        self.__thread.start()
+
+    def stop(self, pi):
+        """ Stops cycling and leaves the device in the sleep mode. """
+        if self.__thread is None:
+            return
+        self.__stop.set()
+        self.__wake.set()
+        self.__carrier.set()
+        self.__thread.join()
+        self.__thread = None
+        self.__call(pi, self.__gpio.clear_callback, Nrf905Gpio.CARRIER_DETECT)
+        self.__set_mode(pi, self.__sleep_mode)
+
+    def wake(self):
+        """ Ends the current sleep period early. """
+        self.__wake.set()
+
+    def carrier_detect_callback(self, gpio, level, tick):
+        """ Called by pigpio on each CD edge. """
+        if level == 1:
+            self.__carrier.set()
+
+    def get_mode(self):
+        """ Returns the current mode, one of the Nrf905Gpio modes. """
+        return self.__mode
+
+    def get_mode_times(self):
+        """ Returns a dictionary of mode: seconds spent in that mode. """
+        result = dict(self.__mode_times)
+        result[self.__mode] += time.monotonic() - self.__mode_start
+        return result
+
+    def get_cycle_count(self):
+        """ Returns the number of listen windows so far. """
+        return self.__cycle_count
+
+    def get_carrier_count(self):
+        """ Returns the number of times the carrier kept the device awake. """
+        return self.__carrier_count
+
+    def get_measured_current_a(self):
+        """ Returns the average current from the time spent in each mode. """
+        mode_times = self.get_mode_times()
+        total_s = sum(mode_times.values())
+        if total_s == 0:
+            return 0.0
+        charge = 0.0
+        for (mode, seconds) in mode_times.items():
+            charge += Nrf905Gpio.MODE_CURRENT_A[mode] * seconds
+        return charge / total_s
+
+    def get_expected_current_a(self):
+        """ Returns the average current of one idle cycle (no carrier). """
+        (wake_s, active_s) = self.__wake_times()
+        sleep_current = Nrf905Gpio.MODE_CURRENT_A[self.__sleep_mode]
+        rx_current = Nrf905Gpio.MODE_CURRENT_A[Nrf905Gpio.SHOCKBURST_RX]
+        standby_current = Nrf905Gpio.MODE_CURRENT_A[Nrf905Gpio.STANDBY]
+        # Current while settling into RX is taken as the RX current.
+        charge = (wake_s * standby_current +
+                  (active_s + self.__listen_s) * rx_current +
+                  self.__sleep_s * sleep_current)
+        return charge / self.get_cycle_s()
+
+    def get_duty_cycle(self):
+        """ Returns the fraction of an idle cycle spent in receive mode. """
+        (wake_s, active_s) = self.__wake_times()
+        return (active_s + self.__listen_s) / self.get_cycle_s()
+
+    def get_cycle_s(self):
+        """ Returns the length of one idle cycle in seconds. """
+        (wake_s, active_s) = self.__wake_times()
+        return wake_s + active_s + self.__listen_s + self.__sleep_s
+
+    def get_worst_case_latency_s(self):
+        """ Returns the longest time from a transmitter starting to send to
+        this device listening.
+        """
+        (wake_s, active_s) = self.__wake_times()
+        return self.__sleep_s + wake_s + active_s
+
+    def __wake_times(self):
+        """ Returns the settling times (to standby, to RX) for a wake up. """
+        wake_s = 0.0
+        if self.__sleep_mode == Nrf905Gpio.POWER_DOWN:
+            wake_s = Nrf905Gpio.POWER_DOWN_TO_STANDBY_US / 1000000
+        return (wake_s, Nrf905Gpio.STANDBY_TO_ACTIVE_US / 1000000)
+
+    def __run(self, pi):
+        while not self.__stop.is_set():
+            if self.__sleep_mode == Nrf905Gpio.POWER_DOWN:
+                self.__set_mode(pi, Nrf905Gpio.STANDBY)
+            self.__set_mode(pi, Nrf905Gpio.SHOCKBURST_RX)
+            self.__gpio.wait_settled()
+            self.__cycle_count += 1
+            # Ignore any CD edges from before the receiver settled.
+            self.__carrier.clear()
+            heard = self.__carrier.wait(self.__listen_s)
+            while heard and not self.__stop.is_set():
+                self.__carrier_count += 1
+                self.__carrier.clear()
+                heard = (self.__carrier.wait(self.__hold_s) or
+                         self.__call(pi, _read_carrier_detect) == 1)
+            self.__set_mode(pi, self.__sleep_mode)
+            self.__wake.wait(self.__sleep_s)
+            self.__wake.clear()
+
+    def __set_mode(self, pi, mode):
+        if mode == Nrf905Gpio.POWER_DOWN:
+            self.__call(pi, self.__gpio.set_mode_power_down)
+        elif mode == Nrf905Gpio.STANDBY:
+            self.__call(pi, self.__gpio.set_mode_standby)
+        else:
+            self.__call(pi, self.__gpio.set_mode_receive)
+        now = time.monotonic()
+        self.__mode_times[self.__mode] += now - self.__mode_start
+        self.__mode = mode
+        self.__mode_start = now
+
+    def __call(self, pi, function, *args):
+        """ Runs function(pi, *args) on the I/O thread if there is one. """
+        if self.__io is None:
+            return function(pi, *args)
+        return self.__io.call(function, *args)
+
+
+def _read_carrier_detect(pi):
+    return pi.read(Nrf905Gpio.CARRIER_DETECT)
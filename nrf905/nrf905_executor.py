@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+import queue
+import threading
+import time
+
+from nrf905.nrf905_dispatcher import Nrf905Dispatcher
+from nrf905.nrf905_packet import Nrf905Packet
+
+
+class Nrf905Executor:
+    """ Runs user handlers away from the pigpio callback thread.
+
+    The pigpio callback thread only has to call submit(), which puts the
+    packet on a bounded queue and returns.  Worker threads (or processes)
+    take packets off the queues and call the handler.  This keeps the SPI
+    read-out time the same however long the handlers take.
+
+    Each worker has its own queue, called a lane.  The lane used for a packet
+    is chosen from the packet key (by default the source address), so
+    packets from the same source are always handled in the order they were
+    received.  Packets from different sources can be handled in parallel.
+
+    When a lane is full, the policy decides what happens:
+        BLOCK           submit() waits for space, up to block_timeout_s.
+        DROP_NEWEST     The new packet is dropped.
+        DROP_OLDEST     The oldest packet in the lane is dropped.
+    Dropped packets are counted.
+
+    For each handler, the time spent waiting in a lane and the time spent in
+    the handler are recorded.
+
+    When use_processes is True, the workers are processes.  The handler must
+    then be a module level function and the data is copied into bytes.
+    """
+
+    BLOCK = 0
+    DROP_NEWEST = 1
+    DROP_OLDEST = 2
+
+    def __init__(self, handler, workers=2, queue_size=64, policy=DROP_NEWEST,
+                 key_function=None, use_processes=False, block_timeout_s=None):
+        if workers < 1:
+            raise ValueError("workers must be 1 or more")
+        if queue_size < 1:
+            raise ValueError("queue_size must be 1 or more")
+        if policy not in (self.BLOCK, self.DROP_NEWEST, self.DROP_OLDEST):
+            raise ValueError("Unknown policy")
+        if use_processes and policy == self.DROP_OLDEST:
+            # A multiprocessing queue cannot be safely drained from this end.
+            raise ValueError("DROP_OLDEST is not supported with processes")
+        self.__handler = handler
+        self.__policy = policy
+        self.__block_timeout_s = block_timeout_s
+        self.__use_processes = use_processes
+        if key_function is None:
+            key_function = self.source_key
+        self.__key_function = key_function
+        # submit() can be called from several threads at once.
+        self.__lock = threading.Lock()
+        self.__submitted_count = 0
+        self.__dropped_count = 0
+        self.__lanes = []
+        self.__workers = []
+        # One statistics dictionary per lane so workers never share one.
+        self.__lane_stats = []
+        self.__stats_queue = None
+        if use_processes:
+            self.__stats_queue = multiprocessing.SimpleQueue()
+            self.__stopping = multiprocessing.Event()
+        else:
+            self.__stopping = threading.Event()
+        for lane in range(workers):
+            if use_processes:
+                self.__lanes.append(multiprocessing.Queue(queue_size))
+            else:
+                self.__lanes.append(queue.Queue(queue_size))
+            self.__lane_stats.append(dict())
+
+    def start(self):
+        """ Starts the workers. """
+        if self.__workers:
+            return
+        self.__stopping.clear()
+        for lane in range(len(self.__lanes)):
+            if self.__use_processes:
+                worker = multiprocessing.Process(
+                    target=_process_lane,
+                    args=(self.__lanes[lane], self.__stats_queue, self.__stopping),
+                    daemon=True)
+            else:
+                worker = threading.Thread(target=self.__thread_lane,
+                                          args=(lane,), daemon=True)
+            worker.start()
+            self.__workers.append(worker)
+
+    def stop(self):
+        """ Stops the workers once the packets already queued are handled.
+        A lane that is full cannot take the None that stops its worker, so
+        the workers also stop when stopping is set and their lane is empty.
+        """
+        if not self.__workers:
+            return
+        self.__stopping.set()
+        for lane in self.__lanes:
+            try:
+                lane.put_nowait(None)
+            except queue.Full:
+                pass
+        for worker in self.__workers:
+            worker.join()
+        self.__workers = []
+
+    def submit(self, data, handler=None):
+        """ Queues data, bytes or an Nrf905Packet, for the handler.  If
+        handler is None, the handler given to the constructor is used.
+        The caller must not reuse data after this call.
+        Returns True if the data was queued.
+        """
+        if handler is None:
+            handler = self.__handler
+        lane = self.__lanes[hash(self.__key_function(data)) % len(self.__lanes)]
+        if self.__use_processes:
+            if isinstance(data, Nrf905Packet):
+                data = Nrf905Packet(bytes(data.data), data.dr_tick, data.am_tick,
+                                    data.cd_tick, data.time)
+            else:
+                data = bytes(data)
+        item = (handler, data, time.monotonic())
+        with self.__lock:
+            self.__submitted_count += 1
+        result = True
+        if self.__policy == self.BLOCK:
+            try:
+                lane.put(item, True, self.__block_timeout_s)
+            except queue.Full:
+                result = False
+        elif self.__policy == self.DROP_NEWEST:
+            try:
+                lane.put_nowait(item)
+            except queue.Full:
+                result = False
+        else:
+            while True:
+                try:
+                    lane.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        lane.get_nowait()
+                        with self.__lock:
+                            self.__dropped_count += 1
+                    except queue.Empty:
+                        pass
+        if not result:
+            with self.__lock:
+                self.__dropped_count += 1
+        return result
+
+    __call__ = submit
+
+    def get_submitted_count(self):
+        """ Returns the number of packets passed to submit(). """
+        return self.__submitted_count
+
+    def get_dropped_count(self):
+        """ Returns the number of packets dropped because a lane was full. """
+        return self.__dropped_count
+
+    def get_queue_depths(self):
+        """ Returns a list of the number of packets waiting in each lane. """
+        return [lane.qsize() for lane in self.__lanes]
+
+    def get_stats(self):
+        """ Returns a dictionary of handler name:
+            (count, mean_wait_s, max_wait_s, mean_run_s, max_run_s)
+        where wait is the time spent in the lane and run is the time spent
+        in the handler.
+        """
+        if self.__use_processes:
+            while not self.__stats_queue.empty():
+                (name, wait_s, run_s) = self.__stats_queue.get()
+                _record(self.__lane_stats[0], name, wait_s, run_s)
+        merged = dict()
+        for lane_stats in self.__lane_stats:
+            for (name, values) in lane_stats.items():
+                total = merged.setdefault(name, [0, 0.0, 0.0, 0.0, 0.0])
+                total[0] += values[0]
+                total[1] += values[1]
+                total[2] = max(total[2], values[2])
+                total[3] += values[3]
+                total[4] = max(total[4], values[4])
+        result = dict()
+        for (name, total) in merged.items():
+            count = total[0]
+            result[name] = (count, total[1] / count, total[2],
+                            total[3] / count, total[4])
+        return result
+
+    def source_key(self, data):
+        """ Returns the source address from the packet header, or 0 if the
+        packet is too short.
+        """
+        if isinstance(data, Nrf905Packet):
+            data = data.data
+        if len(data) < Nrf905Dispatcher.HEADER.size:
+            return 0
+        return Nrf905Dispatcher.HEADER.unpack_from(data)[1]
+
+    def __thread_lane(self, lane):
+        lane_queue = self.__lanes[lane]
+        lane_stats = self.__lane_stats[lane]
+        while True:
+            item = lane_queue.get()
+            if item is None:
+                break
+            (handler, data, queued_time) = item
+            start_time = time.monotonic()
+            handler(data)
+            end_time = time.monotonic()
+            _record(lane_stats, _handler_name(handler),
+                    start_time - queued_time, end_time - start_time)
+            if self.__stopping.is_set() and lane_queue.empty():
+                break
+
+
+def _handler_name(handler):
+    return getattr(handler, "__qualname__", type(handler).__qualname__)
+
+
+def _record(stats, name, wait_s, run_s):
+    """ Adds one handler call to stats. """
+    values = stats.get(name)
+    if values is None:
+        values = [0, 0.0, 0.0, 0.0, 0.0]
+        stats[name] = values
+    values[0] += 1
+    values[1] += wait_s
+    if wait_s > values[2]:
+        values[2] = wait_s
+    values[3] += run_s
+    if run_s > values[4]:
+        values[4] = run_s
+
+
+def _process_lane(lane_queue, stats_queue, stopping):
+    """ Worker process loop.  Runs until None is received, or stopping is
+    set and the lane is empty.
+    """
+    while True:
+        item = lane_queue.get()
+        if item is None:
+            break
+        (handler, data, queued_time) = item
+        start_time = time.monotonic()
+        handler(data)
+        end_time = time.monotonic()
+        stats_queue.put((_handler_name(handler),
+                         start_time - queued_time, end_time - start_time))
+        if stopping.is_set() and lane_queue.empty():
+            break
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+import struct
+
+import numpy
+
+
+class Nrf905Fec:
+    """ Forward error correction for messages sent as several frames.
+
+    The message is split into data fragments and two optional layers are
+    added:
+
+    Interleaved parity.  parity_count parity fragments are added.  Parity
+    fragment j is the XOR of data fragments j, j + parity_count,
+    j + 2 * parity_count, ...  One lost fragment in each of these groups can
+    be rebuilt, so up to parity_count lost frames can be recovered, including
+    a burst of parity_count frames in a row.
+
+    Hamming.  Every byte of every frame is sent as two Hamming(8,4) SECDED
+    code words.  One bit error in each code word is corrected and two are
+    detected, in which case the frame is treated as lost.  This doubles the
+    size of every frame and is only useful with the nRF905 CRC turned off
+    (set_crc_mode(0)), otherwise frames with bit errors never arrive.
+
+    Each frame is:
+        Byte    Field
+        0       Message ID, 0 to 255
+        1       Fragment index, data fragments first then parity fragments
+        2       Number of data fragments
+        3       Number of parity fragments
+        4-      Fragment
+    The first two bytes of the data are the message length so padding can be
+    removed.
+
+    All coding is done on NumPy arrays holding every frame of the message,
+    using table look ups for the Hamming code.  get_overhead() and
+    get_frame_count() give the cost of a setting so it can be tuned per link.
+    """
+
+    PAYLOAD_WIDTH_MAX = 32
+    HEADER = struct.Struct("<BBBB")
+    LENGTH = struct.Struct("<H")
+
+    def __init__(self, parity_count=1, hamming=False,
+                 payload_width=PAYLOAD_WIDTH_MAX):
+        if parity_count < 0 or parity_count > 255:
+            raise ValueError("parity_count must be in the range 0 to 255")
+        if payload_width < 1 or payload_width > self.PAYLOAD_WIDTH_MAX:
+            raise ValueError("payload_width must be in the range 1 to 32")
+        self.__parity_count = parity_count
+        self.__hamming = hamming
+        self.__payload_width = payload_width
+        frame_width = payload_width
+        if hamming:
+            frame_width = payload_width // 2
+        self.__fragment_size = frame_width - self.HEADER.size
+        if self.__fragment_size < 1:
+            raise ValueError("payload_width too small")
+        self.__recovered_count = 0
+        self.__corrected_count = 0
+        self.__rejected_count = 0
+
+    def get_fragment_size(self):
+        """ Returns the number of message bytes carried by each frame. """
+        return self.__fragment_size
+
+    def get_frame_count(self, message_length):
+        """ Returns the number of frames needed for a message. """
+        return self.__data_count(message_length) + self.__parity_count
+
+    def get_overhead(self, message_length):
+        """ Returns the bytes sent divided by the bytes in the message. """
+        if message_length == 0:
+            return 0.0
+        return (self.get_frame_count(message_length) * self.__payload_width) / message_length
+
+    def get_recoverable(self):
+        """ Returns a tuple of (lost frames, bit errors per half byte) that
+        can always be recovered.
+        """
+        bit_errors = 0
+        if self.__hamming:
+            bit_errors = 1
+        return (self.__parity_count, bit_errors)
+
+    def get_stats(self):
+        """ Returns a tuple of (frames rebuilt from parity, bits corrected,
+        frames rejected by the Hamming code).
+        """
+        return (self.__recovered_count, self.__corrected_count, self.__rejected_count)
+
+    def encode(self, message_id, message):
+        """ Returns a list of frames (bytes) holding message. """
+        data_count = self.__data_count(len(message))
+        size = self.__fragment_size
+        data = numpy.zeros(data_count * size, dtype=numpy.uint8)
+        data[:self.LENGTH.size] = numpy.frombuffer(self.LENGTH.pack(len(message)), dtype=numpy.uint8)
+        data[self.LENGTH.size:self.LENGTH.size + len(message)] = numpy.frombuffer(bytes(message), dtype=numpy.uint8)
+        fragments = data.reshape(data_count, size)
+        if self.__parity_count:
+            fragments = numpy.vstack((fragments, self.__parity(fragments)))
+        count = len(fragments)
+        headers = numpy.empty((count, self.HEADER.size), dtype=numpy.uint8)
+        headers[:, 0] = message_id & 0xff
+        headers[:, 1] = numpy.arange(count, dtype=numpy.uint8)
+        headers[:, 2] = data_count
+        headers[:, 3] = self.__parity_count
+        frames = numpy.hstack((headers, fragments))
+        if self.__hamming:
+            frames = hamming_encode(frames)
+        return [frame.tobytes() for frame in frames]
+
+    def decode(self, frames):
+        """ Returns the message from the frames received for it, in any
+        order.  Returns None if too many frames were lost.
+        Raises ValueError if the frames are not from the same message.
+        """
+        if len(frames) == 0:
+            return None
+        width = len(frames[0])
+        received = numpy.frombuffer(b"".join(bytes(frame) for frame in frames),
+                                    dtype=numpy.uint8).reshape(len(frames), width)
+        if self.__hamming:
+            (received, corrected, valid) = hamming_decode(received)
+            self.__corrected_count += int(corrected.sum())
+            self.__rejected_count += int(len(valid) - valid.sum())
+            received = received[valid]
+            if len(received) == 0:
+                return None
+        headers = received[:, :self.HEADER.size]
+        if (numpy.any(headers[:, 0] != headers[0, 0]) or
+                numpy.any(headers[:, 2] != headers[0, 2]) or
+                numpy.any(headers[:, 3] != headers[0, 3])):
+            raise ValueError("Frames are from different messages")
+        data_count = int(headers[0, 2])
+        parity_count = int(headers[0, 3])
+        count = data_count + parity_count
+        indexes = headers[:, 1].astype(numpy.intp)
+        if numpy.any(indexes >= count):
+            raise ValueError("Fragment index out of range")
+        fragments = numpy.zeros((count, received.shape[1] - self.HEADER.size), dtype=numpy.uint8)
+        fragments[indexes] = received[:, self.HEADER.size:]
+        present = numpy.zeros(count, dtype=bool)
+        present[indexes] = True
+        if not present[:data_count].all():
+            if not self.__rebuild(fragments, present, data_count, parity_count):
+                return None
+        data = fragments[:data_count].reshape(-1)
+        (length,) = self.LENGTH.unpack(data[:self.LENGTH.size].tobytes())
+        if length > len(data) - self.LENGTH.size:
+            raise ValueError("Message length out of range")
+        return data[self.LENGTH.size:self.LENGTH.size + length].tobytes()
+
+    def __data_count(self, message_length):
+        total = message_length + self.LENGTH.size
+        data_count = -(-total // self.__fragment_size)
+        if data_count > 255 or data_count + self.__parity_count > 256:
+            raise ValueError("Message too long")
+        return data_count
+
+    def __parity(self, fragments):
+        """ Returns the parity_count parity fragments for the data fragments. """
+        (data_count, size) = fragments.shape
+        parity_count = self.__parity_count
+        rows = -(-data_count // parity_count) * parity_count
+        padded = numpy.zeros((rows, size), dtype=numpy.uint8)
+        padded[:data_count] = fragments
+        return numpy.bitwise_xor.reduce(padded.reshape(-1, parity_count, size), axis=0)
+
+    def __rebuild(self, fragments, present, data_count, parity_count):
+        """ Rebuilds lost data fragments in place from the parity fragments.
+        Returns False if any group has lost more than one fragment.
+        """
+        if parity_count == 0:
+            return False
+        size = fragments.shape[1]
+        rows = -(-data_count // parity_count) * parity_count
+        # Group j is data fragments j, j + parity_count, ... and parity j.
+        grouped = numpy.zeros((rows // parity_count + 1, parity_count, size), dtype=numpy.uint8)
+        grouped_present = numpy.ones((rows // parity_count + 1, parity_count), dtype=bool)
+        grouped.reshape(-1, size)[:data_count] = fragments[:data_count]
+        grouped_present.reshape(-1)[:data_count] = present[:data_count]
+        grouped[-1] = fragments[data_count:]
+        grouped_present[-1] = present[data_count:]
+        missing = numpy.logical_not(grouped_present).sum(axis=0)
+        if numpy.any(missing > 1):
+            return False
+        # Lost fragments are zero, so the XOR of each group is the lost one.
+        rebuilt = numpy.bitwise_xor.reduce(grouped, axis=0)
+        lost = numpy.flatnonzero(numpy.logical_not(present[:data_count]))
+        fragments[lost] = rebuilt[lost % parity_count]
+        self.__recovered_count += len(lost)
+        return True
+
+
+def _hamming_tables():
+    """ Returns the Hamming(8,4) SECDED encode and decode tables.
+    The decode table gives the nibble and the number of bits corrected, or
+    -1 for code words with two bit errors.
+    """
+    encode = numpy.zeros(16, dtype=numpy.uint8)
+    for nibble in range(16):
+        d = [(nibble >> bit) & 1 for bit in range(4)]
+        p1 = d[0] ^ d[1] ^ d[3]
+        p2 = d[0] ^ d[2] ^ d[3]
+        p3 = d[1] ^ d[2] ^ d[3]
+        bits = [p1, p2, d[0], p3, d[1], d[2], d[3]]
+        bits.append(sum(bits) & 1)
+        encode[nibble] = sum(bit << position for (position, bit) in enumerate(bits))
+    decode = numpy.full(256, -1, dtype=numpy.int8)
+    corrected = numpy.zeros(256, dtype=numpy.uint8)
+    for nibble in range(16):
+        code = int(encode[nibble])
+        decode[code] = nibble
+        for bit in range(8):
+            decode[code ^ (1 << bit)] = nibble
+            corrected[code ^ (1 << bit)] = 1
+    return (encode, decode, corrected)
+
+
+(_HAMMING_ENCODE, _HAMMING_DECODE, _HAMMING_CORRECTED) = _hamming_tables()
+
+
+def hamming_encode(frames):
+    """ Returns the Hamming code of a 2D uint8 array, two code bytes per
+    byte, low nibble first.
+    """
+    (count, width) = frames.shape
+    result = numpy.empty((count, width * 2), dtype=numpy.uint8)
+    result[:, 0::2] = _HAMMING_ENCODE[frames & 0x0f]
+    result[:, 1::2] = _HAMMING_ENCODE[frames >> 4]
+    return result
+
+
+def hamming_decode(codes):
+    """ Decodes a 2D uint8 array made by hamming_encode().
+    Returns a tuple of (frames, bits corrected per frame, frame valid).
+    """
+    low = _HAMMING_DECODE[codes[:, 0::2]]
+    high = _HAMMING_DECODE[codes[:, 1::2]]
+    valid = numpy.logical_and((low >= 0).all(axis=1), (high >= 0).all(axis=1))
+    corrected = (_HAMMING_CORRECTED[codes].sum(axis=1, dtype=numpy.intp)) * valid
+    frames = ((high.astype(numpy.uint8) & 0x0f) << 4) | (low.astype(numpy.uint8) & 0x0f)
+    return (frames, corrected, valid)
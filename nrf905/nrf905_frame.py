@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import struct
+
+import numpy
+
+
+class Nrf905Frame:
+    """ The frame header used inside the nRF905 payload.
+
+        Byte    Field
+        0       Message type, 0 to 255
+        1-4     Source address, LSB first
+        5       Header version, VERSION
+        6       Flags, see the FLAG values
+        7-8     Sequence number, wrapping at 16 bits
+        9       Length of the data
+        10-     Data, padded with 0 to the payload width
+    The message type and source come first so the Nrf905Dispatcher and
+    Nrf905Executor, which only read those, work on frames unchanged.  A
+    dispatcher handler is given the frame from byte 5, which
+    unpack_payload() decodes.
+
+    pack() writes into one buffer that is reused for every frame, so
+    nothing is allocated per frame on the transmit path.  The result is
+    only valid until the next call.  unpack() returns the data as a
+    memoryview of the received payload.
+
+    unpack_batch() decodes many frames held in one buffer at the same
+    stride, e.g. all the slots of an Nrf905Gateway ring, with NumPy and no
+    Python work per frame.
+    """
+
+    VERSION = 1
+    HEADER = struct.Struct("<BIBBHB")
+    # The header after the message type and source.
+    PAYLOAD_HEADER = struct.Struct("<BBHB")
+    PAYLOAD_WIDTH_MAX = 32
+
+    # The receiver should acknowledge the frame.
+    FLAG_ACK_REQUEST = 0x01
+    # The frame is a repeat of one sent before.
+    FLAG_RETRY = 0x02
+    # More frames of the same message follow.
+    FLAG_MORE = 0x04
+
+    def __init__(self, payload_width=PAYLOAD_WIDTH_MAX):
+        if payload_width <= self.HEADER.size or payload_width > self.PAYLOAD_WIDTH_MAX:
+            raise ValueError("payload_width must be in the range 11 to 32")
+        self.__payload_width = payload_width
+        self.__data_max = payload_width - self.HEADER.size
+        self.__buffer = bytearray(payload_width)
+        self.__view = memoryview(self.__buffer)
+        self.__zeros = memoryview(bytes(payload_width))
+        self.__dtype = numpy.dtype({
+            "names": ["message_type", "source", "version", "flags", "sequence", "length", "data"],
+            "formats": ["u1", "<u4", "u1", "u1", "<u2", "u1", ("u1", (self.__data_max,))],
+            "offsets": [0, 1, 5, 6, 7, 9, 10],
+            "itemsize": payload_width
+        })
+
+    def get_data_max(self):
+        """ Returns the most data that fits in one frame. """
+        return self.__data_max
+
+    def pack(self, message_type, source, sequence, data, flags=0):
+        """ Returns a memoryview of the frame, valid until the next call.
+        Raises ValueError if data does not fit or a field is out of range.
+        """
+        length = len(data)
+        if length > self.__data_max:
+            raise ValueError("data longer than the frame")
+        try:
+            self.HEADER.pack_into(self.__buffer, 0, message_type, source, self.VERSION,
+                                  flags, sequence & 0xffff, length)
+        except struct.error as error:
+            raise ValueError(str(error))
+        end = self.HEADER.size + length
+        self.__buffer[self.HEADER.size:end] = data
+        # Clear what is left of the last frame.
+        self.__buffer[end:] = self.__zeros[end:]
+        return self.__view
+
+    def unpack(self, data):
+        """ Returns a tuple of (message_type, source, sequence, flags, data)
+        where data is a memoryview.
+        Raises ValueError if the frame is short, has another version or a
+        length that does not fit.
+        """
+        if len(data) < self.HEADER.size:
+            raise ValueError("Frame too short")
+        (message_type, source, version, flags, sequence,
+         length) = self.HEADER.unpack_from(data)
+        if version != self.VERSION:
+            raise ValueError("Unknown frame version")
+        if self.HEADER.size + length > len(data):
+            raise ValueError("Frame length out of range")
+        view = memoryview(data)[self.HEADER.size:self.HEADER.size + length]
+        return (message_type, source, sequence, flags, view)
+
+    def unpack_payload(self, payload):
+        """ Returns a tuple of (sequence, flags, data) from the payload an
+        Nrf905Dispatcher handler is given, the frame from the version byte
+        on.  data is a memoryview.
+        Raises ValueError as unpack() does.
+        """
+        size = self.PAYLOAD_HEADER.size
+        if len(payload) < size:
+            raise ValueError("Frame too short")
+        (version, flags, sequence, length) = self.PAYLOAD_HEADER.unpack_from(payload)
+        if version != self.VERSION:
+            raise ValueError("Unknown frame version")
+        if size + length > len(payload):
+            raise ValueError("Frame length out of range")
+        return (sequence, flags, memoryview(payload)[size:size + length])
+
+    def key(self, data):
+        """ Returns (source, sequence) for Nrf905Dedup.  data is a frame or
+        an Nrf905Packet holding one.
+        """
+        data = getattr(data, "data", data)
+        (message_type, source, version, flags, sequence,
+         length) = self.HEADER.unpack_from(data)
+        return (source, sequence)
+
+    def unpack_batch(self, buffer, count=None, offset=0, stride=None):
+        """ Decodes count frames starting at offset in buffer, one every
+        stride bytes (default the payload width).  If count is None, as many
+        frames as fit are decoded.
+        Returns a tuple of (frames, valid) where frames is a NumPy
+        structured array viewing buffer, with the fields of the header and
+        data, and valid is a boolean array marking frames with the right
+        version and a length that fits.  Nothing is copied, so the frames
+        change if buffer does.
+        """
+        if stride is None:
+            stride = self.__payload_width
+        if stride < self.__payload_width:
+            raise ValueError("stride shorter than a frame")
+        if count is None:
+            count = max(0, (len(buffer) - offset - self.__payload_width) // stride + 1)
+        if count and offset + (count - 1) * stride + self.__payload_width > len(buffer):
+            raise ValueError("buffer too short")
+        if count == 0:
+            frames = numpy.zeros(0, dtype=self.__dtype)
+        else:
+            frames = numpy.ndarray((count,), dtype=self.__dtype, buffer=buffer,
+                                   offset=offset, strides=(stride,))
+        valid = (frames["version"] == self.VERSION) & (frames["length"] <= self.__data_max)
+        return (frames, valid)
+
+    def pack_batch(self, message_types, sources, sequences, data, flags=0):
+        """ Returns a uint8 array of one frame per row.  message_types,
+        sources, sequences and flags are each a single value or one value
+        per frame.  data is a list of the data of each frame.
+        Raises ValueError if any data does not fit.
+        """
+        count = len(data)
+        frames = numpy.zeros(count, dtype=self.__dtype)
+        frames["message_type"] = message_types
+        frames["source"] = sources
+        frames["version"] = self.VERSION
+        frames["flags"] = flags
+        frames["sequence"] = numpy.asarray(sequences) & 0xffff
+        lengths = numpy.fromiter((len(item) for item in data), dtype=numpy.intp, count=count)
+        if count and lengths.max() > self.__data_max:
+            raise ValueError("data longer than the frame")
+        frames["length"] = lengths
+        # Copy the data of all frames in one step.
+        joined = numpy.frombuffer(b"".join(bytes(item) for item in data), dtype=numpy.uint8)
+        rows = numpy.repeat(numpy.arange(count), lengths)
+        columns = numpy.arange(len(joined)) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+        frames["data"][rows, columns] = joined
+        return frames.view(numpy.uint8).reshape(count, self.__payload_width)
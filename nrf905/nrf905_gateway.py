@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+
+class Nrf905Ring:
+    """ The layout of the shared memory ring used by Nrf905Gateway.
+
+        Header
+            write_count         uint64  Number of packets ever written
+            slot_count          uint32
+            data_width          uint32  Maximum packet length
+            cursors             uint64 * CONSUMERS_MAX, next packet each
+                                consumer will read, for monitoring lag
+        Slots, slot_count of
+            sequence            uint64  write_count when written, plus 1
+            time_us             int64   Wall clock time of reception
+            length              uint8
+            padding             7 bytes
+            data                data_width bytes
+
+    There is one writer and any number of readers.  The writer never waits
+    for the readers, a reader that falls more than slot_count packets behind
+    loses packets.  The writer fills in the slot and then sets its sequence,
+    so a reader can tell if a slot was rewritten while it was being read.
+    """
+
+    CONSUMERS_MAX = 16
+    HEADER = struct.Struct("<QII")
+    CURSOR = struct.Struct("<Q")
+    SLOT_HEADER = struct.Struct("<QqB7x")
+    SLOTS_OFFSET = HEADER.size + CURSOR.size * CONSUMERS_MAX
+
+
+class Nrf905Gateway:
+    """ Owns the radio and shares it with other processes.
+
+    Every received packet is published into a shared memory ring, see
+    Nrf905Ring, that any number of Nrf905GatewayReader instances in other
+    processes can read.  Publishing never waits for the readers.
+
+    Other processes send packets by connecting to the Unix socket at
+    socket_path, see Nrf905GatewayClient.  Each request is a length byte and
+    that many bytes of data, the reply is one status byte.  The requests are
+    queued and passed to transmit_function, one at a time, on a single
+    thread.  A request that is not transmitted within reply_timeout_s, or
+    is still queued when the gateway closes, is answered with STATUS_ERROR.
+
+    The gateway provides submit() so it can be given to Nrf905Hardware as
+    the executor for received data.
+    """
+
+    STATUS_OK = 0
+    STATUS_ERROR = 1
+    STATUS_FULL = 2
+
+    def __init__(self, name, socket_path, transmit_function,
+                 slot_count=1024, data_width=32, transmit_queue_size=64,
+                 reply_timeout_s=10.0):
+        if slot_count < 1:
+            raise ValueError("slot_count must be 1 or more")
+        if data_width < 1 or data_width > 255:
+            raise ValueError("data_width must be in the range 1 to 255")
+        self.__slot_count = slot_count
+        self.__data_width = data_width
+        self.__slot_size = Nrf905Ring.SLOT_HEADER.size + data_width
+        self.__memory = shared_memory.SharedMemory(
+            name, create=True, size=Nrf905Ring.SLOTS_OFFSET + slot_count * self.__slot_size)
+        self.__buffer = self.__memory.buf
+        self.__buffer[:Nrf905Ring.SLOTS_OFFSET] = bytes(Nrf905Ring.SLOTS_OFFSET)
+        Nrf905Ring.HEADER.pack_into(self.__buffer, 0, 0, slot_count, data_width)
+        self.__write_count = 0
+        self.__transmit_function = transmit_function
+        self.__transmit_queue = queue.Queue(transmit_queue_size)
+        self.__reply_timeout_s = reply_timeout_s
+        self.__transmit_thread = None
+        self.__socket_path = socket_path
+        self.__server = None
+        self.__server_thread = None
+
+    def get_name(self):
+        """ Returns the shared memory name to give to readers. """
+        return self.__memory.name
+
+    def start(self):
+        """ Starts the transmit thread and the command socket. """
+        if self.__transmit_thread is not None:
+            return
+        self.__transmit_thread = threading.Thread(target=self.__transmit_loop, daemon=True)
+        self.__transmit_thread.start()
+        if os.path.exists(self.__socket_path):
+            os.remove(self.__socket_path)
+        gateway = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                gateway.handle_connection(self.request)
+
+        self.__server = socketserver.ThreadingUnixStreamServer(self.__socket_path, Handler)
+        self.__server.daemon_threads = True
+        self.__server_thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__server_thread.start()
+
+    def stop(self):
+        """ Stops the command socket and the transmit thread.  Packets can
+        still be published until close().
+        """
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+            os.remove(self.__socket_path)
+        if self.__transmit_thread is not None:
+            self.__transmit_queue.put(None)
+            self.__transmit_thread.join()
+            self.__transmit_thread = None
+        # Fail the requests that will now never be transmitted.
+        while True:
+            try:
+                item = self.__transmit_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].put(self.STATUS_ERROR)
+
+    def close(self):
+        """ Stops the threads and removes the shared memory and socket. """
+        self.stop()
+        del self.__buffer
+        self.__memory.close()
+        self.__memory.unlink()
+
+    def publish(self, data, time_us=None):
+        """ Writes a packet into the ring. """
+        length = len(data)
+        if length > self.__data_width:
+            raise ValueError("data longer than data_width")
+        if time_us is None:
+            time_us = time.time_ns() // 1000
+        count = self.__write_count
+        offset = Nrf905Ring.SLOTS_OFFSET + (count % self.__slot_count) * self.__slot_size
+        buffer = self.__buffer
+        # Mark the slot as being written before changing the data.
+        Nrf905Ring.SLOT_HEADER.pack_into(buffer, offset, 0, time_us, length)
+        data_offset = offset + Nrf905Ring.SLOT_HEADER.size
+        buffer[data_offset:data_offset + length] = data
+        Nrf905Ring.SLOT_HEADER.pack_into(buffer, offset, count + 1, time_us, length)
+        self.__write_count = count + 1
+        Nrf905Ring.HEADER.pack_into(buffer, 0, count + 1, self.__slot_count, self.__data_width)
+
+    def submit(self, packet):
+        """ Publishes an Nrf905Packet using its time stamp, for use as the
+        Nrf905Hardware executor.
+        """
+        self.publish(packet.data, packet.get_time_us())
+        return True
+
+    def get_write_count(self):
+        return self.__write_count
+
+    def get_consumer_lag(self):
+        """ Returns a dictionary of consumer index: packets not yet read. """
+        result = dict()
+        for index in range(Nrf905Ring.CONSUMERS_MAX):
+            (cursor,) = Nrf905Ring.CURSOR.unpack_from(
+                self.__buffer, Nrf905Ring.HEADER.size + index * Nrf905Ring.CURSOR.size)
+            if cursor:
+                # Cursors are stored plus 1 so that 0 means unused.
+                result[index] = self.__write_count - (cursor - 1)
+        return result
+
+    def handle_connection(self, connection):
+        """ Serves transmit requests from one client connection. """
+        while True:
+            length = connection.recv(1)
+            if not length:
+                break
+            data = _receive_exactly(connection, length[0])
+            if data is None:
+                break
+            status = self.STATUS_OK
+            if len(data) > self.__data_width:
+                status = self.STATUS_ERROR
+            else:
+                reply = queue.Queue(1)
+                try:
+                    self.__transmit_queue.put_nowait((data, reply))
+                except queue.Full:
+                    status = self.STATUS_FULL
+                else:
+                    try:
+                        status = reply.get(timeout=self.__reply_timeout_s)
+                    except queue.Empty:
+                        status = self.STATUS_ERROR
+            connection.sendall(bytes([status]))
+
+    def __transmit_loop(self):
+        while True:
+            item = self.__transmit_queue.get()
+            if item is None:
+                break
+            (data, reply) = item
+            status = self.STATUS_OK
+            try:
+                self.__transmit_function(data)
+            except Exception:
+                status = self.STATUS_ERROR
+            reply.put(status)
+
+
+class Nrf905GatewayReader:
+    """ Reads packets published by an Nrf905Gateway in another process.
+
+    read() returns a memoryview straight into the shared memory, so nothing
+    is copied.  The gateway may rewrite the slot once the reader is more than
+    slot_count packets behind, so after using the data call is_valid() with
+    the sequence number returned by read().  If it returns False the data may
+    have been overwritten and must be discarded.
+
+    consumer is the index, 0 to CONSUMERS_MAX - 1, used to publish this
+    reader's cursor so the gateway can see how far behind it is.
+    """
+
+    def __init__(self, name, consumer=None):
+        self.__memory = shared_memory.SharedMemory(name)
+        # The gateway owns the memory.  Stop the resource tracker removing it
+        # when this process exits.
+        resource_tracker.unregister(self.__memory._name, "shared_memory")
+        self.__buffer = self.__memory.buf
+        (write_count, self.__slot_count, self.__data_width) = Nrf905Ring.HEADER.unpack_from(self.__buffer)
+        self.__slot_size = Nrf905Ring.SLOT_HEADER.size + self.__data_width
+        if consumer is not None and (consumer < 0 or consumer >= Nrf905Ring.CONSUMERS_MAX):
+            raise ValueError("consumer out of range")
+        self.__consumer = consumer
+        # Start with the next packet published.
+        self.__cursor = write_count
+        self.__lost_count = 0
+        self.__update_cursor()
+
+    def close(self):
+        if self.__consumer is not None:
+            Nrf905Ring.CURSOR.pack_into(
+                self.__buffer, Nrf905Ring.HEADER.size + self.__consumer * Nrf905Ring.CURSOR.size, 0)
+        del self.__buffer
+        self.__memory.close()
+
+    def get_lost_count(self):
+        """ Returns the number of packets overwritten before they were read. """
+        return self.__lost_count
+
+    def available(self):
+        """ Returns the number of packets waiting to be read. """
+        (write_count,) = Nrf905Ring.CURSOR.unpack_from(self.__buffer, 0)
+        return write_count - self.__cursor
+
+    def read(self):
+        """ Returns a tuple of (sequence, time_us, data) for the next packet,
+        or None if there are no new packets.  data is a memoryview into the
+        shared memory.
+        """
+        while True:
+            (write_count,) = Nrf905Ring.CURSOR.unpack_from(self.__buffer, 0)
+            if write_count == self.__cursor:
+                return None
+            if write_count - self.__cursor > self.__slot_count:
+                # Lapped by the writer, skip to the oldest packet still held.
+                self.__lost_count += write_count - self.__slot_count - self.__cursor
+                self.__cursor = write_count - self.__slot_count
+            sequence = self.__cursor + 1
+            offset = Nrf905Ring.SLOTS_OFFSET + (self.__cursor % self.__slot_count) * self.__slot_size
+            (slot_sequence, time_us, length) = Nrf905Ring.SLOT_HEADER.unpack_from(self.__buffer, offset)
+            self.__cursor += 1
+            self.__update_cursor()
+            if slot_sequence == sequence:
+                data_offset = offset + Nrf905Ring.SLOT_HEADER.size
+                return (sequence, time_us, self.__buffer[data_offset:data_offset + length])
+            # Rewritten while we were looking at it.
+            self.__lost_count += 1
+
+    def is_valid(self, sequence):
+        """ Returns True if the packet with the given sequence has not been
+        overwritten since read() returned it.
+        """
+        offset = Nrf905Ring.SLOTS_OFFSET + ((sequence - 1) % self.__slot_count) * self.__slot_size
+        (slot_sequence,) = Nrf905Ring.CURSOR.unpack_from(self.__buffer, offset)
+        return slot_sequence == sequence
+
+    def __update_cursor(self):
+        if self.__consumer is not None:
+            Nrf905Ring.CURSOR.pack_into(
+                self.__buffer, Nrf905Ring.HEADER.size + self.__consumer * Nrf905Ring.CURSOR.size,
+                self.__cursor + 1)
+
+
+class Nrf905GatewayClient:
+    """ Sends packets through an Nrf905Gateway from another process. """
+
+    def __init__(self, socket_path):
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.__socket.connect(socket_path)
+
+    def close(self):
+        self.__socket.close()
+
+    def transmit(self, data):
+        """ Sends data and waits for it to be transmitted.
+        Returns one of the Nrf905Gateway STATUS values.
+        """
+        if len(data) > 255:
+            raise ValueError("data too long")
+        self.__socket.sendall(bytes([len(data)]) + bytes(data))
+        status = _receive_exactly(self.__socket, 1)
+        if status is None:
+            raise ConnectionError("Gateway closed the connection")
+        return status[0]
+
+
+def _receive_exactly(connection, length):
+    """ Returns length bytes from connection, or None if it closed first. """
+    data = bytearray()
+    while len(data) < length:
+        chunk = connection.recv(length - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
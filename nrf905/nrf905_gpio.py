@@ -2,6 +2,8 @@
 
 import pigpio
 
+from nrf905.nrf905_timing import Nrf905Timing
+
 class Nrf905Gpio:
     """ Control the GPIO pins when using the nRF905.  Pins used are:
     
@@ -43,12 +45,49 @@ TODO 17 and 18 are used by SPI1
     # Activate transmitter.
     SHOCKBURST_TX = 3
 
-    def __init__(self, pi):
+    # Settling times in microseconds, see nRF905 datasheet, table 12.
+    # Power down to standby.
+    POWER_DOWN_TO_STANDBY_US = 3000
+    # Standby to ShockBurst RX or TX.
+    STANDBY_TO_ACTIVE_US = 650
+    # ShockBurst RX to TX and TX to RX.
+    RECEIVE_TRANSMIT_SWITCH_US = 550
+    # Minimum TRX_CE pulse width to start a transmission.
+    TRX_CE_PULSE_US = 10
+
+    # Time before the new mode can be used for each (from, to) mode change.
+    TRANSITIONS_US = {
+        (POWER_DOWN, STANDBY): POWER_DOWN_TO_STANDBY_US,
+        (POWER_DOWN, SHOCKBURST_RX): POWER_DOWN_TO_STANDBY_US + STANDBY_TO_ACTIVE_US,
+        (POWER_DOWN, SHOCKBURST_TX): POWER_DOWN_TO_STANDBY_US + STANDBY_TO_ACTIVE_US,
+        (STANDBY, SHOCKBURST_RX): STANDBY_TO_ACTIVE_US,
+        (STANDBY, SHOCKBURST_TX): STANDBY_TO_ACTIVE_US,
+        (SHOCKBURST_RX, SHOCKBURST_TX): RECEIVE_TRANSMIT_SWITCH_US,
+        (SHOCKBURST_TX, SHOCKBURST_RX): RECEIVE_TRANSMIT_SWITCH_US
+    }
+
+    # Typical supply current in amps for each mode, see nRF905 datasheet,
+    # table 5.  Transmit current is for the lowest output power.
+    MODE_CURRENT_A = {
+        POWER_DOWN: 0.0000025,
+        STANDBY: 0.000032,
+        SHOCKBURST_RX: 0.0125,
+        SHOCKBURST_TX: 0.009
+    }
+
+    def __init__(self, pi, timing=None):
+        """ timing is the Nrf905Timing used to enforce the settling times.
+        If None, one is created using TRANSITIONS_US.
+        """
         # print("__init__")
+        if timing is None:
+            timing = Nrf905Timing(self.TRANSITIONS_US)
+        self.__timing = timing
         # Output pins controlling nRF905 - set all to 0.
         for pin in self.output_pins:
             pi.set_mode(pin, pigpio.OUTPUT)
             pi.write(pin, 0)
+        self.__timing.entered(self.POWER_DOWN)
         self.__callback_dict = dict()
 
     def term(self, pi):
@@ -72,24 +111,57 @@ TODO 17 and 18 are used by SPI1
                 pi.set_pull_up_down(pin, pigpio.PUD_DOWN)
 
     def set_mode_power_down(self, pi):
+        self.__timing.prepare(self.POWER_DOWN)
         pi.write(self.POWER_UP, 0)
         pi.write(self.TRANSMIT_RECEIVE_CHIP_ENABLE, 0)
         pi.write(self.TRANSMIT_ENABLE, 0)
+        self.__timing.entered(self.POWER_DOWN)
 
     def set_mode_standby(self, pi):
+        self.__timing.prepare(self.STANDBY)
         pi.write(self.POWER_UP, 1)
         pi.write(self.TRANSMIT_RECEIVE_CHIP_ENABLE, 0)
         pi.write(self.TRANSMIT_ENABLE, 0)
+        self.__timing.entered(self.STANDBY)
 
     def set_mode_receive(self, pi):
+        self.__timing.prepare(self.SHOCKBURST_RX)
         pi.write(self.POWER_UP, 1)
         pi.write(self.TRANSMIT_RECEIVE_CHIP_ENABLE, 1)
         pi.write(self.TRANSMIT_ENABLE, 0)
+        self.__timing.entered(self.SHOCKBURST_RX)
 
     def set_mode_transmit(self, pi):
+        self.__timing.prepare(self.SHOCKBURST_TX)
         pi.write(self.POWER_UP, 1)
         pi.write(self.TRANSMIT_RECEIVE_CHIP_ENABLE, 1)
         pi.write(self.TRANSMIT_ENABLE, 1)
+        self.__timing.entered(self.SHOCKBURST_TX)
+
+    def start_transmit(self, pi, airtime_us=0):
+        """ Sends the TX payload once.  TRX_CE is pulsed for the minimum
+        time by the pigpio daemon and the nRF905 goes back to standby by
+        itself when the packet has been sent.
+        airtime_us is the time the packet takes to send.  wait_settled()
+        and the next mode change, to any mode, wait for it, so that the
+        packet is not cut short and the TX registers are not written while
+        it is sent.
+        """
+        self.__timing.prepare(self.SHOCKBURST_TX)
+        pi.write(self.POWER_UP, 1)
+        pi.write(self.TRANSMIT_ENABLE, 1)
+        pi.gpio_trigger(self.TRANSMIT_RECEIVE_CHIP_ENABLE, self.TRX_CE_PULSE_US, 1)
+        self.__timing.entered(self.SHOCKBURST_TX)
+        if airtime_us > 0:
+            self.__timing.hold_us(self.STANDBY_TO_ACTIVE_US + airtime_us)
+
+    def wait_settled(self):
+        """ Waits until the last mode change has settled. """
+        self.__timing.wait_settled()
+
+    def get_timing(self):
+        """ Returns the Nrf905Timing instance. """
+        return self.__timing
 
     def set_callback(self, pi, pin, callback_function):
         # print("set_callback", pin)
@@ -99,6 +171,10 @@ TODO 17 and 18 are used by SPI1
         # PUD_OFF is used as this is what works with the nRF905 module.
         pi.set_mode(pin, pigpio.INPUT)
         pi.set_pull_up_down(pin, pigpio.PUD_OFF)
+        # Only one callback per pin, so setting it again replaces the last.
+        old_callback = self.__callback_dict.pop(pin, None)
+        if old_callback is not None:
+            old_callback.cancel()
         # Create callback object and store it for use by the cancel function.
         callback_obj = pi.callback(pin, pigpio.EITHER_EDGE, callback_function)
         self.__callback_dict[pin] = callback_obj
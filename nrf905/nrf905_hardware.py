@@ -1,28 +1,81 @@
 #!/usr/bin/env python3
 
-import Queue
+import queue
+import threading
 import pigpio
 from nrf905.nrf905_spi import Nrf905Spi
 from nrf905.nrf905_gpio import Nrf905Gpio
+from nrf905.nrf905_io_thread import Nrf905IoThread
+from nrf905.nrf905_packet import Nrf905Packet
+from nrf905.nrf905_tick_clock import Nrf905TickClock
 
 class Nrf905Hardware:
     """ Controls the nRF905 module.
     
     The nRF905 terms are used in this module.
+
+    All access to the SPI bus and the GPIO pins is done by one Nrf905IoThread
+    so the public functions can be called from any thread.  The DR callback
+    runs on the pigpio thread and only queues the read of the payload.
+
+    Received data is passed on as Nrf905Packet objects holding the pigpio
+    ticks of the DR edge and, if the pins are wired, the AM and CD edges.
+
+    If the AM pin is wired, the rising edge of AM pre-arms the receive path.
+    The read is queued for the I/O thread as soon as the address matches,
+    while the rest of the packet is still arriving.  The I/O thread prepares
+    the read command and waits for DR, so standby is set and the payload read
+    as soon as DR rises.  If AM falls without DR (e.g. a CRC failure) the
+    frame is counted as aborted, see get_aborted_count().  If DR rises with
+    no pre-armed read waiting, e.g. the AM edge was missed, the read is
+    queued by DR as it is when AM is not wired.
     """
 
     CRYSTAL_FREQUENCY_HZ = 16 * 1000 * 1000  # 16MHz is on the board I'm using.
+
+    # Longest time from AM to DR.  At 50kbps, a 32 byte payload and a 16 bit
+    # CRC take 5.44ms.
+    ADDRESS_MATCHED_TIMEOUT_S = 0.01
     
-    def __init__(self):
+    def __init__(self, executor=None, spi_bus=0, address_matched_wired=False,
+                 carrier_detect_wired=False, crc_bits=16, pi=None):
+        """ If executor is given, received packets are passed to the executor
+        instead of the RX queue.  See Nrf905Executor.
+        crc_bits is the CRC length set in the configuration register, used
+        to work out how long each packet is on air.
+        pi is the pigpio instance to use.  If None, one is created.  See
+        Nrf905ReplayPi for a stand-in used to load test the receive path.
+        """
         print("init")
-        self.__pi = pigpio.pi()
+        if pi is None:
+            pi = pigpio.pi()
+        self.__pi = pi
         self.__gpio = Nrf905Gpio(self.__pi)
-        self.__spi = Nrf905Spi(self.__pi)
-        self.__receive_queue = Queue.Queue()
+        self.__spi = Nrf905Spi(self.__pi, spi_bus)
+        self.__io = Nrf905IoThread(self.__pi)
+        self.__clock = Nrf905TickClock()
+        self.__receive_queue = queue.Queue()
+        self.__executor = executor
+        self.__address_matched_wired = address_matched_wired
+        self.__carrier_detect_wired = carrier_detect_wired
+        # Ticks of the last rising edges, set on the pigpio thread.
+        self.__address_matched_tick = None
+        self.__carrier_detect_tick = None
+        self.__data_ready_tick = None
+        # Set by DR, or by AM falling without DR, to wake a pre-armed read.
+        self.__data_ready = threading.Event()
+        # True from AM rising until the pre-armed read stops waiting for DR.
+        self.__read_pending = False
+        self.__aborted_count = 0
+        self.__airtime_us = self.__spi.get_transmit_airtime_us(crc_bits)
+        # The last W_TX_ADDRESS command sent, so it is only sent on a change.
+        self.__transmit_address_command = None
+        self.__profile = None
 
     def term(self):
         print("term")
-        self.__spi.term(self.__pi)
+        self.__io.stop()
+        self.__spi.close(self.__pi)
         self.__gpio.term(self.__pi)
         self.__pi.stop()
 
@@ -30,53 +83,203 @@ class Nrf905Hardware:
         """ Set up the nRF905 module in power down mode. """
         print("open")
         if self.__pi.connected:
-            self.__gpio.set_mode(self.__pi, Nrf905Gpio.POWER_DOWN)
-            self.__spi.open()
-            self.__receive_queue = 0  # Clear the queue. 
+            self.__io.start()
+            self.__io.call(self.__gpio.set_mode_power_down)
+            self.__io.call(self.__clock.calibrate)
+            self.__receive_queue = queue.Queue()  # Clear the queue.
         else:
             raise ProcessLookupError("Could not connect to pigpio daemon.")
 
     def transmit(self, data):
         """ Put into standby mode, write the data to be transmitted to the 
         nRF905 and set mode to transmit.
-        If the data given is too bit to be transmitted in one burst, the data
-        is split into burst sized chunks and transmitted until all the data has
-        been sent.
+        Returns a Future that is done when the transmission has started.
+        If data is longer than the TX payload width, nothing is sent and the
+        Future's result() raises ValueError.
         """
         print("transmit", data)
-        self.__gpio.set_mode(self.__pi, Nrf905Gpio.STANDBY)
-        # Write to registers
-        self.__gpio.set_mode(self.__pi, Nrf905Gpio.TRANSMIT)
+        return self.__io.submit(self.__transmit, data)
 
-    def data_ready_callback(self):
-        """ When data is ready, drop out of receive mode, read the data from 
-        the SPI RX register, go back into receive mode and finally write the 
-        data to the rx queue.
+    def prepare_transmit(self, data, address=None):
+        """ Returns a frame holding the SPI commands to send data to address,
+        or to the current TX address if address is None.  This does not use
+        the hardware so it can be called on any thread while the previous
+        frame is on air.  See transmit_prepared() and Nrf905TransmitPipeline.
+        Raises ValueError if data is longer than the TX payload width.
+        """
+        address_command = None
+        if address is not None:
+            address_command = self.__spi.prepare_transmit_address(address)
+        return (address_command, self.__spi.prepare_transmit_payload(data))
+
+    def transmit_prepared(self, frame):
+        """ Queues a frame made by prepare_transmit().  The frame is loaded
+        as soon as the previous packet has left the nRF905.
+        Returns a Future that is done when the transmission has started.
         """
-        print("drc")
-        self.__gpio.set_mode_standby(self.__pi)
-        data = self.__spi.read_rx_data(self.__pi)
-        self.__gpio.set_mode_receive(self.__pi)
-        for byte in data:
-            self.__receive_queue.put(byte)
-        print(data)
+        return self.__io.submit(self.__transmit_prepared, frame)
+
+    def get_airtime_us(self):
+        """ Returns the time one packet takes to send. """
+        return self.__airtime_us
+
+    def switch_profile(self, profile):
+        """ Switches to the settings of an Nrf905Profile.  Only the
+        configuration register bytes that differ from the active ones are
+        written, in a single transfer, and the TX address only if it
+        changes.  The device is put back into receive mode if it was
+        receiving.  A packet on air during the switch is lost.
+        Returns a Future that is done when the switch is complete.
+        """
+        return self.__io.submit(self.__switch_profile, profile)
+
+    def get_profile(self):
+        """ Returns the last profile switched to, or None. """
+        return self.__profile
+
+    def data_ready_callback(self, gpio, level, tick):
+        """ Called by pigpio on each DR edge.  The read is queued for the I/O
+        thread so the pigpio thread never uses the SPI bus.  The nRF905 only
+        holds one payload so reads queued together are done once.
+        """
+        if level == 1:
+            if self.__address_matched_wired and self.__read_pending:
+                # The read was queued when the address matched.
+                self.__data_ready_tick = tick
+                self.__data_ready.set()
+            else:
+                # No AM edge was seen, or the pre-armed read gave up.
+                self.__io.submit(self.__read_receive_data, tick, coalesce="read")
+
+    def address_matched_callback(self, gpio, level, tick):
+        """ Called by pigpio on each AM edge.  A rising edge pre-arms the
+        read.  A falling edge without DR means the frame was aborted.
+        """
+        if level == 1:
+            self.__address_matched_tick = tick
+            self.__data_ready_tick = None
+            self.__data_ready.clear()
+            self.__read_pending = True
+            self.__io.submit(self.__read_when_ready, coalesce="read")
+        elif self.__data_ready_tick is None:
+            self.__aborted_count += 1
+            self.__data_ready.set()
+
+    def get_aborted_count(self):
+        """ Returns the number of frames where AM fell without DR. """
+        return self.__aborted_count
+
+    def carrier_detect_callback(self, gpio, level, tick):
+        """ Called by pigpio on each CD edge. """
+        if level == 1:
+            self.__carrier_detect_tick = tick
+
+    def get_clock(self):
+        """ Returns the Nrf905TickClock used to time stamp packets. """
+        return self.__clock
 
     def receive(self, address):
+        """ Returns a Future that is done when the device is receiving. """
         print("receive", address)
-        self.__gpio.set_mode(self.__pi, Nrf905Gpio.STANDBY)
-        self.__gpio.set_data_ready_callback(self.__pi, self.data_ready_callback)
-        # Send data to registers for receive.
-        self.__spi.set_address(self.__pi, address)
-        self.__gpio.set_mode(self.__pi, Nrf905Gpio.RECEIVE)
+        return self.__io.submit(self.__receive, address)
 
     def get_receive_data(self):
         """ Returns a list of all bytes in the RX queue.  If the queue is empty,
         returns empty list.
         """
         result = []
-        if len(self.__receive_queue) > 0:
-            while not self.__receive_queue.empty():
-                byte = self.__receive_queue.get()
-                result.append(byte)
+        for packet in self.get_receive_packets():
+            result.extend(packet.data)
         return result
 
+    def get_receive_packets(self):
+        """ Returns a list of all packets in the RX queue.  If the queue is
+        empty, returns empty list.
+        """
+        result = []
+        while not self.__receive_queue.empty():
+            result.append(self.__receive_queue.get())
+        return result
+
+    def __transmit(self, pi, data):
+        self.__transmit_prepared(pi, self.prepare_transmit(data))
+
+    def __transmit_prepared(self, pi, frame):
+        (address_command, payload_command) = frame
+        # The TX registers cannot be written while a packet is being sent.
+        self.__gpio.wait_settled()
+        if self.__gpio.get_timing().get_mode() not in (Nrf905Gpio.STANDBY, Nrf905Gpio.SHOCKBURST_TX):
+            self.__gpio.set_mode_standby(pi)
+        # The commands are written while standby settles.  start_transmit()
+        # waits for whatever is left of the settling time.
+        if address_command is not None and address_command != self.__transmit_address_command:
+            self.__spi.write_command(pi, address_command)
+            self.__transmit_address_command = address_command
+        self.__spi.write_command(pi, payload_command)
+        self.__gpio.start_transmit(pi, self.__airtime_us)
+
+    def __switch_profile(self, pi, profile):
+        # The registers cannot be written while a packet is being sent or
+        # outside of the low power modes.
+        self.__gpio.wait_settled()
+        mode = self.__gpio.get_timing().get_mode()
+        if mode in (Nrf905Gpio.SHOCKBURST_RX, Nrf905Gpio.SHOCKBURST_TX):
+            self.__gpio.set_mode_standby(pi)
+        self.__spi.write_configuration(pi, profile.get_image())
+        address_command = profile.get_transmit_address_command()
+        if address_command is not None and address_command != self.__transmit_address_command:
+            self.__spi.write_command(pi, address_command)
+            self.__transmit_address_command = address_command
+        self.__airtime_us = self.__spi.get_transmit_airtime_us(profile.get_crc_bits())
+        self.__profile = profile
+        if mode == Nrf905Gpio.SHOCKBURST_RX:
+            self.__gpio.set_mode_receive(pi)
+
+    def __read_when_ready(self, pi):
+        """ Pre-armed read, queued when the address matched.  Waits for DR
+        and reads the payload straight away.
+        """
+        self.__spi.prepare_receive_payload()
+        self.__data_ready.wait(self.ADDRESS_MATCHED_TIMEOUT_S)
+        # From here a DR edge queues a read of its own.
+        self.__read_pending = False
+        tick = self.__data_ready_tick
+        if tick is not None:
+            self.__read_receive_data(pi, tick)
+
+    def __read_receive_data(self, pi, tick):
+        """ When data is ready, drop out of receive mode, read the data from 
+        the SPI RX register, go back into receive mode and finally write the 
+        packet to the rx queue.
+        """
+        self.__gpio.set_mode_standby(pi)
+        data = self.__spi.read_receive_payload(pi)
+        self.__gpio.set_mode_receive(pi)
+        packet = Nrf905Packet(data, tick, self.__address_matched_tick,
+                              self.__carrier_detect_tick)
+        self.__address_matched_tick = None
+        self.__carrier_detect_tick = None
+        if self.__clock.needs_calibration(tick):
+            self.__clock.calibrate(pi)
+        packet.time = self.__clock.to_time(tick)
+        if self.__executor is not None:
+            # Hand over and return straight away so that the next DR edge is
+            # not delayed by the user's handlers.
+            self.__executor.submit(packet)
+        else:
+            self.__receive_queue.put(packet)
+
+    def __receive(self, pi, address):
+        # A packet still on air must not be cut short.
+        self.__gpio.wait_settled()
+        self.__gpio.set_mode_standby(pi)
+        self.__gpio.set_callback(pi, Nrf905Gpio.DATA_READY, self.data_ready_callback)
+        if self.__address_matched_wired:
+            self.__gpio.set_callback(pi, Nrf905Gpio.ADDRESS_MATCHED,
+                                     self.address_matched_callback)
+        if self.__carrier_detect_wired:
+            self.__gpio.set_callback(pi, Nrf905Gpio.CARRIER_DETECT,
+                                     self.carrier_detect_callback)
+        # Send data to registers for receive.
+        self.__spi.write_receive_address(pi, address)
+        self.__gpio.set_mode_receive(pi)
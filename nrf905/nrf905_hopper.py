@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import random
+
+
+class Nrf905Hopper:
+    """ Frequency hopping for a transmitter/receiver pair.
+
+    Both ends create a hopper with the same list of channels and the same
+    seed.  This gives both ends the same pseudo random hop sequence.  After
+    every hop_every packets, each end moves to the next channel in the
+    sequence using the CHANNEL_CONFIG instruction.
+
+    If the two ends lose step, the sequence index can be shared (e.g. in a
+    packet) and passed to sync().
+
+    The device must be in standby mode when hop() is called.  The caller is
+    responsible for putting the device back into receive or transmit mode.
+
+    This module does not own the pigpio instance so all functions need the
+    instance passed in.
+    """
+
+    def __init__(self, spi, channels, seed, hop_every=1, hfreq_pll=0, pa_pwr=0):
+        if len(channels) == 0:
+            raise ValueError("channels must not be empty")
+        if hop_every < 1:
+            raise ValueError("hop_every must be 1 or more")
+        self.__spi = spi
+        self.__hfreq_pll = hfreq_pll
+        self.__pa_pwr = pa_pwr
+        self.__hop_every = hop_every
+        self.__sequence = list(channels)
+        random.Random(seed).shuffle(self.__sequence)
+        self.__index = 0
+        self.__packet_count = 0
+
+    def get_channel(self):
+        """ Returns the channel currently in use. """
+        return self.__sequence[self.__index]
+
+    def get_index(self):
+        """ Returns the position in the hop sequence. """
+        return self.__index
+
+    def get_sequence(self):
+        """ Returns a copy of the hop sequence. """
+        return list(self.__sequence)
+
+    def start(self, pi):
+        """ Sets the device to the first channel of the sequence. """
+        self.sync(pi, 0)
+
+    def sync(self, pi, index):
+        """ Jumps to the given position in the hop sequence. """
+        self.__index = index % len(self.__sequence)
+        self.__packet_count = 0
+        self.__set_channel(pi)
+
+    def hop(self, pi):
+        """ Moves to the next channel in the hop sequence. """
+        self.__index = (self.__index + 1) % len(self.__sequence)
+        self.__packet_count = 0
+        self.__set_channel(pi)
+
+    def packet_done(self, pi):
+        """ Call after each packet is sent or received.
+        Returns True if the channel was changed.
+        """
+        self.__packet_count += 1
+        hopped = False
+        if self.__packet_count >= self.__hop_every:
+            self.hop(pi)
+            hopped = True
+        return hopped
+
+    def __set_channel(self, pi):
+        self.__spi.set_channel_config(pi, self.get_channel(),
+                                      self.__hfreq_pll, self.__pa_pwr)
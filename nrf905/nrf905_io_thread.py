@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import concurrent.futures
+import queue
+import threading
+
+
+class Nrf905IoThread:
+    """ A single thread that does all access to the nRF905.
+
+    The nRF905 needs its SPI instructions and mode changes done in order, so
+    only this thread uses the pigpio instance for the SPI handle and pins.
+    Any other thread, including the pigpio callback thread, calls submit()
+    which puts the command on a queue and returns a Future straight away.
+    There is no lock around the hardware, the queue is the only point where
+    threads meet.
+
+    The thread waits for a command and then takes every other command that
+    is already queued, up to batch_max, and runs them in order.  Commands
+    submitted with a coalesce key replace any earlier command with the same
+    key in the batch, e.g. several channel changes queued together only
+    change the channel once.  The Futures of the replaced commands get the
+    result of the command that ran.
+
+    Commands are called as function(pi, *args) so that the Nrf905Gpio and
+    Nrf905Spi methods can be submitted directly.
+    """
+
+    def __init__(self, pi, batch_max=16):
+        if batch_max < 1:
+            raise ValueError("batch_max must be 1 or more")
+        self.__pi = pi
+        self.__batch_max = batch_max
+        self.__commands = queue.SimpleQueue()
+        self.__thread = None
+        self.__command_count = 0
+        self.__batch_count = 0
+        self.__coalesced_count = 0
+
+    def start(self):
+        if self.__thread is not None:
+            return
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """ Stops the thread once the commands already queued have run. """
+        if self.__thread is None:
+            return
+        self.__commands.put(None)
+        self.__thread.join()
+        self.__thread = None
+
+    def submit(self, function, *args, coalesce=None):
+        """ Queues function(pi, *args) to run on the I/O thread.
+        Returns a concurrent.futures.Future for the result.
+        """
+        future = concurrent.futures.Future()
+        self.__commands.put((function, args, coalesce, future))
+        return future
+
+    def call(self, function, *args):
+        """ Runs function(pi, *args) on the I/O thread and returns the result.
+        If called on the I/O thread, the function is run straight away.
+        """
+        if threading.current_thread() is self.__thread:
+            return function(self.__pi, *args)
+        return self.submit(function, *args).result()
+
+    def is_io_thread(self):
+        return threading.current_thread() is self.__thread
+
+    def get_stats(self):
+        """ Returns a tuple of (commands run, batches, commands coalesced). """
+        return (self.__command_count, self.__batch_count, self.__coalesced_count)
+
+    def __run(self):
+        running = True
+        while running:
+            batch = [self.__commands.get()]
+            while len(batch) < self.__batch_max:
+                try:
+                    batch.append(self.__commands.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                # Run what came before the stop request, then stop.
+                batch = batch[:batch.index(None)]
+                running = False
+            self.__run_batch(batch)
+
+    def __run_batch(self, batch):
+        # Find the last command for each coalesce key.
+        last = dict()
+        for (index, command) in enumerate(batch):
+            if command[2] is not None:
+                last[command[2]] = index
+        replaced = dict()
+        for (index, (function, args, coalesce, future)) in enumerate(batch):
+            if coalesce is not None and last[coalesce] != index:
+                replaced.setdefault(coalesce, []).append(future)
+                self.__coalesced_count += 1
+                continue
+            futures = [future] + replaced.pop(coalesce, [])
+            futures = [item for item in futures if item.set_running_or_notify_cancel()]
+            if not futures:
+                continue
+            try:
+                result = function(self.__pi, *args)
+            except Exception as error:
+                for item in futures:
+                    item.set_exception(error)
+            else:
+                for item in futures:
+                    item.set_result(result)
+            self.__command_count += 1
+        if batch:
+            self.__batch_count += 1
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+
+class Nrf905Packet:
+    """ A received packet and the times of the edges that went with it.
+
+    The ticks are pigpio ticks, microseconds wrapping at 32 bits, taken by
+    the pigpio daemon when the edge happened, so they do not depend on how
+    late Python gets to the packet.
+        dr_tick     Rising edge of DR, the packet is complete.
+        am_tick     Rising edge of AM, the address matched.  None if the AM
+                    pin is not used.
+        cd_tick     Rising edge of CD, the carrier was detected.  None if the
+                    CD pin is not used.
+    time is the wall clock time of the DR edge in seconds since the epoch,
+    see Nrf905TickClock.
+    """
+
+    __slots__ = ("data", "dr_tick", "am_tick", "cd_tick", "time")
+
+    def __init__(self, data, dr_tick, am_tick=None, cd_tick=None, time=None):
+        self.data = data
+        self.dr_tick = dr_tick
+        self.am_tick = am_tick
+        self.cd_tick = cd_tick
+        self.time = time
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return "Nrf905Packet(%r, dr_tick=%r, am_tick=%r, cd_tick=%r, time=%r)" % (
+            bytes(self.data), self.dr_tick, self.am_tick, self.cd_tick, self.time)
+
+    def get_time_us(self):
+        """ Returns time as integer microseconds, or None if not known. """
+        if self.time is None:
+            return None
+        return int(self.time * 1000000)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import json
+
+from nrf905.nrf905_spi import Nrf905Spi
+
+
+class Nrf905Profile:
+    """ A named set of radio settings.
+
+    The settings are checked and encoded once, when the profile is made,
+    into the 10 byte configuration register image and the W_TX_ADDRESS
+    command, so switching to the profile is only SPI writes.  See
+    Nrf905Hardware.switch_profile(), which writes only the bytes that
+    differ from the active image.
+
+    address_width and payload_width are used for both RX and TX.  The data
+    sheet allows address widths of 1 and 4 bytes.  pa_pwr is 0 to 3 for
+    -10dBm, -2dBm, 6dBm and 10dBm.  If tx_address is None, the TX address
+    is left as it is.
+    """
+
+    CRC_BITS = (0, 8, 16)
+    ADDRESS_WIDTHS = (1, 4)
+    PA_PWR_MAX = 3
+    # XOF is 16MHz, UP_CLK_EN = 0, UP_CLK_FREQ = 00.
+    BYTE_9 = 0b00011000
+
+    def __init__(self, name, frequency_mhz, rx_address, tx_address=None, address_width=4,
+                 payload_width=32, crc_bits=16, pa_pwr=0, rx_red_pwr=False,
+                 auto_retran=False):
+        if crc_bits not in self.CRC_BITS:
+            raise ValueError("crc_bits must be one of 0, 8, 16")
+        if address_width not in self.ADDRESS_WIDTHS:
+            raise ValueError("address_width must be 1 or 4")
+        if payload_width < 1 or payload_width > 32:
+            raise ValueError("payload_width must be in the range 1 to 32")
+        if pa_pwr < 0 or pa_pwr > self.PA_PWR_MAX:
+            raise ValueError("pa_pwr must be in the range 0 to 3")
+        address_max = (1 << (8 * address_width)) - 1
+        for address in (rx_address, tx_address):
+            if address is not None and (address < 0 or address > address_max):
+                raise ValueError("Address out of range")
+        # Raises ValueError if the frequency cannot be reached.
+        (channel, hfreq_pll) = Nrf905Spi.frequency_to_channel(frequency_mhz)
+        self.__name = name
+        self.__frequency_mhz = Nrf905Spi.channel_to_frequency(channel, hfreq_pll)
+        self.__rx_address = rx_address
+        self.__tx_address = tx_address
+        self.__payload_width = payload_width
+        self.__crc_bits = crc_bits
+        byte_1 = channel >> 8
+        byte_1 |= hfreq_pll << 1
+        byte_1 |= pa_pwr << 2
+        if rx_red_pwr:
+            byte_1 |= 0b00010000
+        if auto_retran:
+            byte_1 |= 0b00100000
+        byte_9 = self.BYTE_9
+        if crc_bits == 8:
+            byte_9 |= 0b01000000
+        if crc_bits == 16:
+            byte_9 |= 0b11000000
+        # Multi-byte values are sent LSB first.  Unused address bytes are 0.
+        self.__image = (bytes([channel & 0xff, byte_1, (address_width << 4) | address_width,
+                               payload_width, payload_width]) +
+                        rx_address.to_bytes(4, "little") + bytes([byte_9]))
+        self.__transmit_address_command = None
+        if tx_address is not None:
+            self.__transmit_address_command = (
+                bytes([Nrf905Spi.INSTRUCTION_W_TX_ADDRESS]) +
+                tx_address.to_bytes(4, "little")[:address_width])
+
+    def get_name(self):
+        return self.__name
+
+    def get_frequency_mhz(self):
+        """ Returns the frequency the nRF905 is tuned to, which is the
+        nearest channel to the frequency given.
+        """
+        return self.__frequency_mhz
+
+    def get_rx_address(self):
+        return self.__rx_address
+
+    def get_tx_address(self):
+        return self.__tx_address
+
+    def get_payload_width(self):
+        return self.__payload_width
+
+    def get_crc_bits(self):
+        return self.__crc_bits
+
+    def get_image(self):
+        """ Returns the configuration register image. """
+        return self.__image
+
+    def get_transmit_address_command(self):
+        """ Returns the W_TX_ADDRESS command, or None if there is no TX
+        address.
+        """
+        return self.__transmit_address_command
+
+
+class Nrf905Profiles:
+    """ Profiles by name, e.g. loaded from a file at start up.
+
+    The file is JSON, an object of profile name: settings, where the
+    settings are the Nrf905Profile arguments.  Addresses can be numbers or
+    strings such as "0xe7e7e7e7".
+        {
+            "day": {"frequency_mhz": 433.2, "rx_address": "0xe7e7e7e7",
+                    "tx_address": "0x5a5a5a5a", "pa_pwr": 3},
+            "night": {"frequency_mhz": 433.7, "rx_address": "0xe7e7e7e7",
+                      "crc_bits": 8}
+        }
+    """
+
+    ADDRESS_KEYS = ("rx_address", "tx_address")
+
+    def __init__(self, profiles=()):
+        # Key is the name, value is the profile.
+        self.__profiles = dict()
+        for profile in profiles:
+            self.add(profile)
+
+    def add(self, profile):
+        """ Adds profile, replacing any profile with the same name. """
+        self.__profiles[profile.get_name()] = profile
+
+    def get(self, name):
+        """ Raises ValueError if there is no profile called name. """
+        profile = self.__profiles.get(name)
+        if profile is None:
+            raise ValueError("No profile called " + str(name))
+        return profile
+
+    def get_names(self):
+        return list(self.__profiles)
+
+    def load(self, path):
+        """ Adds the profiles in the file at path.  Every profile is checked
+        before any is added.
+        Raises ValueError if any profile is not valid.
+        """
+        with open(path) as file:
+            settings = json.load(file)
+        if not isinstance(settings, dict):
+            raise ValueError("Profile file must hold an object of name: settings")
+        profiles = []
+        for (name, values) in settings.items():
+            try:
+                values = dict(values)
+                for key in self.ADDRESS_KEYS:
+                    if isinstance(values.get(key), str):
+                        values[key] = int(values[key], 0)
+                profiles.append(Nrf905Profile(name, **values))
+            except (TypeError, ValueError) as error:
+                raise ValueError("Profile " + name + ": " + str(error))
+        for profile in profiles:
+            self.add(profile)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+import queue
+import struct
+import threading
+import time
+
+from nrf905.nrf905_frame import Nrf905Frame
+
+
+class Nrf905Relay:
+    """ Store and forward relay for nodes out of range of each other.
+
+    Relayed frames are Nrf905Frame frames of RELAY_TYPE.  The frame source
+    is the node that first sent the frame and the data starts with:
+        Byte    Field
+        0-3     Destination address
+        4-7     Address of the node that last sent the frame
+        8       Hops taken so far
+    followed by the message.  The nRF905 TX address of each hop is the next
+    node on the route, so only that node picks the frame up.
+
+    Routes are kept in a dictionary indexed by destination, giving the next
+    hop and the number of hops.  Routes can be added with add_route() and
+    are learnt from the relayed frames that pass through: a frame from
+    origin that arrived from last_hop after n hops means origin can be
+    reached through last_hop in n + 1 hops.  Learnt routes are replaced by
+    shorter ones and forgotten after route_timeout_s without traffic.
+
+    An instance is the handler for received frames, e.g. the Nrf905Executor
+    handler or the Nrf905.open() callback.  Frames for this node are passed
+    to handler(origin, message) with message a memoryview.  Other frames
+    are passed on to handler_other(data) if given.  Frames for other nodes
+    have their last hop and hop count changed in place, in the received
+    buffer, and are queued for the forwarding thread, which passes them to
+    transmit_function(data, next_hop), e.g. Nrf905TransmitPipeline.send.
+    The queue holds queue_size frames.  When it is full, frames to forward
+    are dropped and counted, and send() refuses new messages, so a busy
+    relay does not take on more than it can pass on.  Frames that have
+    taken hop_limit hops are dropped.
+    """
+
+    RELAY_TYPE = 0xfd
+    RELAY = struct.Struct("<IIB")
+    ROUTE_TIMEOUT_S = 300.0
+
+    def __init__(self, address, transmit_function, handler, handler_other=None,
+                 hop_limit=4, queue_size=64, route_timeout_s=ROUTE_TIMEOUT_S):
+        if hop_limit < 1 or hop_limit > 255:
+            raise ValueError("hop_limit must be in the range 1 to 255")
+        if queue_size < 1:
+            raise ValueError("queue_size must be 1 or more")
+        self.__address = address
+        self.__transmit_function = transmit_function
+        self.__handler = handler
+        self.__handler_other = handler_other
+        self.__hop_limit = hop_limit
+        self.__route_timeout_s = route_timeout_s
+        self.__frame = Nrf905Frame()
+        self.__offset = Nrf905Frame.HEADER.size
+        self.__message_offset = self.__offset + self.RELAY.size
+        # Key is the destination, value is the route.
+        self.__routes = dict()
+        self.__queue = queue.Queue(queue_size)
+        self.__thread = None
+        self.__sequence = 0
+        self.__delivered_count = 0
+        self.__forwarded_count = 0
+        self.__full_count = 0
+        self.__no_route_count = 0
+        self.__hop_limit_count = 0
+
+    def get_message_max(self):
+        """ Returns the longest message that fits in one relayed frame. """
+        return self.__frame.get_data_max() - self.RELAY.size
+
+    def add_route(self, destination, next_hop, hops=1):
+        """ Adds a route that is never forgotten or replaced by learning. """
+        self.__routes[destination] = Nrf905RelayRoute(next_hop, hops, None)
+
+    def remove_route(self, destination):
+        """ Returns True if there was a route to destination. """
+        return self.__routes.pop(destination, None) is not None
+
+    def get_route(self, destination):
+        """ Returns a tuple of (next_hop, hops) or None if there is no route. """
+        route = self.__lookup(destination)
+        if route is None:
+            return None
+        return (route.next_hop, route.hops)
+
+    def get_routes(self):
+        """ Returns a dictionary of destination: (next_hop, hops). """
+        return {destination: (route.next_hop, route.hops)
+                for (destination, route) in list(self.__routes.items())
+                if self.__lookup(destination) is not None}
+
+    def start(self):
+        if self.__thread is not None:
+            return
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """ Stops the thread once the frames already queued are passed on. """
+        if self.__thread is None:
+            return
+        self.__queue.put(None)
+        self.__thread.join()
+        self.__thread = None
+
+    def send(self, destination, message):
+        """ Queues message for destination.
+        Returns False if there is no route or the queue is full.
+        Raises ValueError if message is too long.
+        """
+        if len(message) > self.get_message_max():
+            raise ValueError("message too long")
+        route = self.__lookup(destination)
+        if route is None:
+            self.__no_route_count += 1
+            return False
+        data = self.RELAY.pack(destination, self.__address, 0) + bytes(message)
+        frame = bytearray(self.__frame.pack(self.RELAY_TYPE, self.__address,
+                                            self.__sequence, data))
+        self.__sequence = (self.__sequence + 1) & 0xffff
+        return self.__enqueue(frame, route.next_hop)
+
+    def __call__(self, data):
+        """ Handles one received frame, bytes or an Nrf905Packet.
+        Returns True if the frame was delivered or forwarded.
+        """
+        data = getattr(data, "data", data)
+        if (len(data) < self.__message_offset or data[0] != self.RELAY_TYPE or
+                data[5] != Nrf905Frame.VERSION):
+            if self.__handler_other is not None:
+                self.__handler_other(data)
+            return False
+        (message_type, origin, version, flags, sequence,
+         length) = Nrf905Frame.HEADER.unpack_from(data)
+        (destination, last_hop, hops) = self.RELAY.unpack_from(data, self.__offset)
+        self.__learn(origin, last_hop, hops)
+        if destination == self.__address:
+            end = self.__offset + min(length, len(data) - self.__offset)
+            self.__delivered_count += 1
+            self.__handler(origin, memoryview(data)[self.__message_offset:end])
+            return True
+        if hops + 1 >= self.__hop_limit:
+            self.__hop_limit_count += 1
+            return False
+        route = self.__lookup(destination)
+        if route is None:
+            self.__no_route_count += 1
+            return False
+        if memoryview(data).readonly:
+            # Only a read only buffer has to be copied.
+            data = bytearray(data)
+        self.RELAY.pack_into(data, self.__offset, destination, self.__address, hops + 1)
+        return self.__enqueue(data, route.next_hop)
+
+    def get_queue_depth(self):
+        return self.__queue.qsize()
+
+    def get_stats(self):
+        """ Returns a tuple of (frames delivered here, frames passed to
+        transmit_function, dropped because the queue was full, dropped for
+        want of a route, dropped at the hop limit).
+        """
+        return (self.__delivered_count, self.__forwarded_count, self.__full_count,
+                self.__no_route_count, self.__hop_limit_count)
+
+    def __learn(self, origin, last_hop, hops):
+        now = time.monotonic()
+        self.__update_route(last_hop, last_hop, 1, now)
+        if origin != last_hop:
+            self.__update_route(origin, last_hop, hops + 1, now)
+
+    def __update_route(self, destination, next_hop, hops, now):
+        if destination == self.__address:
+            return
+        route = self.__lookup(destination)
+        if route is None or (route.updated is not None and
+                             (hops < route.hops or route.next_hop == next_hop)):
+            self.__routes[destination] = Nrf905RelayRoute(next_hop, hops, now)
+
+    def __lookup(self, destination):
+        route = self.__routes.get(destination)
+        if route is not None and route.updated is not None:
+            if time.monotonic() - route.updated > self.__route_timeout_s:
+                self.__routes.pop(destination, None)
+                route = None
+        return route
+
+    def __enqueue(self, data, next_hop):
+        try:
+            self.__queue.put_nowait((data, next_hop))
+        except queue.Full:
+            self.__full_count += 1
+            return False
+        return True
+
+    def __run(self):
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                break
+            (data, next_hop) = item
+            self.__transmit_function(data, next_hop)
+            self.__forwarded_count += 1
+
+
+class Nrf905RelayRoute:
+    """ The next hop towards a destination.  updated is the time the route
+    was last learnt, or None for a route that was added.
+    """
+
+    __slots__ = ("next_hop", "hops", "updated")
+
+    def __init__(self, next_hop, hops, updated):
+        self.next_hop = next_hop
+        self.hops = hops
+        self.updated = updated
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+
+import math
+import os
+import tempfile
+import threading
+import time
+
+import numpy
+
+from nrf905.nrf905_capture import Nrf905Capture, Nrf905CaptureAnalyzer, Nrf905CaptureWriter
+from nrf905.nrf905_executor import Nrf905Executor
+from nrf905.nrf905_frame import Nrf905Frame
+from nrf905.nrf905_gpio import Nrf905Gpio
+from nrf905.nrf905_hardware import Nrf905Hardware
+from nrf905.nrf905_spi import Nrf905Spi
+
+
+class Nrf905ReplayPi:
+    """ An in-memory stand-in for pigpio.pi that plays frames into the
+    receive path.
+
+    It answers the calls Nrf905Hardware makes.  inject() loads a payload and
+    calls the DR callbacks with a rising edge, from the calling thread, the
+    same as the pigpio callback thread would.  R_RX_PAYLOAD transfers return
+    the payload.  Like the nRF905 it holds one payload, so a payload that is
+    replaced before it was read is lost and counted as an overrun.
+
+    Ticks are the local clock in microseconds, wrapped to 32 bits.
+    """
+
+    connected = True
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__callbacks = []
+        self.__levels = dict()
+        self.__payload = None
+        self.__injected_count = 0
+        self.__overrun_count = 0
+        self.__read_count = 0
+
+    def get_current_tick(self):
+        return (time.perf_counter_ns() // 1000) & 0xffffffff
+
+    def get_hardware_revision(self):
+        return 2
+
+    def stop(self):
+        pass
+
+    def set_mode(self, gpio, mode):
+        pass
+
+    def set_pull_up_down(self, gpio, pud):
+        pass
+
+    def write(self, gpio, level):
+        self.__levels[gpio] = level
+
+    def read(self, gpio):
+        return self.__levels.get(gpio, 0)
+
+    def gpio_trigger(self, gpio, pulse_len, level):
+        pass
+
+    def callback(self, gpio, edge, function):
+        callback = _ReplayCallback(self.__callbacks, gpio, function)
+        self.__callbacks.append(callback)
+        return callback
+
+    def get_callback_count(self, gpio):
+        """ Returns the number of callbacks set on gpio. """
+        return len([callback for callback in self.__callbacks if callback.gpio == gpio])
+
+    def spi_open(self, spi_channel, baud, spi_flags):
+        return 0
+
+    def spi_close(self, handle):
+        pass
+
+    def spi_write(self, handle, data):
+        return len(data)
+
+    def spi_xfer(self, handle, data):
+        result = bytearray(len(data))
+        if data[0] == Nrf905Spi.INSTRUCTION_R_RX_PAYLOAD:
+            with self.__lock:
+                payload = self.__payload
+                self.__payload = None
+            if payload is not None:
+                self.__read_count += 1
+                length = min(len(payload), len(data) - 1)
+                result[1:length + 1] = payload[:length]
+        return (len(data), result)
+
+    def inject(self, payload, tick=None):
+        """ Loads payload and raises DR. """
+        if tick is None:
+            tick = self.get_current_tick()
+        # The payload and the edge change together, so a read never sees a
+        # payload before its DR edge.
+        with self.__lock:
+            if self.__payload is not None:
+                self.__overrun_count += 1
+            self.__payload = payload
+            self.__injected_count += 1
+            for callback in list(self.__callbacks):
+                if callback.gpio == Nrf905Gpio.DATA_READY:
+                    callback.function(callback.gpio, 1, tick)
+
+    def get_stats(self):
+        """ Returns a tuple of (payloads injected, payloads read, payloads
+        lost because the next one arrived before they were read).
+        """
+        return (self.__injected_count, self.__read_count, self.__overrun_count)
+
+
+class _ReplayCallback:
+
+    def __init__(self, callbacks, gpio, function):
+        self.__callbacks = callbacks
+        self.gpio = gpio
+        self.function = function
+
+    def cancel(self):
+        if self in self.__callbacks:
+            self.__callbacks.remove(self)
+
+
+class Nrf905LoadGenerator:
+    """ Measures how fast the receive path can take packets.
+
+    Frames are played into a real Nrf905Hardware, I/O thread and
+    Nrf905Executor through an Nrf905ReplayPi, at a fixed rate or at the
+    times recorded in a capture file, sped up by any factor.  handler is
+    called for each delivered packet, so the cost of the real processing
+    is included.
+
+    run() returns a dictionary of:
+        injected        Frames played in
+        delivered       Frames that reached the handler intact
+        invalid         Packets that reached the handler but did not match
+                        a frame, e.g. read after the payload was replaced
+        overrun         Frames replaced before the I/O thread read them
+        dropped         Packets dropped by the executor
+        queue_depth_max Deepest executor lane seen
+        offered_hz      Rate frames were played in
+        delivered_hz    Rate packets were delivered
+        latency_us      Dictionary of percentile: DR edge to handler
+                        latency, from Nrf905CaptureAnalyzer
+    If capture_path is given, a capture record is written for each frame,
+    as DROPPED if it was not delivered, for use with nrf905-analyze.py.
+    """
+
+    ADDRESS = 0x5a5a5a5a
+    # Time allowed after the last frame for the packets to be delivered.
+    SETTLE_S = 0.2
+
+    def __init__(self, handler=None, workers=2, queue_size=64,
+                 policy=Nrf905Executor.DROP_NEWEST, address_matched_wired=False):
+        self.__handler = handler
+        self.__workers = workers
+        self.__queue_size = queue_size
+        self.__policy = policy
+        self.__address_matched_wired = address_matched_wired
+        self.__frame = Nrf905Frame()
+
+    def synthetic_frames(self, count, sources=8, length=16):
+        """ Returns count frames from sources sources, in turn. """
+        data = bytes(length)
+        frames = []
+        for index in range(count):
+            frames.append(bytes(self.__frame.pack(1, index % sources, index // sources, data)))
+        return frames
+
+    def capture_frames(self, path):
+        """ Returns a tuple of (frames, times_us) rebuilt from the received
+        packets in a capture file, with each frame's source, sequence and
+        length taken from the record.
+        """
+        records = Nrf905CaptureAnalyzer(path).get_records()
+        records = records[(records["direction"] == Nrf905Capture.RECEIVE) &
+                          (records["status"] == Nrf905Capture.OK)]
+        data_max = self.__frame.get_data_max()
+        frames = [bytes(self.__frame.pack(1, int(record["address"]), int(record["sequence"]),
+                                          bytes(min(int(record["length"]), data_max))))
+                  for record in records]
+        times_us = records["time_us"] - records["time_us"][0] if len(records) else records["time_us"]
+        return (frames, numpy.asarray(times_us, dtype=numpy.int64))
+
+    def run(self, frames, rate_hz=None, times_us=None, speedup=1.0, capture_path=None):
+        """ Plays frames at rate_hz, or at times_us (microseconds from the
+        first frame) divided by speedup.  Returns the results, see above.
+        """
+        if times_us is None:
+            if not rate_hz or rate_hz <= 0:
+                raise ValueError("rate_hz must be positive")
+            offsets = numpy.arange(len(frames)) / rate_hz
+        else:
+            if len(times_us) != len(frames):
+                raise ValueError("times_us must have one time per frame")
+            if speedup <= 0:
+                raise ValueError("speedup must be positive")
+            offsets = numpy.asarray(times_us, dtype=numpy.float64) / 1000000 / speedup
+        pi = Nrf905ReplayPi()
+        delivered = []
+        executor = Nrf905Executor(self.__delivered(pi, delivered), self.__workers,
+                                  self.__queue_size, self.__policy)
+        hardware = Nrf905Hardware(executor, pi=pi,
+                                  address_matched_wired=self.__address_matched_wired)
+        executor.start()
+        hardware.open()
+        hardware.receive(self.ADDRESS).result()
+        injected_ticks = []
+        depth_max = 0
+        start = time.perf_counter()
+        for (offset, frame) in zip(offsets.tolist(), frames):
+            # Sleep rather than spin so the I/O thread is not kept from the
+            # GIL.  Frames that are late are played straight away.
+            wait_s = start + offset - time.perf_counter()
+            if wait_s > 0:
+                time.sleep(wait_s)
+            tick = pi.get_current_tick()
+            injected_ticks.append(tick)
+            if self.__address_matched_wired:
+                # Without the AM edge the pre-armed read never starts.
+                hardware.address_matched_callback(Nrf905Gpio.ADDRESS_MATCHED, 1, tick)
+            pi.inject(frame, tick)
+            depth_max = max(depth_max, max(executor.get_queue_depths()))
+        duration_s = time.perf_counter() - start
+        time.sleep(self.SETTLE_S)
+        hardware.term()
+        executor.stop()
+        (injected, read, overrun) = pi.get_stats()
+        (matched, latency_us) = self.__latency_percentiles(frames, injected_ticks, delivered,
+                                                           capture_path)
+        return {
+            "injected": injected,
+            "delivered": matched,
+            "invalid": len(delivered) - matched,
+            "overrun": overrun,
+            "dropped": executor.get_dropped_count(),
+            "queue_depth_max": depth_max,
+            "offered_hz": injected / duration_s if duration_s > 0 else 0.0,
+            "delivered_hz": matched / duration_s if duration_s > 0 else 0.0,
+            "latency_us": latency_us
+        }
+
+    def sustainable_rate(self, frames, low_hz=100.0, high_hz=100000.0, loss_max=0.001,
+                         steps=8):
+        """ Returns the highest rate between low_hz and high_hz, found by
+        bisection, at which no more than loss_max of the frames are lost.
+        Returns 0.0 if even low_hz loses too many.
+        """
+        best = 0.0
+        for step in range(steps + 2):
+            if step == 0:
+                rate_hz = low_hz
+            elif step == 1:
+                rate_hz = high_hz
+            else:
+                rate_hz = math.sqrt(low_hz * high_hz)
+            result = self.run(frames, rate_hz)
+            lost = 1.0 - result["delivered"] / max(result["injected"], 1)
+            if lost <= loss_max:
+                best = max(best, result["offered_hz"])
+                if step == 1:
+                    break
+                low_hz = rate_hz
+            else:
+                if step == 0:
+                    break
+                high_hz = rate_hz
+        return best
+
+    def __delivered(self, pi, delivered):
+        handler = self.__handler
+
+        def record(packet):
+            delivered.append((bytes(packet.data[:Nrf905Frame.HEADER.size]),
+                              pi.get_current_tick()))
+            if handler is not None:
+                handler(packet)
+        return record
+
+    def __latency_percentiles(self, frames, injected_ticks, delivered, capture_path):
+        """ Writes a capture file of the run.  Returns a tuple of (frames
+        delivered, latency percentiles).
+        """
+        # A read can pick up a newer payload than the DR edge it was queued
+        # for, so frames are matched by their header.
+        delivered_ticks = dict()
+        for (header, tick) in delivered:
+            delivered_ticks.setdefault(header, tick)
+        path = capture_path
+        if path is None:
+            (handle, path) = tempfile.mkstemp(suffix=".cap")
+            os.close(handle)
+        matched = 0
+        writer = Nrf905CaptureWriter(path)
+        base = injected_ticks[0] if injected_ticks else 0
+        for (frame, dr_tick) in zip(frames, injected_ticks):
+            time_us = (dr_tick - base) & 0xffffffff
+            (source, sequence) = self.__frame.key(frame)
+            tick = delivered_ticks.get(frame[:Nrf905Frame.HEADER.size])
+            if tick is None:
+                writer.write(time_us, time_us, source, sequence, status=Nrf905Capture.DROPPED,
+                             length=len(frame))
+            else:
+                delivered_us = time_us + ((tick - dr_tick) & 0xffffffff)
+                writer.write(time_us, delivered_us, source, sequence, length=len(frame))
+                matched += 1
+        writer.close()
+        percentiles = Nrf905CaptureAnalyzer(path).latency_percentiles()
+        if capture_path is None:
+            os.remove(path)
+        return (matched, percentiles)
@@ -1,7 +1,5 @@
 #!/usr/bin/env python3
 
-import pigpio
-
 class Nrf905Spi:
     """ Handles access to SPI bus and the nRF905 registers.
     Extracts from the data sheet.
@@ -38,8 +36,24 @@ class Nrf905Spi:
     INSTRUCTION_W_TX_ADDRESS = 0b00100010
     INSTRUCTION_R_TX_ADDRESS = 0b00100011
     INSTRUCTION_R_RX_ADDRESS = 0b00100100
+    # Table 13 names this instruction R_RX_PAYLOAD.
+    INSTRUCTION_R_RX_PAYLOAD = 0b00100100
     INSTRUCTION_CHANNEL_CONFIG = 0b10000000
 
+    # CH_NO is 9 bits wide.
+    CHANNEL_MAX = 511
+
+    CONFIG_REGISTER_SIZE = 10
+
+    # First byte of RX_ADDRESS in the configuration register.  The low 4
+    # bits of W_CONFIG give the byte to start writing at.
+    CONFIG_RX_ADDRESS_BYTE = 5
+
+    # ShockBurst sends a 10 bit preamble, then the address, payload and CRC
+    # at 50kbps.
+    PREAMBLE_BITS = 10
+    AIR_BIT_US = 20
+
 
     def __init__(self, pi, spi_bus):
         # Width of nRF905 registers. Defaults set to chip defaults.
@@ -49,6 +63,11 @@ class Nrf905Spi:
         self.__transmit_payload_width = 0b100000  # 32 bytes
         # The last value of the status register.
         self.__status_register = 0
+        # R_RX_PAYLOAD instruction followed by a dummy byte for each payload
+        # byte to be clocked out.  See prepare_receive_payload().
+        self.__receive_command = b''
+        # The configuration register as last written, or None if not known.
+        self.__configuration = None
         # Open SPI device
         self.__spi_handle = 0
         spi_flags = 0  # For SPI0
@@ -73,16 +92,66 @@ class Nrf905Spi:
         """ Writes data to the RF configuration register.
             Raises ValueError exception if data does not contain 10 bytes.
         """
-        if len(data) == 10:
-            # Prepend the instruction for writing all bytes to the config 
-            # register.  The 4 least significant bytes are set to 0 so all 
-            # bytes are written to. 
-            data.insert(0, INSTRUCTION_W_CONFIG)
-            # Write the data to the register.
-            pi.spi_write(self.__spi_handle, data)
+        if len(data) == self.CONFIG_REGISTER_SIZE:
+            # Forget what was written before so all bytes are written.
+            self.__configuration = None
+            self.write_configuration(pi, data)
         else:
             raise ValueError("data must contain 10 bytes")
 
+    def prepare_configuration(self, image):
+        """ Returns the command that changes the configuration register from
+        the last image written to image, or None if nothing changes.
+        The changed bytes are written in one transfer: W_CONFIG with the low
+        4 bits set to the first changed byte, followed by the bytes up to the
+        last changed one.  Each transfer costs far more than a byte, so the
+        unchanged bytes in between are written again rather than using a
+        second transfer.  If only CH_NO, HFREQ_PLL and PA_PWR change, the 2
+        byte CHANNEL_CONFIG instruction is used.  If the register has not
+        been written yet, all of it is written.
+        Raises ValueError if image does not contain 10 bytes.
+        """
+        if len(image) != self.CONFIG_REGISTER_SIZE:
+            raise ValueError("image must contain 10 bytes")
+        active = self.__configuration
+        if active is None:
+            return bytes([self.INSTRUCTION_W_CONFIG]) + bytes(image)
+        changed = [index for index in range(self.CONFIG_REGISTER_SIZE)
+                   if active[index] != image[index]]
+        if not changed:
+            return None
+        (first, last) = (changed[0], changed[-1])
+        if last <= 1 and (active[1] ^ image[1]) & 0xf0 == 0:
+            # CHANNEL_CONFIG is 1000pphc, the same as the low 4 bits of
+            # byte 1, followed by byte 0.
+            return bytes([self.INSTRUCTION_CHANNEL_CONFIG | (image[1] & 0x0f), image[0]])
+        return bytes([self.INSTRUCTION_W_CONFIG | first]) + bytes(image[first:last + 1])
+
+    def write_configuration(self, pi, image):
+        """ Writes image to the configuration register, sending only the
+        bytes that differ from the last image written, see
+        prepare_configuration().  The address and payload widths used by
+        the other functions are taken from image.
+        Returns the command sent, or None if nothing was sent.
+        """
+        command = self.prepare_configuration(image)
+        if command is not None:
+            self.write_command(pi, command)
+        self.__configuration = bytearray(image)
+        self.__receive_address_width = image[2] & 0x07
+        self.__transmit_address_width = (image[2] >> 4) & 0x07
+        self.__receive_payload_width = image[3] & 0x3f
+        self.__transmit_payload_width = image[4] & 0x3f
+        return command
+
+    def get_configuration(self):
+        """ Returns the last image written to the configuration register, or
+        None if it has not been written.
+        """
+        if self.__configuration is None:
+            return None
+        return bytes(self.__configuration)
+
     def configuration_register_read(self, pi):
         """ Returns an array of 10 bytes read from the RF configuration register.
             If the read was not successful, returns empty array.
@@ -188,8 +257,49 @@ class Nrf905Spi:
             raise ValueError("Frequency not found.")
         return result
 
+    def prepare_transmit_payload(self, payload):
+        """ Returns the W_TX_PAYLOAD command for payload, padded with 0 to
+        the TX payload width.  The command can be made on any thread and
+        sent later with write_command().
+        Raises ValueError if payload is longer than the TX payload width.
+        """
+        width = self.__transmit_payload_width
+        if len(payload) > width:
+            raise ValueError("payload longer than the TX payload width")
+        command = bytearray(width + 1)
+        command[0] = self.INSTRUCTION_W_TX_PAYLOAD
+        command[1:len(payload) + 1] = payload
+        return bytes(command)
+
+    def prepare_transmit_address(self, address):
+        """ Returns the W_TX_ADDRESS command for address.  Multi-byte values
+        are sent LSB first.
+        """
+        data = (address & 0xffffffff).to_bytes(4, "little")
+        return bytes([self.INSTRUCTION_W_TX_ADDRESS]) + data[:self.__transmit_address_width]
+
+    def write_receive_address(self, pi, address):
+        """ Writes address to RX_ADDRESS without rewriting the rest of the
+        configuration register.  Multi-byte values are sent LSB first.
+        """
+        data = (address & 0xffffffff).to_bytes(4, "little")[:self.__receive_address_width]
+        command = self.INSTRUCTION_W_CONFIG | self.CONFIG_RX_ADDRESS_BYTE
+        self.write_command(pi, bytes([command]) + data)
+        if self.__configuration is not None:
+            start = self.CONFIG_RX_ADDRESS_BYTE
+            self.__configuration[start:start + len(data)] = data
+
+    def write_command(self, pi, command):
+        """ Sends a command made by one of the prepare functions in a single
+        transfer.
+        """
+        (count, status) = pi.spi_xfer(self.__spi_handle, command)
+        # The first byte received is the status register.
+        if count > 0:
+            self.__status_register = status[0]
+
     def write_transmit_payload(self, pi, payload):
-        pass
+        self.write_command(pi, self.prepare_transmit_payload(payload))
 
     def read_transmit_payload(self, pi, payload):
         pass
@@ -199,19 +309,7 @@ class Nrf905Spi:
         Multi-byte values are transmitted LSB first, so the address
         needs to be broken down into bytes before sending.
         """
-        # Create the array of bytes to send.
-        data = []
-        data.append(INSTRUCTION_W_TX_ADDRESS)
-        for i in range(0, self.__transmit_address_width):
-            byte = address & 0x000000FF
-            data.append(byte)
-            address = address >> 8
-        print("wta:", address, data)
-        # Send the bytes.
-        (count, status) = pi.spi_xfer(self.__spi_handle, data)
-        # There should only be one byte received, the value of the status register.
-        print("wta:", count, status)
-        self.__status_register = status
+        self.write_command(pi, self.prepare_transmit_address(address))
 
     def read_transmit_address(self, pi):
         """ Returns a 32 bit value representing the address.
@@ -219,8 +317,9 @@ class Nrf905Spi:
         config register).   Multi-byte values are returned LSB first, so the 
         bytes need to be reversed.
         """
-        # Send the instruction to read the TX ADDRESS register.
-        command = INSTRUCTION_R_TX_ADDRESS
+        # Send the instruction to read the TX ADDRESS register, followed by
+        # one dummy byte per address byte.
+        command = bytes([self.INSTRUCTION_R_TX_ADDRESS]) + bytes(self.__transmit_address_width)
         (count, address) = pi.spi_xfer(self.__spi_handle, command)
         print("rta:", count, address)
         # The first byte received is the status register.
@@ -230,11 +329,87 @@ class Nrf905Spi:
         #  TODO Convert the byte array into a 32 bit value. 
         return address
 
+    def prepare_receive_payload(self):
+        """ Makes the R_RX_PAYLOAD command ready for the configured RX payload
+        width so that the read can start as soon as DR is set.
+        Returns the command.
+        """
+        length = self.__receive_payload_width + 1
+        if len(self.__receive_command) != length:
+            self.__receive_command = bytes([self.INSTRUCTION_R_RX_PAYLOAD]) + bytes(length - 1)
+        return self.__receive_command
+
     def read_receive_payload(self, pi):
-        pass
+        """ Returns the RX payload as a memoryview.
+        The payload is read with a single transfer of the R_RX_PAYLOAD
+        instruction and one dummy byte per byte of the configured RX payload
+        width.  The command is made once and reused.  The status byte is
+        skipped by slicing the view, so no bytes are copied.
+        Returns an empty memoryview if the transfer failed.
+        """
+        (count, data) = pi.spi_xfer(self.__spi_handle, self.prepare_receive_payload())
+        if count <= 0:
+            return memoryview(b'')
+        # The first byte received is the status register.
+        self.__status_register = data[0]
+        return memoryview(data)[1:count]
 
     def set_channel_config(self, pi, channel, hfreq_pll, pa_pwr):
-        pass
+        """ Sets CH_NO, HFREQ_PLL and PA_PWR using the single CHANNEL_CONFIG
+        instruction so that the channel can be changed without rewriting the
+        whole configuration register.
+        The instruction is 1000pphc cccccccc where pp = PA_PWR, h = HFREQ_PLL
+        and c = the 9 bits of CH_NO.
+        Raises ValueError if any value is out of range.
+        """
+        if channel < 0 or channel > self.CHANNEL_MAX:
+            raise ValueError("channel must be in the range 0 to 511")
+        if hfreq_pll != 0 and hfreq_pll != 1:
+            raise ValueError("hfreq_pll must be 0 or 1")
+        if pa_pwr < 0 or pa_pwr > 3:
+            raise ValueError("pa_pwr must be in the range 0 to 3")
+        command = self.INSTRUCTION_CHANNEL_CONFIG
+        command |= pa_pwr << 2
+        command |= hfreq_pll << 1
+        command |= channel >> 8
+        data = [command, channel & 0xff]
+        (count, status) = pi.spi_xfer(self.__spi_handle, data)
+        # The first byte received is the status register.
+        if count > 0:
+            self.__status_register = status[0]
+        if self.__configuration is not None:
+            self.__configuration[0] = channel & 0xff
+            self.__configuration[1] = (self.__configuration[1] & 0xf0) | (command & 0x0f)
+
+    @classmethod
+    def frequency_to_channel(cls, frequency_mhz):
+        """ Returns a tuple of (CH_NO, HFREQ_PLL) for the given frequency.
+        From the data sheet:
+            f = (422.4 + CH_NO / 10) * (1 + HFREQ_PLL) MHz
+        Raises ValueError if the frequency cannot be reached.
+        Can be called without an instance, e.g. to check settings.
+        """
+        if frequency_mhz < 700:
+            hfreq_pll = 0
+        else:
+            hfreq_pll = 1
+        channel = round(((frequency_mhz / (1 + hfreq_pll)) - 422.4) * 10)
+        if channel < 0 or channel > cls.CHANNEL_MAX:
+            raise ValueError("Frequency out of range.")
+        return (channel, hfreq_pll)
+
+    @classmethod
+    def channel_to_frequency(cls, channel, hfreq_pll):
+        """ Returns the frequency in MHz for the given CH_NO and HFREQ_PLL. """
+        return round((422.4 + (channel / 10)) * (1 + hfreq_pll), 1)
+
+    def get_transmit_airtime_us(self, crc_bits):
+        """ Returns the time in microseconds to send one packet with the
+        current TX address and payload widths.  crc_bits is one of 0, 8, 16.
+        """
+        bits = (self.PREAMBLE_BITS + crc_bits +
+                8 * (self.__transmit_address_width + self.__transmit_payload_width))
+        return bits * self.AIR_BIT_US
 
     def get_status_register(self):
         """Gets the last read value of the status register. """
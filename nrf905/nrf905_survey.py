@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import time
+
+from nrf905.nrf905_gpio import Nrf905Gpio
+
+
+class Nrf905Survey:
+    """ Surveys a set of channels for activity so that load can be spread
+    across the quietest channels.
+
+    For each channel, the nRF905 is put into standby, the channel is changed
+    using the CHANNEL_CONFIG instruction and the device is put into receive
+    mode.  The CD pin is then sampled for the dwell time and the fraction of
+    samples with a carrier present is recorded as the occupancy.
+
+    This module does not own the pigpio instance so all functions need the
+    instance passed in.
+    """
+
+    def __init__(self, spi, gpio, hfreq_pll=0, pa_pwr=0):
+        self.__spi = spi
+        self.__gpio = gpio
+        self.__hfreq_pll = hfreq_pll
+        self.__pa_pwr = pa_pwr
+        # Dictionary of channel: occupancy from the last survey.
+        self.__occupancy = dict()
+
+    def sample_channel(self, pi, channel, dwell_s, sample_interval_s):
+        """ Returns the occupancy, 0.0 to 1.0, of the given channel.
+        The device is left in receive mode on the given channel.
+        """
+        self.__gpio.set_mode_standby(pi)
+        self.__spi.set_channel_config(pi, channel, self.__hfreq_pll, self.__pa_pwr)
+        self.__gpio.set_mode_receive(pi)
+        self.__gpio.wait_settled()
+        samples = 0
+        busy = 0
+        end_time = time.monotonic() + dwell_s
+        while time.monotonic() < end_time:
+            busy += pi.read(Nrf905Gpio.CARRIER_DETECT)
+            samples += 1
+            if sample_interval_s > 0:
+                time.sleep(sample_interval_s)
+        occupancy = 0.0
+        if samples > 0:
+            occupancy = busy / samples
+        return occupancy
+
+    def survey(self, pi, channels, dwell_s=0.05, sample_interval_s=0.001):
+        """ Hops across the given channels and returns a list of
+        (channel, occupancy) tuples ordered from least to most occupied.
+        The device is left in standby mode.
+        """
+        self.__occupancy = dict()
+        for channel in channels:
+            occupancy = self.sample_channel(pi, channel, dwell_s, sample_interval_s)
+            self.__occupancy[channel] = occupancy
+        self.__gpio.set_mode_standby(pi)
+        return self.ranked()
+
+    def ranked(self):
+        """ Returns the result of the last survey as a list of
+        (channel, occupancy) tuples ordered from least to most occupied.
+        Channels with equal occupancy keep the order they were surveyed in.
+        """
+        return sorted(self.__occupancy.items(), key=lambda item: item[1])
+
+    def quietest(self, count):
+        """ Returns a list of the given number of least occupied channels
+        from the last survey.
+        """
+        return [channel for (channel, occupancy) in self.ranked()[:count]]
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+
+import math
+import queue
+import struct
+import threading
+
+
+class Nrf905Tdma:
+    """ The TDMA superframe and beacon format.
+
+    Time is split into superframes of slot_count + 1 slots of slot_us each.
+    Slot 0 holds the coordinator's beacon, slots 1 to slot_count are given
+    to nodes, one node per slot, so nodes never transmit over each other.
+
+    The beacon uses the same first bytes as the Nrf905Dispatcher header so
+    it can be routed by message type:
+        Byte    Field
+        0       BEACON_TYPE
+        1-4     Coordinator address
+        5-6     Superframe number, wrapping at 16 bits
+        7-8     slot_us
+        9       slot_count
+        10      Number of entries that follow, up to ENTRIES_MAX
+        11-     Entries of node address (4 bytes) and slot (1 byte)
+    Only ENTRIES_MAX assignments fit in one beacon so the coordinator works
+    through the table, a few entries per beacon.
+
+    A slot should be long enough for the frames a node sends in it plus a
+    guard time for clock error:
+        slot_us = frames * frame_us + guard_us
+    where frame_us is the TX start up time plus the airtime of one packet.
+    """
+
+    BEACON_TYPE = 0xfe
+    BEACON = struct.Struct("<BIHHBB")
+    ENTRY = struct.Struct("<IB")
+    ENTRIES_MAX = 4
+    SLOT_COUNT_MAX = 255
+    SLOT_US_MAX = 0xffff
+    # Waits shorter than this are spun rather than slept.
+    SPIN_US = 200
+
+    def pack_beacon(self, coordinator, superframe, slot_us, slot_count, entries):
+        """ Returns a beacon holding entries, a list of (address, slot). """
+        if len(entries) > self.ENTRIES_MAX:
+            raise ValueError("Too many entries for one beacon")
+        data = bytearray(self.BEACON.pack(self.BEACON_TYPE, coordinator, superframe & 0xffff,
+                                          slot_us, slot_count, len(entries)))
+        for (address, slot) in entries:
+            data += self.ENTRY.pack(address, slot)
+        return bytes(data)
+
+    def unpack_beacon(self, data):
+        """ Returns a tuple of (coordinator, superframe, slot_us, slot_count,
+        entries) or None if data is not a beacon.
+        """
+        if len(data) < self.BEACON.size or data[0] != self.BEACON_TYPE:
+            return None
+        (message_type, coordinator, superframe, slot_us, slot_count,
+         count) = self.BEACON.unpack_from(data)
+        if count > self.ENTRIES_MAX or len(data) < self.BEACON.size + count * self.ENTRY.size:
+            return None
+        entries = [self.ENTRY.unpack_from(data, self.BEACON.size + index * self.ENTRY.size)
+                   for index in range(count)]
+        return (coordinator, superframe, slot_us, slot_count, entries)
+
+    def wait_until(self, clock, tick, stop_event):
+        """ Waits until the pigpio tick given, using clock, an Nrf905TickClock.
+        Returns False if stop_event was set first.
+        """
+        remaining = clock.difference(clock.current_tick(), tick)
+        if remaining > self.SPIN_US:
+            if stop_event.wait((remaining - self.SPIN_US) / 1000000):
+                return False
+        while clock.difference(clock.current_tick(), tick) > 0:
+            pass
+        return not stop_event.is_set()
+
+
+class Nrf905TdmaCoordinator:
+    """ Assigns slots and sends a beacon at the start of each superframe.
+
+    Slots are given to node addresses with assign(), e.g. by the gateway
+    when it first hears from a node.  transmit_function(data) sends the
+    beacon and clock is the Nrf905TickClock used to time the superframes.
+    """
+
+    def __init__(self, address, transmit_function, clock, slot_count, slot_us):
+        if slot_count < 1 or slot_count > Nrf905Tdma.SLOT_COUNT_MAX:
+            raise ValueError("slot_count must be in the range 1 to 255")
+        if slot_us < 1 or slot_us > Nrf905Tdma.SLOT_US_MAX:
+            raise ValueError("slot_us must be in the range 1 to 65535")
+        self.__address = address
+        self.__transmit_function = transmit_function
+        self.__clock = clock
+        self.__slot_count = slot_count
+        self.__slot_us = slot_us
+        self.__format = Nrf905Tdma()
+        # Key is the node address, value is the slot.
+        self.__assigned = dict()
+        # Index is the slot, value is the node address or None.
+        self.__slots = [None] * (slot_count + 1)
+        self.__slots[0] = address
+        self.__next_entry = 0
+        self.__superframe = 0
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def assign(self, address):
+        """ Returns the slot for address, giving it the first free slot if
+        it does not have one.  Returns None if all slots are taken.
+        """
+        slot = self.__assigned.get(address)
+        if slot is None:
+            try:
+                slot = self.__slots.index(None)
+            except ValueError:
+                return None
+            self.__slots[slot] = address
+            self.__assigned[address] = slot
+        return slot
+
+    def release(self, address):
+        """ Frees the slot used by address.  Returns True if it had one. """
+        slot = self.__assigned.pop(address, None)
+        if slot is None:
+            return False
+        self.__slots[slot] = None
+        return True
+
+    def get_assignments(self):
+        """ Returns a dictionary of node address: slot. """
+        return dict(self.__assigned)
+
+    def get_superframe_us(self):
+        return (self.__slot_count + 1) * self.__slot_us
+
+    def build_beacon(self):
+        """ Returns the next beacon and moves on to the next superframe. """
+        assigned = sorted(self.__assigned.items(), key=lambda item: item[1])
+        count = min(len(assigned), Nrf905Tdma.ENTRIES_MAX)
+        entries = []
+        if assigned:
+            start = self.__next_entry % len(assigned)
+            entries = [assigned[(start + index) % len(assigned)] for index in range(count)]
+            self.__next_entry = start + count
+        data = self.__format.pack_beacon(self.__address, self.__superframe, self.__slot_us,
+                                         self.__slot_count, entries)
+        self.__superframe = (self.__superframe + 1) & 0xffff
+        return data
+
+    def start(self):
+        """ Starts sending a beacon every superframe. """
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        if self.__thread is None:
+            return
+        self.__stop.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def __run(self):
+        tick = self.__clock.current_tick()
+        while self.__format.wait_until(self.__clock, tick, self.__stop):
+            self.__transmit_function(self.build_beacon())
+            tick = (tick + self.get_superframe_us()) % self.__clock.WRAP
+
+
+class Nrf905TdmaNode:
+    """ Holds frames until the node's slot and then sends them.
+
+    beacon_received(data, tick) is called with each received packet and the
+    pigpio tick of its DR edge, e.g. from an Nrf905Dispatcher handler for
+    Nrf905Tdma.BEACON_TYPE.  The beacon gives the start of the superframe,
+    the slot timing and, now and then, this node's slot.
+
+    The node measures the length of the superframe from the beacons in
+    pigpio ticks.  The difference from the nominal length is the drift
+    between the node's clock and the coordinator's, and the measured value
+    is used to work out the slot times until the next beacon, so missing a
+    few beacons does not push the node out of its slot.
+
+    frame_us is the time from calling transmit_function(data) until the
+    packet has left, i.e. the TX start up time plus the airtime, see
+    Nrf905Hardware.get_airtime_us().  It is also used to find when the
+    coordinator started sending the beacon.  As many frames as fit in the
+    slot, less guard_us, are sent each superframe.  A frame waits at most
+    one superframe once the node is in sync.
+    """
+
+    # Weight given to each new measurement of the superframe length.
+    DRIFT_GAIN = 0.25
+
+    def __init__(self, address, transmit_function, clock, frame_us, guard_us=500,
+                 queue_size=64):
+        if frame_us < 1:
+            raise ValueError("frame_us must be 1 or more")
+        if guard_us < 0:
+            raise ValueError("guard_us must be 0 or more")
+        self.__address = address
+        self.__transmit_function = transmit_function
+        self.__clock = clock
+        self.__frame_us = frame_us
+        self.__guard_us = guard_us
+        self.__format = Nrf905Tdma()
+        self.__frames = queue.Queue(queue_size)
+        self.__stop = threading.Event()
+        self.__synced = threading.Event()
+        self.__thread = None
+        self.__slot = None
+        self.__slot_us = 0
+        self.__superframe_us = 0.0
+        self.__nominal_superframe_us = 0
+        self.__superframe = None
+        self.__start_tick = None
+        self.__sync_error_us = 0
+        self.__sent_count = 0
+        self.__slot_count = 0
+
+    def beacon_received(self, data, tick):
+        """ Updates the slot timing from a beacon received at tick.
+        Returns True if data was a beacon.
+        """
+        beacon = self.__format.unpack_beacon(data)
+        if beacon is None:
+            return False
+        (coordinator, superframe, slot_us, slot_count, entries) = beacon
+        start_tick = (tick - self.__frame_us) % self.__clock.WRAP
+        nominal_us = (slot_count + 1) * slot_us
+        if self.__start_tick is not None and nominal_us == self.__nominal_superframe_us:
+            count = (superframe - self.__superframe) & 0xffff
+            if count:
+                elapsed = self.__clock.difference(self.__start_tick, start_tick)
+                predicted = count * self.__superframe_us
+                self.__sync_error_us = elapsed - predicted
+                self.__superframe_us += self.DRIFT_GAIN * (elapsed / count - self.__superframe_us)
+        else:
+            # First beacon, or the coordinator changed the layout.
+            self.__superframe_us = float(nominal_us)
+        self.__nominal_superframe_us = nominal_us
+        self.__slot_us = slot_us
+        self.__superframe = superframe
+        self.__start_tick = start_tick
+        for (address, slot) in entries:
+            if address == self.__address:
+                self.__slot = slot
+            elif slot == self.__slot:
+                # The slot has been given to another node.
+                self.__slot = None
+        if self.__slot is not None and self.__slot <= slot_count:
+            self.__synced.set()
+        else:
+            self.__synced.clear()
+        return True
+
+    def send(self, data, block=False):
+        """ Queues data to be sent in the node's next slot.
+        Returns False if the queue is full.
+        """
+        try:
+            self.__frames.put(data, block)
+        except queue.Full:
+            return False
+        return True
+
+    def get_slot(self):
+        """ Returns the slot given to this node, or None. """
+        return self.__slot
+
+    def get_superframe_us(self):
+        """ Returns the measured length of the superframe in microseconds. """
+        return self.__superframe_us
+
+    def get_sync_error_us(self):
+        """ Returns how far the last beacon was from where it was expected. """
+        return self.__sync_error_us
+
+    def get_frames_per_slot(self):
+        return max(1, (self.__slot_us - self.__guard_us) // self.__frame_us)
+
+    def get_stats(self):
+        """ Returns a tuple of (frames sent, slots used, frames waiting). """
+        return (self.__sent_count, self.__slot_count, self.__frames.qsize())
+
+    def next_slot_tick(self, tick):
+        """ Returns the tick of the start of the node's first slot after
+        tick, or None if the node has no slot.
+        """
+        if self.__slot is None or self.__start_tick is None:
+            return None
+        offset = self.__slot * self.__slot_us
+        elapsed = self.__clock.difference(self.__start_tick, tick) - offset
+        count = max(0, math.ceil(elapsed / self.__superframe_us))
+        return (self.__start_tick + round(count * self.__superframe_us) + offset) % self.__clock.WRAP
+
+    def start(self):
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        # Remove the None left by stop() if the thread stopped before it
+        # took it.
+        self.__requeue(None)
+        # stop() sets __synced to wake the thread, so put it back.
+        if self.next_slot_tick(0) is None:
+            self.__synced.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """ Stops the thread.  Frames still waiting are not sent. """
+        if self.__thread is None:
+            return
+        self.__stop.set()
+        self.__synced.set()
+        self.__frames.put(None)
+        self.__thread.join()
+        self.__thread = None
+
+    def __run(self):
+        while True:
+            data = self.__frames.get()
+            if data is None or self.__stop.is_set():
+                break
+            self.__synced.wait()
+            tick = self.next_slot_tick(self.__clock.current_tick())
+            if tick is None:
+                # Lost the slot while waiting.  Wait for it to come back.
+                self.__requeue(data)
+                continue
+            if not self.__format.wait_until(self.__clock, tick, self.__stop):
+                break
+            self.__slot_count += 1
+            for index in range(self.get_frames_per_slot()):
+                if index:
+                    try:
+                        data = self.__frames.get_nowait()
+                    except queue.Empty:
+                        break
+                    if data is None:
+                        return
+                self.__transmit_function(data)
+                self.__sent_count += 1
+
+    def __requeue(self, data):
+        # Put the frame back at the front by draining and refilling.  Any
+        # None is dropped.
+        waiting = [data]
+        while True:
+            try:
+                waiting.append(self.__frames.get_nowait())
+            except queue.Empty:
+                break
+        for item in waiting:
+            if item is not None:
+                self.__frames.put(item)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import time
+
+
+class Nrf905TickClock:
+    """ Converts pigpio ticks to wall clock time.
+
+    pigpio ticks are microseconds since the daemon started and wrap at 32
+    bits, about every 72 minutes.  calibrate() reads the current tick and
+    the wall clock together to give a reference point.  Any tick within half
+    a wrap (about 36 minutes) of the reference, before or after, can then be
+    converted.  Calibrating again regularly also corrects for drift between
+    the two clocks, see needs_calibration().
+
+    current_tick() works from monotonic_function rather than the wall
+    clock, so a step in the wall clock, e.g. from NTP, does not move it.
+
+    extend() turns ticks into a 64 bit count that does not wrap, as long as
+    it is called at least once per wrap.
+    """
+
+    WRAP = 1 << 32
+    HALF_WRAP = 1 << 31
+    # Recalibrate well inside half a wrap.
+    CALIBRATION_PERIOD_US = 60 * 1000000
+
+    def __init__(self, time_function=time.time, monotonic_function=time.monotonic):
+        self.__time_function = time_function
+        self.__monotonic_function = monotonic_function
+        self.__reference_tick = None
+        self.__reference_time = 0.0
+        self.__reference_monotonic = 0.0
+        self.__last_tick = None
+        self.__extended = 0
+
+    def calibrate(self, pi):
+        """ Sets the reference point.  The wall clock is read either side of
+        the tick so the round trip to the pigpio daemon is split evenly.
+        """
+        before = self.__time_function()
+        monotonic_before = self.__monotonic_function()
+        tick = pi.get_current_tick()
+        monotonic_after = self.__monotonic_function()
+        after = self.__time_function()
+        self.__set_reference(tick, (before + after) / 2,
+                             (monotonic_before + monotonic_after) / 2)
+
+    def set_reference(self, tick, wall_time):
+        """ Sets the reference point to a known tick and wall clock time. """
+        # The same point on the monotonic clock.
+        monotonic_time = self.__monotonic_function() - (self.__time_function() - wall_time)
+        self.__set_reference(tick, wall_time, monotonic_time)
+
+    def __set_reference(self, tick, wall_time, monotonic_time):
+        self.__reference_tick = tick
+        self.__reference_time = wall_time
+        self.__reference_monotonic = monotonic_time
+
+    def is_calibrated(self):
+        return self.__reference_tick is not None
+
+    def needs_calibration(self, tick):
+        """ Returns True if tick is far enough from the reference that the
+        clock should be calibrated again.
+        """
+        if self.__reference_tick is None:
+            return True
+        return abs(self.difference(self.__reference_tick, tick)) > self.CALIBRATION_PERIOD_US
+
+    def difference(self, from_tick, to_tick):
+        """ Returns to_tick - from_tick in microseconds, allowing for
+        wraparound.  Negative if to_tick is earlier.
+        """
+        result = (to_tick - from_tick) % self.WRAP
+        if result >= self.HALF_WRAP:
+            result -= self.WRAP
+        return result
+
+    def to_time(self, tick):
+        """ Returns the wall clock time of tick in seconds since the epoch.
+        Raises ValueError if the clock has not been calibrated.
+        """
+        if self.__reference_tick is None:
+            raise ValueError("Clock not calibrated")
+        return self.__reference_time + self.difference(self.__reference_tick, tick) / 1000000
+
+    def current_tick(self):
+        """ Returns the current pigpio tick worked out from the monotonic
+        clock, without a round trip to the pigpio daemon.
+        Raises ValueError if the clock has not been calibrated.
+        """
+        if self.__reference_tick is None:
+            raise ValueError("Clock not calibrated")
+        elapsed_us = round((self.__monotonic_function() - self.__reference_monotonic) * 1000000)
+        return (self.__reference_tick + elapsed_us) % self.WRAP
+
+    def extend(self, tick):
+        """ Returns tick as a count of microseconds that does not wrap.
+        Ticks must be given in order.
+        """
+        if self.__last_tick is None:
+            self.__extended = tick
+        else:
+            self.__extended += (tick - self.__last_tick) % self.WRAP
+        self.__last_tick = tick
+        return self.__extended
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import time
+
+import pigpio
+
+
+class Nrf905Timing:
+    """ Enforces the settling times between nRF905 mode changes.
+
+    The transitions are given as a dictionary of
+        (from_mode, to_mode): minimum microseconds before to_mode is usable
+    Transitions that are not in the dictionary need no wait.
+
+    entered() is called after the pins have been changed and records the
+    tick of the change.  wait_settled() then waits only for whatever is left
+    of the settling time.  prepare() is called before changing the pins and
+    waits for the current mode to settle if the next transition needs it,
+    e.g. PWR_UP must have settled into standby before TRX_CE is raised.
+    While a hold set by hold_us() is active, prepare() waits for it
+    whatever the next mode is.
+
+    Ticks are microseconds wrapping at 32 bits, the same as pigpio ticks, so
+    pigpio.tickDiff() handles the wraparound.  By default the ticks come from
+    the local high resolution clock because pi.get_current_tick() costs a
+    round trip to the pigpio daemon for every call.  Any function returning
+    pigpio style ticks can be given instead.
+
+    Long waits sleep until SPIN_US before the deadline and then spin, so a
+    wait never ends before the deadline and does not overshoot by the
+    scheduler's wake up latency.
+    """
+
+    # Waits shorter than this are spun rather than slept.
+    SPIN_US = 200
+
+    def __init__(self, transitions, tick_function=None):
+        self.__transitions = transitions
+        if tick_function is None:
+            tick_function = self.local_tick
+        self.__tick_function = tick_function
+        self.__mode = None
+        self.__entry_tick = 0
+        self.__settle_us = 0
+        # True while the settling time is a hold_us() hold.
+        self.__held = False
+        self.__wait_count = 0
+        self.__waited_us = 0
+
+    def local_tick(self):
+        """ Returns the local clock in microseconds, wrapped to 32 bits. """
+        return (time.perf_counter_ns() // 1000) & 0xffffffff
+
+    def get_mode(self):
+        """ Returns the last mode passed to entered(). """
+        return self.__mode
+
+    def get_transition_us(self, from_mode, to_mode):
+        """ Returns the settling time for the given transition. """
+        return self.__transitions.get((from_mode, to_mode), 0)
+
+    def prepare(self, mode):
+        """ Call before changing to mode.  Waits for the current mode to
+        settle if the change to mode has a settling time of its own, or if
+        the current mode is held.
+        """
+        if self.__held or self.__transitions.get((self.__mode, mode), 0) > 0:
+            self.wait_settled()
+
+    def entered(self, mode):
+        """ Call straight after changing to mode. """
+        if mode != self.__mode:
+            self.__settle_us = self.__transitions.get((self.__mode, mode), 0)
+            self.__held = False
+            self.__entry_tick = self.__tick_function()
+            self.__mode = mode
+
+    def hold_us(self, microseconds):
+        """ Keeps the current mode busy for at least microseconds from now,
+        e.g. while a packet is on air, so that prepare() and wait_settled()
+        wait for it as well as for the settling time.
+        """
+        if microseconds > self.remaining_us():
+            self.__entry_tick = self.__tick_function()
+            self.__settle_us = microseconds
+            self.__held = True
+
+    def remaining_us(self):
+        """ Returns the microseconds until the current mode has settled. """
+        if self.__settle_us == 0:
+            return 0
+        elapsed = pigpio.tickDiff(self.__entry_tick, self.__tick_function())
+        remaining = self.__settle_us - elapsed
+        if remaining <= 0:
+            # Settled, so later calls can return straight away.
+            self.__settle_us = 0
+            self.__held = False
+            remaining = 0
+        return remaining
+
+    def wait_settled(self):
+        """ Waits until the current mode has settled. """
+        remaining = self.remaining_us()
+        if remaining > 0:
+            self.wait_us(remaining)
+
+    def wait_us(self, microseconds):
+        """ Waits for at least the given number of microseconds. """
+        start_tick = self.__tick_function()
+        if microseconds > self.SPIN_US:
+            time.sleep((microseconds - self.SPIN_US) / 1000000)
+        while pigpio.tickDiff(start_tick, self.__tick_function()) < microseconds:
+            pass
+        self.__wait_count += 1
+        self.__waited_us += microseconds
+
+    def get_wait_stats(self):
+        """ Returns a tuple of (number of waits, total microseconds waited). """
+        return (self.__wait_count, self.__waited_us)
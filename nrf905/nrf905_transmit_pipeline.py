@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import collections
+import queue
+import threading
+
+
+class Nrf905TransmitPipeline:
+    """ Sends messages with the next frame prepared while the current frame
+    is on air.
+
+    send() queues a message and returns.  The pipeline thread turns each
+    message into frames with encode_function (header, fragmenting, FEC) and
+    has the hardware build the SPI commands for each frame, including the
+    address, see Nrf905Hardware.prepare_transmit().  Up to depth frames are
+    handed to the hardware ahead of the one on air.  The I/O thread loads
+    each one as soon as the nRF905 is back in standby, so the only gap
+    between packets is one SPI transfer and the TX start up time.
+
+    With the default depth of 2 the frames are double buffered: one is on
+    air while the next is waiting in the I/O thread and the pipeline thread
+    prepares the one after.  The I/O thread waits for each packet to leave
+    before loading the next, so nothing else is done on the nRF905 while a
+    run of frames is being sent.
+
+    encode_function(message) returns a list of payloads.  By default the
+    message is split into payload_width sized frames.  For FEC use e.g.
+        lambda message: fec.encode(next_id(), message)
+    """
+
+    PAYLOAD_WIDTH_MAX = 32
+
+    def __init__(self, hardware, encode_function=None, depth=2, queue_size=16,
+                 payload_width=PAYLOAD_WIDTH_MAX):
+        if depth < 1:
+            raise ValueError("depth must be 1 or more")
+        if queue_size < 1:
+            raise ValueError("queue_size must be 1 or more")
+        if payload_width < 1 or payload_width > self.PAYLOAD_WIDTH_MAX:
+            raise ValueError("payload_width must be in the range 1 to 32")
+        self.__hardware = hardware
+        if encode_function is None:
+            encode_function = self.fragment
+        self.__encode_function = encode_function
+        self.__depth = depth
+        self.__payload_width = payload_width
+        self.__messages = queue.Queue(queue_size)
+        self.__thread = None
+        self.__message_count = 0
+        self.__frame_count = 0
+        self.__full_count = 0
+        self.__error_count = 0
+
+    def start(self):
+        if self.__thread is not None:
+            return
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """ Stops the thread once the messages already queued are sent. """
+        if self.__thread is None:
+            return
+        self.__messages.put(None)
+        self.__thread.join()
+        self.__thread = None
+
+    def send(self, message, address=None, block=True):
+        """ Queues message for sending to address, or to the current TX
+        address if address is None.
+        Returns False if the queue is full and block is False.
+        """
+        try:
+            self.__messages.put((message, address), block)
+        except queue.Full:
+            return False
+        return True
+
+    def flush(self):
+        """ Waits until every message queued so far has been sent. """
+        self.__messages.join()
+
+    def fragment(self, message):
+        """ Returns message split into payload_width sized frames. """
+        width = self.__payload_width
+        return [message[start:start + width] for start in range(0, len(message), width)]
+
+    def get_stats(self):
+        """ Returns a tuple of (messages sent, frames sent, times the
+        pipeline was full and waited for the radio, messages that failed).
+        A high full count means the link is running at the airtime limit.
+        """
+        return (self.__message_count, self.__frame_count, self.__full_count,
+                self.__error_count)
+
+    def __run(self):
+        in_flight = collections.deque()
+        while True:
+            item = self.__messages.get()
+            if item is None:
+                self.__drain(in_flight, 0)
+                self.__messages.task_done()
+                break
+            (message, address) = item
+            try:
+                for payload in self.__encode_function(message):
+                    frame = self.__hardware.prepare_transmit(payload, address)
+                    self.__drain(in_flight, self.__depth - 1)
+                    in_flight.append(self.__hardware.transmit_prepared(frame))
+                    self.__frame_count += 1
+                self.__message_count += 1
+            except Exception:
+                self.__error_count += 1
+            if self.__messages.empty():
+                # Nothing more to prepare, so let flush() return once the
+                # frames have gone.
+                self.__drain(in_flight, 0)
+            self.__messages.task_done()
+
+    def __drain(self, in_flight, limit):
+        """ Waits until no more than limit frames are waiting to be sent. """
+        if len(in_flight) > limit and limit > 0:
+            self.__full_count += 1
+        while len(in_flight) > limit:
+            try:
+                in_flight.popleft().result()
+            except Exception:
+                self.__error_count += 1
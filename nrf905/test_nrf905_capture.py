@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+from nrf905.nrf905_capture import Nrf905Capture, Nrf905CaptureAnalyzer, Nrf905CaptureWriter
+
+
+class TestNrf905Capture(unittest.TestCase):
+
+    def setUp(self):
+        (handle, self.path) = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write_capture(self):
+        writer = Nrf905CaptureWriter(self.path)
+        # Address 1 sends every 10ms, sequence 2 is lost and 5 is corrupt.
+        for sequence in (0, 1, 3, 4, 5, 6):
+            status = Nrf905Capture.OK
+            if sequence == 5:
+                status = Nrf905Capture.ERROR
+            writer.write(sequence * 10000, sequence * 10000 + 200, 1, sequence,
+                         status=status, length=32)
+        # Address 2 sends once, 1ms after address 1, which wraps its sequence.
+        writer.write(41000, 41300, 2, 65535, length=16)
+        writer.write(2000000, 2000100, 2, 0, length=16)
+        writer.write(2000500, 2000500, 3, 0, direction=Nrf905Capture.TRANSMIT, length=8)
+        writer.close()
+
+    def test_record_size(self):
+        self.assertEqual(Nrf905Capture.RECORD.size, Nrf905Capture.DTYPE.itemsize)
+
+    def test_packet_error_rate(self):
+        self.write_capture()
+        analyzer = Nrf905CaptureAnalyzer(self.path)
+        self.assertEqual(analyzer.get_record_count(), 9)
+        result = analyzer.packet_error_rate()
+        self.assertEqual(result[1], (5, 1, 1, 2 / 7))
+        self.assertEqual(result[2], (2, 0, 0, 0.0))
+        self.assertNotIn(3, result)
+
+    def test_chunk_boundaries(self):
+        """ The results must not depend on the chunk size. """
+        self.write_capture()
+        analyzer = Nrf905CaptureAnalyzer(self.path)
+        expected = (analyzer.packet_error_rate(), analyzer.collision_estimate(2000))
+        analyzer.CHUNK_RECORDS = 2
+        self.assertEqual((analyzer.packet_error_rate(), analyzer.collision_estimate(2000)), expected)
+
+    def test_latency_and_throughput(self):
+        self.write_capture()
+        analyzer = Nrf905CaptureAnalyzer(self.path)
+        latency = analyzer.latency_percentiles((50, 100))
+        self.assertAlmostEqual(latency[50], 200, delta=5)
+        self.assertAlmostEqual(latency[100], 300, delta=7)
+        (start_us, packets, byte_counts) = analyzer.throughput(1.0)
+        self.assertEqual(start_us, 0)
+        self.assertEqual(list(packets), [6, 0, 1])
+        self.assertEqual(list(byte_counts), [5 * 32 + 16, 0, 16])
+        self.assertEqual(analyzer.collision_estimate(2000), (1, 1 / 8))
+
+    def test_empty(self):
+        analyzer = Nrf905CaptureAnalyzer(self.path)
+        self.assertEqual(analyzer.packet_error_rate(), dict())
+        self.assertEqual(analyzer.latency_percentiles((50,)), {50: None})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from nrf905.nrf905_codec import Nrf905Codec, decode_varints, encode_varints
+
+
+DICTIONARY = b"temperature=humidity=pressure=battery="
+
+
+class TestNrf905Codec(unittest.TestCase):
+
+    def setUp(self):
+        self.sender = Nrf905Codec(DICTIONARY)
+        self.receiver = Nrf905Codec(DICTIONARY)
+
+    def test_varints(self):
+        values = [0, 1, -1, 63, -64, 64, 300, -300, 2 ** 31, -2 ** 31]
+        data = encode_varints(values)
+        self.assertEqual(decode_varints(data), values)
+        self.assertEqual(len(encode_varints([1, -1, 5])), 3)
+        with self.assertRaises(ValueError):
+            decode_varints(b'\x80')
+
+    def test_no_codec_until_negotiated(self):
+        sample = [1000, 2000, 3000]
+        frame = self.sender.encode_sample(7, 0, sample)
+        self.assertEqual(frame[0], Nrf905Codec.NONE)
+        self.assertEqual(len(frame), 3 + 12)
+        self.assertEqual(self.receiver.decode_sample(7, frame), (0, 0, sample))
+
+    def test_delta_against_acknowledged(self):
+        agreed = self.sender.negotiate(7, self.receiver.get_supported())
+        self.assertEqual(agreed, Nrf905Codec.ALL)
+        self.receiver.negotiate(7, self.sender.get_supported())
+        first = [21500, 48000, 101325, 3300]
+        frame = self.sender.encode_sample(7, 2, first)
+        self.assertEqual(self.receiver.decode_sample(7, frame), (2, 0, first))
+        # Not yet acknowledged, so sent in full again.
+        second = [21510, 48010, 101320, 3300]
+        frame = self.sender.encode_sample(7, 2, second)
+        self.assertFalse(frame[0] & Nrf905Codec.DELTA)
+        self.receiver.decode_sample(7, frame)
+        self.assertTrue(self.sender.acknowledge(7, 2, 1))
+        third = [21512, 48011, 101319, 3299]
+        frame = self.sender.encode_sample(7, 2, third)
+        self.assertTrue(frame[0] & Nrf905Codec.DELTA)
+        # Header, reference and one byte per delta.
+        self.assertEqual(len(frame), 3 + 1 + 4)
+        self.assertEqual(self.receiver.decode_sample(7, frame), (2, 2, third))
+        # Receiver without the reference cannot decode.
+        with self.assertRaises(ValueError):
+            Nrf905Codec(DICTIONARY).decode_sample(7, frame)
+
+    def test_reference_too_old(self):
+        """ Once the reference is more than HISTORY samples old, samples are
+        sent in full until the next acknowledge().
+        """
+        self.sender.negotiate(7, Nrf905Codec.ALL)
+        self.receiver.negotiate(7, Nrf905Codec.ALL)
+        deltas = []
+        for index in range(20):
+            sample = [1000 + index, 2000 - index]
+            frame = self.sender.encode_sample(7, 0, sample)
+            deltas.append(bool(frame[0] & Nrf905Codec.DELTA))
+            self.assertEqual(self.receiver.decode_sample(7, frame), (0, index, sample))
+            if index == 0:
+                self.assertTrue(self.sender.acknowledge(7, 0, 0))
+        self.assertEqual(deltas, [False] + [True] * Nrf905Codec.HISTORY +
+                         [False] * (19 - Nrf905Codec.HISTORY))
+        self.assertTrue(self.sender.acknowledge(7, 0, 19))
+        frame = self.sender.encode_sample(7, 0, [1020, 1980])
+        self.assertTrue(frame[0] & Nrf905Codec.DELTA)
+        self.assertEqual(self.receiver.decode_sample(7, frame), (0, 20, [1020, 1980]))
+
+    def test_sequence_wrap(self):
+        self.sender.negotiate(7, Nrf905Codec.ALL)
+        self.receiver.negotiate(7, Nrf905Codec.ALL)
+        for index in range(600):
+            sample = [index * 3, -index]
+            frame = self.sender.encode_sample(7, 1, sample)
+            self.assertEqual(self.receiver.decode_sample(7, frame), (1, index & 0xff, sample))
+            if index % 5 == 0:
+                self.assertTrue(self.sender.acknowledge(7, 1, index & 0xff))
+        # A reference far behind the frame, e.g. after frames were lost, is
+        # not decoded against whatever was held under that number.
+        frame = bytes([Nrf905Codec.VARINT | Nrf905Codec.DELTA, 1, (600 + 100) & 0xff,
+                       599 & 0xff]) + encode_varints([1, 1])
+        with self.assertRaises(ValueError):
+            self.receiver.decode_sample(7, frame)
+
+    def test_dictionary(self):
+        self.sender.negotiate(9, Nrf905Codec.DICTIONARY)
+        self.receiver.negotiate(9, Nrf905Codec.DICTIONARY)
+        data = b"temperature=21.5 humidity=48"
+        frame = self.sender.encode_bytes(9, data)
+        self.assertEqual(frame[0], Nrf905Codec.DICTIONARY)
+        self.assertLess(len(frame), len(data))
+        self.assertEqual(self.receiver.decode_bytes(9, frame), data)
+        # Without a dictionary the codec is not offered.
+        self.assertEqual(Nrf905Codec().get_supported(),
+                         Nrf905Codec.VARINT | Nrf905Codec.DELTA)
+
+    def test_too_big(self):
+        with self.assertRaises(ValueError):
+            self.sender.encode_sample(7, 0, list(range(8)))
+        # The rejected sample did not use up a sequence number.
+        frame = self.sender.encode_sample(7, 0, [1])
+        self.assertEqual(self.receiver.decode_sample(7, frame), (0, 0, [1]))
+        self.assertFalse(self.sender.acknowledge(7, 0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import struct
+import unittest
+
+from nrf905.nrf905_dedup import Nrf905Dedup
+from nrf905.nrf905_frame import Nrf905Frame
+
+
+KEY = struct.Struct("<IH")
+
+
+def key_function(data):
+    return KEY.unpack_from(data)
+
+
+class TestNrf905Dedup(unittest.TestCase):
+
+    def setUp(self):
+        self.received = []
+        self.dedup = Nrf905Dedup(self.received.append, key_function, window_size=8)
+
+    def test_call(self):
+        frames = [KEY.pack(1, 10), KEY.pack(1, 10), KEY.pack(2, 10), KEY.pack(1, 11)]
+        results = [self.dedup(frame) for frame in frames]
+        self.assertEqual(results, [True, False, True, True])
+        self.assertEqual(self.received, [frames[0], frames[2], frames[3]])
+        self.assertEqual(self.dedup.get_stats(), (3, 1, 0, 0, 0))
+
+    def test_frame_key(self):
+        """ By default the key comes from the Nrf905Frame header. """
+        dedup = Nrf905Dedup(self.received.append)
+        frame = Nrf905Frame()
+        frames = [bytes(frame.pack(1, 0x1234, sequence, b"x")) for sequence in (1, 2, 1)]
+        self.assertEqual([dedup(item) for item in frames], [True, True, False])
+
+    def test_window(self):
+        dedup = self.dedup
+        self.assertFalse(dedup.is_duplicate(1, 100))
+        self.assertFalse(dedup.is_duplicate(1, 103))
+        # Out of order, but inside the window.
+        self.assertFalse(dedup.is_duplicate(1, 101))
+        self.assertTrue(dedup.is_duplicate(1, 101))
+        self.assertTrue(dedup.is_duplicate(1, 100))
+        self.assertTrue(dedup.is_duplicate(1, 103))
+        self.assertFalse(dedup.is_duplicate(1, 102))
+        # Jumping ahead by more than the window forgets the old values, so
+        # an old sequence number is stale and dropped.
+        self.assertFalse(dedup.is_duplicate(1, 120))
+        self.assertTrue(dedup.is_duplicate(1, 103))
+        self.assertEqual(dedup.get_stats(), (5, 3, 0, 0, 1))
+
+    def test_stale_then_duplicate(self):
+        """ A single stale frame, e.g. a late relay retransmission, does not
+        reset the window, so duplicates of newer frames are still dropped.
+        """
+        dedup = self.dedup
+        for sequence in (200, 201, 202):
+            self.assertFalse(dedup.is_duplicate(1, sequence))
+        self.assertTrue(dedup.is_duplicate(1, 150))
+        self.assertTrue(dedup.is_duplicate(1, 202))
+        self.assertTrue(dedup.is_duplicate(1, 201))
+        self.assertFalse(dedup.is_duplicate(1, 203))
+        self.assertEqual(dedup.get_stats(), (4, 2, 0, 0, 1))
+
+    def test_restart(self):
+        """ Three stale frames in a row, each ahead of the last, are taken
+        as the source restarting its count.
+        """
+        dedup = self.dedup
+        self.assertFalse(dedup.is_duplicate(1, 500))
+        self.assertTrue(dedup.is_duplicate(1, 0))
+        self.assertTrue(dedup.is_duplicate(1, 1))
+        self.assertFalse(dedup.is_duplicate(1, 2))
+        self.assertFalse(dedup.is_duplicate(1, 3))
+        self.assertTrue(dedup.is_duplicate(1, 2))
+        self.assertEqual(dedup.get_stats(), (3, 1, 1, 0, 2))
+        # Stale frames that are not in order do not make a restart.
+        self.assertTrue(dedup.is_duplicate(1, 60000))
+        self.assertTrue(dedup.is_duplicate(1, 50000))
+        self.assertTrue(dedup.is_duplicate(1, 40000))
+        self.assertEqual(dedup.get_stats()[2], 1)
+
+    def test_wrap(self):
+        dedup = self.dedup
+        self.assertFalse(dedup.is_duplicate(1, 0xfffe))
+        self.assertFalse(dedup.is_duplicate(1, 0x10001))
+        self.assertTrue(dedup.is_duplicate(1, 1))
+        self.assertTrue(dedup.is_duplicate(1, 0xfffe))
+        self.assertFalse(dedup.is_duplicate(1, 0xffff))
+        self.assertEqual(dedup.get_stats()[2], 0)
+
+    def test_sources_max(self):
+        dedup = Nrf905Dedup(self.received.append, key_function, sources_max=2)
+        dedup.is_duplicate(1, 5)
+        dedup.is_duplicate(2, 5)
+        # Using source 1 makes source 2 the least recently used.
+        self.assertTrue(dedup.is_duplicate(1, 5))
+        dedup.is_duplicate(3, 5)
+        self.assertEqual(dedup.get_source_count(), 2)
+        self.assertFalse(dedup.is_duplicate(2, 5))
+        self.assertTrue(dedup.forget(3))
+        self.assertFalse(dedup.forget(3))
+        self.assertEqual(dedup.get_stats()[3], 2)
+
+    def test_arguments(self):
+        with self.assertRaises(ValueError):
+            Nrf905Dedup(self.received.append, key_function, window_size=0)
+        with self.assertRaises(ValueError):
+            Nrf905Dedup(self.received.append, key_function, sources_max=0)
+        with self.assertRaises(ValueError):
+            Nrf905Dedup(self.received.append, key_function, restart_frames=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from nrf905.nrf905_dispatcher import Nrf905Dispatcher
+
+
+def make_packet(message_type, source, payload):
+    return Nrf905Dispatcher.HEADER.pack(message_type, source) + bytes(payload)
+
+
+class TestNrf905Dispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.received = []
+        self.dispatcher = Nrf905Dispatcher()
+
+    def handler(self, name):
+        def handle(source, message_type, payload):
+            self.received.append((name, source, message_type, bytes(payload)))
+        return handle
+
+    def test_most_specific_route(self):
+        self.dispatcher.register(self.handler("exact"), 0x1234, 7)
+        self.dispatcher.register(self.handler("source"), 0x1234)
+        self.dispatcher.register(self.handler("type"), message_type=7)
+        self.dispatcher.register(self.handler("default"))
+        self.dispatcher(make_packet(7, 0x1234, [1, 2]))
+        self.dispatcher(make_packet(8, 0x1234, [3]))
+        self.dispatcher(make_packet(7, 0x9999, []))
+        self.dispatcher(make_packet(8, 0x9999, [4]))
+        names = [item[0] for item in self.received]
+        self.assertEqual(names, ["exact", "source", "type", "default"])
+        self.assertEqual(self.received[0], ("exact", 0x1234, 7, b'\x01\x02'))
+
+    def test_register_invalidates_resolved_routes(self):
+        self.dispatcher.register(self.handler("default"))
+        packet = make_packet(1, 5, [])
+        self.dispatcher(packet)
+        self.dispatcher.register(self.handler("exact"), 5, 1)
+        self.dispatcher(packet)
+        self.assertTrue(self.dispatcher.unregister(5, 1))
+        self.assertFalse(self.dispatcher.unregister(5, 1))
+        self.dispatcher(packet)
+        names = [item[0] for item in self.received]
+        self.assertEqual(names, ["default", "exact", "default"])
+
+    def test_counters(self):
+        self.dispatcher.register(self.handler("exact"), 5, 1)
+        self.dispatcher(make_packet(1, 5, [0] * 10))
+        self.dispatcher(make_packet(1, 5, [0] * 6))
+        self.assertFalse(self.dispatcher(make_packet(2, 5, [])))
+        self.assertFalse(self.dispatcher(b'\x01\x02'))
+        self.assertEqual(self.dispatcher.get_route_counters(), {(5, 1): (2, 16)})
+        self.assertEqual(self.dispatcher.get_unrouted_count(), 1)
+        self.assertEqual(self.dispatcher.get_short_count(), 1)
+
+    def test_register_range(self):
+        with self.assertRaises(ValueError):
+            self.dispatcher.register(self.handler("bad"), -1)
+        with self.assertRaises(ValueError):
+            self.dispatcher.register(self.handler("bad"), message_type=256)
+
+
+if __name__ == '__main__':
+    unittest.main()
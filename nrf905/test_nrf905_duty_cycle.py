@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+import unittest
+
+from nrf905.nrf905_duty_cycle import Nrf905DutyCycle
+from nrf905.nrf905_gpio import Nrf905Gpio
+from nrf905.nrf905_io_thread import Nrf905IoThread
+
+
+class FakePi:
+    """ Stands in for pigpio.pi.  The CD level can be set and its callbacks
+    called.
+    """
+
+    def __init__(self):
+        self.callbacks = dict()
+        self.carrier = 0
+
+    def set_mode(self, gpio, mode):
+        pass
+
+    def set_pull_up_down(self, gpio, pud):
+        pass
+
+    def write(self, gpio, level):
+        pass
+
+    def read(self, gpio):
+        return self.carrier if gpio == Nrf905Gpio.CARRIER_DETECT else 0
+
+    def callback(self, gpio, edge, function):
+        pi = self
+
+        class Callback:
+            def cancel(self):
+                pi.callbacks.pop(gpio, None)
+        self.callbacks[gpio] = function
+        return Callback()
+
+    def set_carrier(self, level):
+        self.carrier = level
+        function = self.callbacks.get(Nrf905Gpio.CARRIER_DETECT)
+        if function is not None:
+            function(Nrf905Gpio.CARRIER_DETECT, level, 0)
+
+
+class RecordingGpio(Nrf905Gpio):
+    """ Records each mode change and the thread it was made on. """
+
+    def __init__(self, pi):
+        super().__init__(pi)
+        self.modes = []
+        self.threads = set()
+
+    def set_mode_power_down(self, pi):
+        self.__record(self.POWER_DOWN)
+        super().set_mode_power_down(pi)
+
+    def set_mode_standby(self, pi):
+        self.__record(self.STANDBY)
+        super().set_mode_standby(pi)
+
+    def set_mode_receive(self, pi):
+        self.__record(self.SHOCKBURST_RX)
+        super().set_mode_receive(pi)
+
+    def __record(self, mode):
+        self.modes.append(mode)
+        self.threads.add(threading.current_thread())
+
+
+def wait_for(condition, timeout_s=2.0):
+    end_time = time.monotonic() + timeout_s
+    while not condition() and time.monotonic() < end_time:
+        time.sleep(0.001)
+    return condition()
+
+
+class TestNrf905DutyCycle(unittest.TestCase):
+
+    def setUp(self):
+        self.pi = FakePi()
+        self.gpio = RecordingGpio(self.pi)
+
+    def test_cycle(self):
+        """ Each cycle wakes through standby to receive, then sleeps. """
+        duty_cycle = Nrf905DutyCycle(self.gpio, listen_s=0.002, sleep_s=0.002)
+        duty_cycle.start(self.pi)
+        self.assertTrue(wait_for(lambda: duty_cycle.get_cycle_count() >= 3))
+        duty_cycle.stop(self.pi)
+        cycle = [Nrf905Gpio.STANDBY, Nrf905Gpio.SHOCKBURST_RX, Nrf905Gpio.POWER_DOWN]
+        self.assertEqual(self.gpio.modes[:9], cycle * 3)
+        self.assertEqual(duty_cycle.get_carrier_count(), 0)
+        # Sleeping in standby skips the standby step.
+        gpio = RecordingGpio(self.pi)
+        duty_cycle = Nrf905DutyCycle(gpio, listen_s=0.002, sleep_s=0.002,
+                                     sleep_mode=Nrf905Gpio.STANDBY)
+        duty_cycle.start(self.pi)
+        self.assertTrue(wait_for(lambda: duty_cycle.get_cycle_count() >= 2))
+        duty_cycle.stop(self.pi)
+        self.assertEqual(gpio.modes[:4], [Nrf905Gpio.SHOCKBURST_RX, Nrf905Gpio.STANDBY] * 2)
+
+    def test_carrier_extends_listen(self):
+        """ The device stays in receive mode while the carrier is present. """
+        duty_cycle = Nrf905DutyCycle(self.gpio, listen_s=0.2, sleep_s=1.0, hold_s=0.01)
+        duty_cycle.start(self.pi)
+        self.assertTrue(wait_for(lambda: duty_cycle.get_cycle_count() == 1))
+        self.pi.set_carrier(1)
+        time.sleep(0.1)
+        self.assertEqual(duty_cycle.get_mode(), Nrf905Gpio.SHOCKBURST_RX)
+        self.pi.set_carrier(0)
+        self.assertTrue(wait_for(lambda: duty_cycle.get_mode() == Nrf905Gpio.POWER_DOWN))
+        self.assertGreaterEqual(duty_cycle.get_carrier_count(), 1)
+        self.assertGreaterEqual(duty_cycle.get_mode_times()[Nrf905Gpio.SHOCKBURST_RX], 0.1)
+        duty_cycle.stop(self.pi)
+
+    def test_stop(self):
+        """ stop() ends a sleep early, removes the CD callback and leaves the
+        device in the sleep mode.
+        """
+        duty_cycle = Nrf905DutyCycle(self.gpio, listen_s=0.002, sleep_s=10.0)
+        duty_cycle.start(self.pi)
+        self.assertIn(Nrf905Gpio.CARRIER_DETECT, self.pi.callbacks)
+        self.assertTrue(wait_for(lambda: duty_cycle.get_mode() == Nrf905Gpio.POWER_DOWN))
+        start_time = time.monotonic()
+        duty_cycle.stop(self.pi)
+        self.assertLess(time.monotonic() - start_time, 1.0)
+        self.assertNotIn(Nrf905Gpio.CARRIER_DETECT, self.pi.callbacks)
+        self.assertEqual(duty_cycle.get_mode(), Nrf905Gpio.POWER_DOWN)
+        count = len(self.gpio.modes)
+        time.sleep(0.01)
+        self.assertEqual(len(self.gpio.modes), count)
+        # Stopping twice is harmless.
+        duty_cycle.stop(self.pi)
+
+    def test_io_thread(self):
+        """ With an I/O thread, every mode change is made on it. """
+        io = Nrf905IoThread(self.pi)
+        io.start()
+        duty_cycle = Nrf905DutyCycle(self.gpio, listen_s=0.002, sleep_s=0.002, io=io)
+        duty_cycle.start(self.pi)
+        self.assertTrue(wait_for(lambda: duty_cycle.get_cycle_count() >= 2))
+        duty_cycle.stop(self.pi)
+        io.stop()
+        self.assertEqual(len(self.gpio.threads), 1)
+        self.assertIsNot(self.gpio.threads.pop(), threading.current_thread())
+
+
+if __name__ == '__main__':
+    unittest.main()
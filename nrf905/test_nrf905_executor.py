@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import threading
+import unittest
+
+from nrf905.nrf905_dispatcher import Nrf905Dispatcher
+from nrf905.nrf905_executor import Nrf905Executor
+
+
+def make_packet(source, value):
+    return Nrf905Dispatcher.HEADER.pack(1, source) + bytes([value])
+
+
+class TestNrf905Executor(unittest.TestCase):
+
+    def test_order_per_source(self):
+        """ Packets from one source are handled in the order submitted. """
+        received = dict()
+
+        def handler(data):
+            source = Nrf905Dispatcher.HEADER.unpack_from(data)[1]
+            received.setdefault(source, []).append(data[-1])
+
+        executor = Nrf905Executor(handler, workers=3, queue_size=300,
+                                  policy=Nrf905Executor.BLOCK)
+        executor.start()
+        for value in range(100):
+            for source in (1, 2, 3, 4):
+                executor.submit(make_packet(source, value))
+        executor.stop()
+        for source in (1, 2, 3, 4):
+            self.assertEqual(received[source], list(range(100)))
+        stats = executor.get_stats()
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(list(stats.values())[0][0], 400)
+
+    def test_drop_newest(self):
+        """ Submit never waits for a slow handler. """
+        release = threading.Event()
+        executor = Nrf905Executor(lambda data: release.wait(), workers=1,
+                                  queue_size=2)
+        executor.start()
+        results = [executor.submit(make_packet(1, value)) for value in range(10)]
+        release.set()
+        executor.stop()
+        # The worker may have taken the first packet before the others arrive.
+        self.assertTrue(results[0])
+        self.assertFalse(results[-1])
+        self.assertEqual(executor.get_dropped_count(), results.count(False))
+        self.assertEqual(executor.get_submitted_count(), 10)
+
+    def test_drop_oldest(self):
+        received = []
+        executor = Nrf905Executor(lambda data: received.append(data[-1]),
+                                  workers=1, queue_size=2,
+                                  policy=Nrf905Executor.DROP_OLDEST)
+        # Not started, so the lane fills up.
+        for value in range(5):
+            self.assertTrue(executor.submit(make_packet(1, value)))
+        self.assertEqual(executor.get_queue_depths(), [2])
+        executor.start()
+        executor.stop()
+        self.assertEqual(received, [3, 4])
+        self.assertEqual(executor.get_dropped_count(), 3)
+
+    def test_stop_full_lane(self):
+        """ stop() does not need room in a full lane and still handles the
+        packets already queued.
+        """
+        received = []
+        release = threading.Event()
+
+        def handler(data):
+            release.wait()
+            received.append(data[-1])
+        executor = Nrf905Executor(handler, workers=1, queue_size=2)
+        # Not started, so stop() has nothing to do.
+        executor.stop()
+        executor.start()
+        results = [executor.submit(make_packet(1, value)) for value in range(3)]
+        stopper = threading.Thread(target=executor.stop)
+        stopper.start()
+        release.set()
+        stopper.join(2)
+        self.assertFalse(stopper.is_alive())
+        self.assertEqual(len(received), results.count(True))
+        # The workers can be started again.
+        executor.start()
+        executor.submit(make_packet(1, 9))
+        executor.stop()
+        self.assertEqual(received[-1], 9)
+
+    def test_counts_from_threads(self):
+        executor = Nrf905Executor(lambda data: None, workers=1, queue_size=1)
+
+        def submit():
+            for value in range(1000):
+                executor.submit(make_packet(1, value & 0xff))
+        threads = [threading.Thread(target=submit) for count in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(executor.get_submitted_count(), 4000)
+        self.assertEqual(executor.get_dropped_count(), 3999)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            Nrf905Executor(print, workers=0)
+        with self.assertRaises(ValueError):
+            Nrf905Executor(print, policy=7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from nrf905.nrf905_fec import Nrf905Fec
+
+
+MESSAGE = bytes(range(200))
+
+
+class TestNrf905Fec(unittest.TestCase):
+
+    def test_no_loss(self):
+        fec = Nrf905Fec(parity_count=2)
+        frames = fec.encode(3, MESSAGE)
+        self.assertEqual(len(frames), fec.get_frame_count(len(MESSAGE)))
+        self.assertTrue(all(len(frame) == 32 for frame in frames))
+        self.assertEqual(fec.decode(frames), MESSAGE)
+        # Order does not matter.
+        self.assertEqual(fec.decode(frames[::-1]), MESSAGE)
+
+    def test_burst_loss(self):
+        fec = Nrf905Fec(parity_count=3)
+        frames = fec.encode(3, MESSAGE)
+        # Three frames in a row fall in different groups.
+        received = frames[:2] + frames[5:]
+        self.assertEqual(fec.decode(received), MESSAGE)
+        self.assertEqual(fec.get_stats()[0], 3)
+        # Two frames lost from the same group cannot be rebuilt.
+        received = frames[1:3] + frames[4:]
+        self.assertIsNone(fec.decode(received))
+
+    def test_hamming(self):
+        fec = Nrf905Fec(parity_count=1, hamming=True)
+        self.assertEqual(fec.get_fragment_size(), 12)
+        self.assertEqual(fec.get_recoverable(), (1, 1))
+        frames = [bytearray(frame) for frame in fec.encode(9, MESSAGE)]
+        # One bit error in every code word of the first frame.
+        for index in range(len(frames[0])):
+            frames[0][index] ^= 1 << (index % 8)
+        # Two bit errors in a code word rejects the frame, parity rebuilds it.
+        frames[1][5] ^= 0b00000011
+        self.assertEqual(fec.decode(frames), MESSAGE)
+        (recovered, corrected, rejected) = fec.get_stats()
+        self.assertEqual((recovered, corrected, rejected), (1, 32, 1))
+
+    def test_overhead(self):
+        fec = Nrf905Fec(parity_count=0)
+        # 28 bytes per frame, 2 of them the length.
+        self.assertEqual(fec.get_frame_count(26), 1)
+        self.assertEqual(fec.get_frame_count(27), 2)
+        self.assertEqual(fec.get_overhead(26), 32 / 26)
+        self.assertEqual(fec.decode(fec.encode(0, b"")), b"")
+        with self.assertRaises(ValueError):
+            Nrf905Fec(parity_count=256)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from nrf905.nrf905_dispatcher import Nrf905Dispatcher
+from nrf905.nrf905_frame import Nrf905Frame
+
+
+class TestNrf905Frame(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = Nrf905Frame()
+
+    def test_pack_unpack(self):
+        packed = self.frame.pack(7, 0xDDCCBBAA, 0x10005, b"hello", Nrf905Frame.FLAG_RETRY)
+        self.assertEqual(len(packed), 32)
+        data = bytes(packed)
+        self.assertEqual(data[:10], bytes([7, 0xAA, 0xBB, 0xCC, 0xDD, 1, 2, 5, 0, 5]))
+        (message_type, source, sequence, flags, payload) = self.frame.unpack(data)
+        self.assertEqual((message_type, source, sequence, flags), (7, 0xDDCCBBAA, 5, 2))
+        self.assertIsInstance(payload, memoryview)
+        self.assertEqual(payload, b"hello")
+        self.assertEqual(self.frame.key(data), (0xDDCCBBAA, 5))
+        # The dispatcher reads the same type and source.
+        self.assertEqual(Nrf905Dispatcher.HEADER.unpack_from(data), (7, 0xDDCCBBAA))
+
+    def test_dispatched(self):
+        """ A dispatcher handler gets the frame from the version byte on. """
+        handled = []
+        dispatcher = Nrf905Dispatcher()
+        dispatcher.register(lambda *args: handled.append(self.frame.unpack_payload(args[2])),
+                            message_type=7)
+        self.assertTrue(dispatcher.dispatch(bytes(self.frame.pack(7, 9, 300, b"hi", 1))))
+        (sequence, flags, data) = handled[0]
+        self.assertEqual((sequence, flags, bytes(data)), (300, 1, b"hi"))
+        with self.assertRaises(ValueError):
+            self.frame.unpack_payload(b"\x02\x00\x00\x00\x00")
+        with self.assertRaises(ValueError):
+            self.frame.unpack_payload(b"\x01\x00")
+
+    def test_buffer_reused(self):
+        first = self.frame.pack(1, 1, 1, b"abcdef")
+        second = self.frame.pack(1, 1, 2, b"ab")
+        self.assertIs(first, second)
+        # Nothing is left over from the longer frame.
+        self.assertEqual(bytes(second[10:]), b"ab" + bytes(20))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.frame.pack(1, 1, 1, bytes(23))
+        with self.assertRaises(ValueError):
+            self.frame.pack(256, 1, 1, b"")
+        with self.assertRaises(ValueError):
+            self.frame.unpack(bytes(9))
+        # Version 0.
+        with self.assertRaises(ValueError):
+            self.frame.unpack(bytes(32))
+        data = bytearray(self.frame.pack(1, 1, 1, b""))
+        data[9] = 30
+        with self.assertRaises(ValueError):
+            self.frame.unpack(data)
+        with self.assertRaises(ValueError):
+            Nrf905Frame(10)
+
+    def test_batch(self):
+        frames = self.frame.pack_batch(3, [1, 2, 3], [10, 11, 12], [b"a", b"bcd", b""])
+        self.assertEqual(frames.shape, (3, 32))
+        for (index, row) in enumerate(frames):
+            (message_type, source, sequence, flags, payload) = self.frame.unpack(row.tobytes())
+            self.assertEqual((message_type, source, sequence), (3, index + 1, index + 10))
+            self.assertEqual(payload, [b"a", b"bcd", b""][index])
+        (decoded, valid) = self.frame.unpack_batch(frames.tobytes())
+        self.assertEqual(list(decoded["source"]), [1, 2, 3])
+        self.assertEqual(list(decoded["length"]), [1, 3, 0])
+        self.assertTrue(valid.all())
+        (decoded, valid) = self.frame.unpack_batch(b"")
+        self.assertEqual(len(decoded), 0)
+
+    def test_batch_stride(self):
+        """ Frames spaced out in a ring, e.g. Nrf905Gateway slots with a 16
+        byte slot header.
+        """
+        stride = 48
+        buffer = bytearray(8 + 3 * stride - 16)
+        for index in range(3):
+            offset = 8 + index * stride
+            buffer[offset:offset + 32] = self.frame.pack(2, 100 + index, index, bytes([index]))
+        buffer[8 + stride + 5] = 9  # Wrong version.
+        (decoded, valid) = self.frame.unpack_batch(buffer, offset=8, stride=stride)
+        self.assertEqual(list(decoded["source"]), [100, 101, 102])
+        self.assertEqual(list(valid), [True, False, True])
+        self.assertEqual(list(decoded["data"][:, 0]), [0, 1, 2])
+        # The array is a view, so changes to the buffer are seen.
+        buffer[8] = 5
+        self.assertEqual(decoded["message_type"][0], 5)
+        with self.assertRaises(ValueError):
+            self.frame.unpack_batch(buffer, count=4, offset=8, stride=stride)
+
+
+if __name__ == '__main__':
+    unittest.main()
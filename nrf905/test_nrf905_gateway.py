@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import ast
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+from nrf905.nrf905_gateway import Nrf905Gateway, Nrf905GatewayClient
+
+
+# Consumers are separate programs, so the reader is run in a new interpreter
+# rather than a child process that would share this one's resource tracker.
+READER = """
+import sys
+from nrf905.nrf905_gateway import Nrf905GatewayReader
+consumer = None
+if sys.argv[2] != "None":
+    consumer = int(sys.argv[2])
+reader = Nrf905GatewayReader(sys.argv[1], consumer)
+print(reader.available(), flush=True)
+# Wait until the test has published the packets.
+sys.stdin.readline()
+packets = []
+item = reader.read()
+while item is not None:
+    (sequence, time_us, data) = item
+    packets.append((sequence, time_us, bytes(data), reader.is_valid(sequence)))
+    data.release()
+    item = reader.read()
+print(repr((packets, reader.get_lost_count())), flush=True)
+sys.stdin.readline()
+reader.close()
+"""
+
+
+class TestNrf905Gateway(unittest.TestCase):
+
+    def setUp(self):
+        self.transmitted = []
+        self.socket_path = os.path.join(tempfile.mkdtemp(), "nrf905.sock")
+        self.gateway = Nrf905Gateway("nrf905_test_%d" % os.getpid(), self.socket_path,
+                                     self.transmitted.append, slot_count=4)
+
+    def tearDown(self):
+        self.gateway.close()
+        os.rmdir(os.path.dirname(self.socket_path))
+
+    def start_reader(self, consumer):
+        self.reader = subprocess.Popen(
+            [sys.executable, "-c", READER, self.gateway.get_name(), str(consumer)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        # Nothing is waiting when the reader attaches.
+        self.assertEqual(self.reader.stdout.readline().strip(), "0")
+
+    def finish_reader(self):
+        self.reader.stdin.write("\n")
+        self.reader.stdin.flush()
+        return ast.literal_eval(self.reader.stdout.readline())
+
+    def stop_reader(self):
+        self.reader.stdin.write("\n")
+        self.reader.stdin.flush()
+        self.assertEqual(self.reader.wait(), 0)
+        self.reader.stdin.close()
+        self.reader.stdout.close()
+
+    def test_read(self):
+        self.start_reader(0)
+        self.gateway.publish(b'\x01\x02\x03', 1000)
+        self.gateway.publish(b'\x04', 2000)
+        self.assertEqual(self.gateway.get_consumer_lag(), {0: 2})
+        (packets, lost) = self.finish_reader()
+        self.assertEqual(packets, [(1, 1000, b'\x01\x02\x03', True), (2, 2000, b'\x04', True)])
+        self.assertEqual(lost, 0)
+        self.assertEqual(self.gateway.get_consumer_lag(), {0: 0})
+        self.stop_reader()
+
+    def test_overrun(self):
+        """ The gateway never waits, a slow reader loses the oldest packets. """
+        self.start_reader(None)
+        for value in range(10):
+            self.gateway.publish(bytes([value]), value)
+        (packets, lost) = self.finish_reader()
+        self.assertEqual([packet[0] for packet in packets], [7, 8, 9, 10])
+        self.assertEqual(packets[0][2], b'\x06')
+        self.assertEqual(lost, 6)
+        self.stop_reader()
+
+    def test_transmit(self):
+        self.gateway.start()
+        client = Nrf905GatewayClient(self.socket_path)
+        self.assertEqual(client.transmit(b'\x10\x20'), Nrf905Gateway.STATUS_OK)
+        self.assertEqual(client.transmit(bytes(33)), Nrf905Gateway.STATUS_ERROR)
+        client.close()
+        self.assertEqual(self.transmitted, [b'\x10\x20'])
+
+    def test_transmit_timeout(self):
+        """ A client gets an error rather than waiting for ever when the
+        transmit thread does not answer.
+        """
+        release = threading.Event()
+        socket_path = os.path.join(os.path.dirname(self.socket_path), "timeout.sock")
+        gateway = Nrf905Gateway("nrf905_timeout_%d" % os.getpid(), socket_path,
+                                lambda data: release.wait(), reply_timeout_s=0.1)
+        gateway.start()
+        try:
+            client = Nrf905GatewayClient(socket_path)
+            self.assertEqual(client.transmit(b'\x01'), Nrf905Gateway.STATUS_ERROR)
+            client.close()
+        finally:
+            release.set()
+            gateway.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import time
+import unittest
+
+from nrf905.nrf905_gpio import Nrf905Gpio
+from nrf905.nrf905_hardware import Nrf905Hardware
+from nrf905.nrf905_replay import Nrf905ReplayPi
+
+
+def wait_for(condition, timeout_s=2.0):
+    end_time = time.monotonic() + timeout_s
+    while not condition() and time.monotonic() < end_time:
+        time.sleep(0.001)
+    return condition()
+
+
+class TimingPi(Nrf905ReplayPi):
+    """ Records when each pin is written and when TRX_CE is pulsed. """
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, gpio, level):
+        self.writes.append((gpio, level, time.perf_counter()))
+        super().write(gpio, level)
+
+    def gpio_trigger(self, gpio, pulse_len, level):
+        self.writes.append((gpio, "pulse", time.perf_counter()))
+
+
+class TestNrf905Hardware(unittest.TestCase):
+    """ Not connected tests of Nrf905Hardware using Nrf905ReplayPi. """
+
+    def setUp(self):
+        self.pi = Nrf905ReplayPi()
+        self.hardware = Nrf905Hardware(pi=self.pi, address_matched_wired=True,
+                                       carrier_detect_wired=True)
+        self.hardware.open()
+
+    def tearDown(self):
+        self.hardware.term()
+
+    def test_receive_twice(self):
+        """ Each receive() replaces the callbacks rather than adding more. """
+        for count in range(5):
+            self.hardware.receive(0x5a5a5a5a).result()
+        for pin in Nrf905Gpio.callback_pins:
+            self.assertEqual(self.pi.get_callback_count(pin), 1)
+
+    def test_address_matched_then_data_ready(self):
+        """ AM pre-arms the read, DR completes it with one SPI read and the
+        packet carries the AM tick.
+        """
+        self.hardware.receive(0x5a5a5a5a).result()
+        self.hardware.address_matched_callback(Nrf905Gpio.ADDRESS_MATCHED, 1, 100)
+        self.pi.inject(b"abcd", 200)
+        packets = []
+        self.assertTrue(wait_for(lambda: packets.extend(self.hardware.get_receive_packets())
+                                 or packets))
+        self.assertEqual(len(packets), 1)
+        self.assertEqual((packets[0].am_tick, packets[0].dr_tick), (100, 200))
+        self.assertEqual(bytes(packets[0].data[:4]), b"abcd")
+        self.assertEqual(self.pi.get_stats(), (1, 1, 0))
+        self.assertEqual(self.hardware.get_aborted_count(), 0)
+
+    def test_address_matched_without_data_ready(self):
+        """ AM falling without DR, e.g. a CRC failure, counts as aborted and
+        nothing is read.
+        """
+        self.hardware.receive(0x5a5a5a5a).result()
+        self.hardware.address_matched_callback(Nrf905Gpio.ADDRESS_MATCHED, 1, 100)
+        self.hardware.address_matched_callback(Nrf905Gpio.ADDRESS_MATCHED, 0, 5000)
+        self.assertEqual(self.hardware.get_aborted_count(), 1)
+        # Let the pre-armed read run.
+        self.hardware.receive(0x5a5a5a5a).result()
+        self.assertEqual(self.hardware.get_receive_packets(), [])
+        self.assertEqual(self.pi.get_stats(), (0, 0, 0))
+
+    def test_data_ready_without_address_matched(self):
+        """ With AM wired, DR with no AM edge before it still reads the
+        payload.
+        """
+        self.hardware.receive(0x5a5a5a5a).result()
+        self.pi.inject(b"wxyz", 300)
+        packets = []
+        self.assertTrue(wait_for(lambda: packets.extend(self.hardware.get_receive_packets())
+                                 or packets))
+        self.assertEqual(packets[0].dr_tick, 300)
+        self.assertIsNone(packets[0].am_tick)
+        self.assertEqual(bytes(packets[0].data[:4]), b"wxyz")
+
+    def test_transmit_too_long(self):
+        """ Data longer than the TX payload width is not split. """
+        with self.assertRaises(ValueError):
+            self.hardware.transmit(bytes(33)).result()
+
+    def test_transmit_then_receive(self):
+        """ Receiving straight after a transmit waits for the packet to
+        leave before TX_EN is dropped.
+        """
+        pi = TimingPi()
+        hardware = Nrf905Hardware(pi=pi)
+        hardware.open()
+        hardware.transmit(b"hello").result()
+        hardware.receive(0x5a5a5a5a).result()
+        hardware.term()
+        pulses = [write[2] for write in pi.writes
+                  if write[:2] == (Nrf905Gpio.TRANSMIT_RECEIVE_CHIP_ENABLE, "pulse")]
+        ends = [write[2] for write in pi.writes
+                if write[:2] == (Nrf905Gpio.TRANSMIT_ENABLE, 0) and write[2] > pulses[0]]
+        self.assertEqual(len(pulses), 1)
+        on_air_us = (ends[0] - pulses[0]) * 1000000
+        self.assertGreaterEqual(on_air_us, hardware.get_airtime_us())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from nrf905.nrf905_hopper import Nrf905Hopper
+
+
+class SpiRecorder:
+    """ Records the channel config calls instead of accessing the SPI bus. """
+
+    def __init__(self):
+        self.channels = []
+
+    def set_channel_config(self, pi, channel, hfreq_pll, pa_pwr):
+        self.channels.append(channel)
+
+
+class TestNrf905Hopper(unittest.TestCase):
+
+    def test_same_seed_same_sequence(self):
+        """ Both ends of a link must hop in step. """
+        channels = [100, 105, 110, 115, 120]
+        tx = Nrf905Hopper(SpiRecorder(), channels, 1234)
+        rx = Nrf905Hopper(SpiRecorder(), channels, 1234)
+        self.assertEqual(tx.get_sequence(), rx.get_sequence())
+        self.assertEqual(sorted(tx.get_sequence()), channels)
+
+    def test_packet_done(self):
+        spi = SpiRecorder()
+        hopper = Nrf905Hopper(spi, [100, 105, 110], 1, hop_every=2)
+        hopper.start(None)
+        sequence = hopper.get_sequence()
+        self.assertFalse(hopper.packet_done(None))
+        self.assertTrue(hopper.packet_done(None))
+        self.assertEqual(hopper.get_channel(), sequence[1])
+        self.assertEqual(spi.channels, sequence[0:2])
+        # Sync wraps around the sequence.
+        hopper.sync(None, 4)
+        self.assertEqual(hopper.get_index(), 1)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            Nrf905Hopper(SpiRecorder(), [], 1)
+        with self.assertRaises(ValueError):
+            Nrf905Hopper(SpiRecorder(), [100], 1, hop_every=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import threading
+import unittest
+
+from nrf905.nrf905_io_thread import Nrf905IoThread
+
+
+class TestNrf905IoThread(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.pi = object()
+        self.io = Nrf905IoThread(self.pi)
+
+    def tearDown(self):
+        self.io.stop()
+
+    def record(self, pi, value):
+        self.assertIs(pi, self.pi)
+        self.calls.append((value, threading.current_thread()))
+        return value * 2
+
+    def test_order_and_thread(self):
+        self.io.start()
+        futures = [self.io.submit(self.record, value) for value in range(20)]
+        self.assertEqual([future.result() for future in futures], list(range(0, 40, 2)))
+        self.assertEqual([call[0] for call in self.calls], list(range(20)))
+        # Every call was made on the same thread, which is not this one.
+        threads = set(call[1] for call in self.calls)
+        self.assertEqual(len(threads), 1)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_coalesce(self):
+        # Queue before starting so that everything is in one batch.
+        first = self.io.submit(self.record, 1, coalesce="channel")
+        other = self.io.submit(self.record, 2)
+        last = self.io.submit(self.record, 3, coalesce="channel")
+        self.io.start()
+        self.assertEqual(first.result(), 6)
+        self.assertEqual(last.result(), 6)
+        self.assertEqual(other.result(), 4)
+        self.assertEqual([call[0] for call in self.calls], [2, 3])
+        self.assertEqual(self.io.get_stats(), (2, 1, 1))
+
+    def test_exception(self):
+        self.io.start()
+        future = self.io.submit(lambda pi: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            future.result()
+        # The thread keeps running.
+        self.assertEqual(self.io.call(self.record, 5), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import unittest
+
+from nrf905.nrf905_gpio import Nrf905Gpio
+from nrf905.nrf905_hardware import Nrf905Hardware
+from nrf905.nrf905_profile import Nrf905Profile, Nrf905Profiles
+from nrf905.nrf905_replay import Nrf905ReplayPi
+from nrf905.nrf905_spi import Nrf905Spi
+
+
+class RecordingPi(Nrf905ReplayPi):
+    """ Records the SPI transfers and the GPIO writes. """
+
+    def __init__(self):
+        super().__init__()
+        self.transfers = []
+        self.writes = []
+
+    def spi_xfer(self, handle, data):
+        self.transfers.append(bytes(data))
+        return super().spi_xfer(handle, data)
+
+    def write(self, gpio, level):
+        self.writes.append((gpio, level))
+        super().write(gpio, level)
+
+
+class TestNrf905Profile(unittest.TestCase):
+
+    def setUp(self):
+        self.pi = RecordingPi()
+        self.spi = Nrf905Spi(self.pi, 0)
+        self.day = Nrf905Profile("day", 433.2, 0xDDCCBBAA, tx_address=0x5a5a5a5a)
+
+    def test_image(self):
+        """ The image matches configuration_register_create(). """
+        image = self.spi.configuration_register_create(433.2, 0xDDCCBBAA, 16)
+        self.assertEqual(self.day.get_image(), bytes(image))
+        self.assertEqual(self.day.get_transmit_address_command(),
+                         bytes([Nrf905Spi.INSTRUCTION_W_TX_ADDRESS, 0x5a, 0x5a, 0x5a, 0x5a]))
+        profile = Nrf905Profile("small", 868.2, 0x12, address_width=1, payload_width=8,
+                                crc_bits=8, pa_pwr=3, rx_red_pwr=True)
+        self.assertEqual(profile.get_image(),
+                         bytes([0b01110101, 0b00011110, 0x11, 8, 8, 0x12, 0, 0, 0, 0b01011000]))
+        self.assertIsNone(profile.get_transmit_address_command())
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Nrf905Profile("bad", 400.0, 1)
+        with self.assertRaises(ValueError):
+            Nrf905Profile("bad", 433.2, 1, crc_bits=4)
+        with self.assertRaises(ValueError):
+            Nrf905Profile("bad", 433.2, 1, address_width=2)
+        with self.assertRaises(ValueError):
+            Nrf905Profile("bad", 433.2, 1, payload_width=33)
+        with self.assertRaises(ValueError):
+            Nrf905Profile("bad", 433.2, 1, pa_pwr=4)
+        with self.assertRaises(ValueError):
+            Nrf905Profile("bad", 433.2, 0x100, address_width=1)
+
+    def test_write_configuration(self):
+        """ The first write is the whole register, then only what changed. """
+        image = self.day.get_image()
+        self.assertEqual(self.spi.write_configuration(self.pi, image),
+                         bytes([Nrf905Spi.INSTRUCTION_W_CONFIG]) + image)
+        self.assertIsNone(self.spi.write_configuration(self.pi, image))
+        # The frequency and power only need CHANNEL_CONFIG.
+        other = Nrf905Profile("other", 433.7, 0xDDCCBBAA, pa_pwr=2)
+        self.assertEqual(self.spi.write_configuration(self.pi, other.get_image()),
+                         bytes([0b10001000, 0b01110001]))
+        # One transfer from the first changed byte to the last.
+        other = Nrf905Profile("other", 433.7, 0xDDCC00AA, pa_pwr=2, crc_bits=8)
+        self.assertEqual(self.spi.write_configuration(self.pi, other.get_image()),
+                         bytes([Nrf905Spi.INSTRUCTION_W_CONFIG | 6, 0x00, 0xCC, 0xDD, 0b01011000]))
+        self.assertEqual(len(self.pi.transfers), 3)
+        # Writes by other functions are tracked.
+        self.spi.write_receive_address(self.pi, 0xDDCCBBAA)
+        self.spi.set_channel_config(self.pi, 108, 0, 0)
+        expected = bytearray(other.get_image())
+        expected[0:2] = [0b01101100, 0]
+        expected[6] = 0xBB
+        self.assertEqual(self.spi.get_configuration(), bytes(expected))
+        # The widths are taken from the image.
+        self.spi.write_configuration(self.pi, Nrf905Profile("small", 433.2, 1, payload_width=8,
+                                                            address_width=1).get_image())
+        self.assertEqual(len(self.spi.prepare_receive_payload()), 9)
+        self.assertEqual(len(self.spi.prepare_transmit_address(0x12345678)), 2)
+        self.spi.read_transmit_address(self.pi)
+        self.assertEqual(self.pi.transfers[-1],
+                         bytes([Nrf905Spi.INSTRUCTION_R_TX_ADDRESS, 0]))
+        with self.assertRaises(ValueError):
+            self.spi.write_configuration(self.pi, bytes(9))
+
+    def test_switch_profile(self):
+        hardware = Nrf905Hardware(pi=self.pi, crc_bits=16)
+        hardware.open()
+        hardware.switch_profile(self.day).result()
+        self.assertEqual(self.pi.transfers[-2:], [
+            bytes([Nrf905Spi.INSTRUCTION_W_CONFIG]) + self.day.get_image(),
+            self.day.get_transmit_address_command()])
+        hardware.receive(0xDDCCBBAA).result()
+        count = len(self.pi.transfers)
+        # Only the channel changes, so one CHANNEL_CONFIG is sent and the
+        # TX address is not sent again.
+        night = Nrf905Profile("night", 433.7, 0xDDCCBBAA, tx_address=0x5a5a5a5a)
+        hardware.switch_profile(night).result()
+        self.assertEqual(self.pi.transfers[count:],
+                         [bytes([Nrf905Spi.INSTRUCTION_CHANNEL_CONFIG, 0b01110001])])
+        self.assertIs(hardware.get_profile(), night)
+        # The device is receiving again after the switch.
+        trx_ce = [level for (gpio, level) in self.pi.writes
+                  if gpio == Nrf905Gpio.TRANSMIT_RECEIVE_CHIP_ENABLE]
+        self.assertEqual(trx_ce[-1], 1)
+        self.assertEqual(self.pi.read(Nrf905Gpio.TRANSMIT_ENABLE), 0)
+        hardware.switch_profile(night).result()
+        self.assertEqual(len(self.pi.transfers) - count, 1)
+        # 10 bit preamble, 4 byte address, 32 byte payload and 8 bit CRC.
+        hardware.switch_profile(Nrf905Profile("dusk", 433.7, 0xDDCCBBAA, crc_bits=8)).result()
+        self.assertEqual(self.pi.transfers[-1],
+                         bytes([Nrf905Spi.INSTRUCTION_W_CONFIG | 9, 0b01011000]))
+        self.assertEqual(hardware.get_airtime_us(), 6120)
+        hardware.term()
+
+    def test_load(self):
+        (handle, path) = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        try:
+            with open(path, "w") as file:
+                json.dump({"day": {"frequency_mhz": 433.2, "rx_address": "0xDDCCBBAA",
+                                   "tx_address": 0x5a5a5a5a},
+                           "night": {"frequency_mhz": 433.7, "rx_address": 1, "crc_bits": 8}},
+                          file)
+            profiles = Nrf905Profiles()
+            profiles.load(path)
+            self.assertEqual(profiles.get_names(), ["day", "night"])
+            self.assertEqual(profiles.get("day").get_image(), self.day.get_image())
+            self.assertEqual(profiles.get("night").get_crc_bits(), 8)
+            with self.assertRaises(ValueError):
+                profiles.get("dusk")
+            # Nothing is added if any profile is not valid.
+            with open(path, "w") as file:
+                json.dump({"dusk": {"frequency_mhz": 433.2, "rx_address": 1},
+                           "bad": {"frequency_mhz": 433.2, "rx_address": 1, "colour": 1}},
+                          file)
+            with self.assertRaises(ValueError):
+                profiles.load(path)
+            self.assertEqual(profiles.get_names(), ["day", "night"])
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import threading
+import unittest
+
+from nrf905.nrf905_frame import Nrf905Frame
+from nrf905.nrf905_relay import Nrf905Relay
+
+
+class Network:
+    """ Delivers each transmitted frame to the node with the TX address. """
+
+    def __init__(self):
+        self.nodes = dict()
+        self.delivered = []
+        self.done = threading.Event()
+
+    def add(self, address, **kwargs):
+        def transmit(data, next_hop):
+            # Copy, as the radio would.
+            self.nodes[next_hop](bytearray(data))
+
+        def handler(origin, message):
+            self.delivered.append((address, origin, bytes(message)))
+            self.done.set()
+        relay = Nrf905Relay(address, transmit, handler, **kwargs)
+        self.nodes[address] = relay
+        return relay
+
+
+class TestNrf905Relay(unittest.TestCase):
+
+    def test_forward_and_learn(self):
+        """ 1 - 2 - 3, with 1 only knowing 2 is the way to 3. """
+        network = Network()
+        first = network.add(1)
+        second = network.add(2)
+        third = network.add(3)
+        first.add_route(3, 2, 2)
+        second.add_route(3, 3)
+        for relay in (first, second, third):
+            relay.start()
+        self.assertTrue(first.send(3, b"hello"))
+        self.assertTrue(network.done.wait(2))
+        for relay in (first, second, third):
+            relay.stop()
+        self.assertEqual(network.delivered, [(3, 1, b"hello")])
+        # 3 learnt the way back to 1 through 2.
+        self.assertEqual(third.get_route(1), (2, 2))
+        self.assertEqual(third.get_route(2), (2, 1))
+        self.assertEqual(second.get_route(1), (1, 1))
+        self.assertEqual(second.get_stats()[:2], (0, 1))
+        self.assertEqual(third.get_stats()[0], 1)
+
+    def test_in_place(self):
+        """ A writable buffer is changed in place and forwarded without a
+        copy.
+        """
+        sent = []
+        relay = Nrf905Relay(2, lambda data, next_hop: sent.append((data, next_hop)), None)
+        relay.add_route(3, 7)
+        frame = Nrf905Frame()
+        data = bytearray(frame.pack(Nrf905Relay.RELAY_TYPE, 1, 0,
+                                    Nrf905Relay.RELAY.pack(3, 1, 0) + b"x"))
+        view = memoryview(data)
+        self.assertTrue(relay(view))
+        relay.start()
+        relay.stop()
+        self.assertIs(sent[0][0], view)
+        self.assertEqual(sent[0][1], 7)
+        self.assertEqual(Nrf905Relay.RELAY.unpack_from(data, Nrf905Frame.HEADER.size), (3, 2, 1))
+
+    def test_drops(self):
+        others = []
+        relay = Nrf905Relay(2, None, None, handler_other=others.append, hop_limit=3,
+                            queue_size=1)
+        frame = Nrf905Frame()
+
+        def relayed(destination, hops):
+            return bytes(frame.pack(Nrf905Relay.RELAY_TYPE, 1, 0,
+                                    Nrf905Relay.RELAY.pack(destination, 1, hops)))
+        # No route to 9.
+        self.assertFalse(relay(relayed(9, 0)))
+        relay.add_route(9, 8)
+        # The hop limit has been reached.
+        self.assertFalse(relay(relayed(9, 2)))
+        self.assertTrue(relay(relayed(9, 1)))
+        # The queue is full and the thread is not running.
+        self.assertFalse(relay(relayed(9, 0)))
+        self.assertFalse(relay.send(9, b"x"))
+        self.assertFalse(relay.send(5, b"x"))
+        # Not a relayed frame.
+        plain = bytes(frame.pack(1, 1, 0, b"x"))
+        self.assertFalse(relay(plain))
+        self.assertEqual(others, [plain])
+        self.assertEqual(relay.get_stats(), (0, 0, 2, 2, 1))
+        with self.assertRaises(ValueError):
+            relay.send(9, bytes(relay.get_message_max() + 1))
+
+    def test_route_learning(self):
+        relay = Nrf905Relay(2, None, lambda origin, message: None, route_timeout_s=0)
+        frame = Nrf905Frame()
+
+        def relayed(origin, last_hop, hops):
+            return bytes(frame.pack(Nrf905Relay.RELAY_TYPE, origin, 0,
+                                    Nrf905Relay.RELAY.pack(2, last_hop, hops)))
+        relay.add_route(5, 6, 3)
+        relay(relayed(5, 4, 0))
+        # Added routes are not replaced.
+        self.assertEqual(relay.get_route(5), (6, 3))
+        relay.remove_route(5)
+        relay(relayed(5, 4, 2))
+        self.assertEqual(relay.get_routes(), {})
+        relay = Nrf905Relay(2, None, lambda origin, message: None)
+        relay(relayed(5, 4, 2))
+        self.assertEqual(relay.get_route(5), (4, 3))
+        # A shorter route replaces a longer one, a longer one does not.
+        relay(relayed(5, 6, 0))
+        self.assertEqual(relay.get_route(5), (6, 1))
+        relay(relayed(5, 4, 2))
+        self.assertEqual(relay.get_route(5), (6, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+from nrf905.nrf905_capture import Nrf905Capture, Nrf905CaptureAnalyzer, Nrf905CaptureWriter
+from nrf905.nrf905_frame import Nrf905Frame
+from nrf905.nrf905_gpio import Nrf905Gpio
+from nrf905.nrf905_replay import Nrf905LoadGenerator, Nrf905ReplayPi
+from nrf905.nrf905_spi import Nrf905Spi
+
+
+class TestNrf905Replay(unittest.TestCase):
+
+    def test_replay_pi(self):
+        pi = Nrf905ReplayPi()
+        edges = []
+        callback = pi.callback(Nrf905Gpio.DATA_READY, 2, lambda *args: edges.append(args))
+        command = bytes([Nrf905Spi.INSTRUCTION_R_RX_PAYLOAD]) + bytes(4)
+        pi.inject(b"abcd", 100)
+        self.assertEqual(edges, [(Nrf905Gpio.DATA_READY, 1, 100)])
+        self.assertEqual(pi.spi_xfer(0, command), (5, bytearray(b"\0abcd")))
+        # The payload has been read, so the next read finds nothing.
+        self.assertEqual(pi.spi_xfer(0, command), (5, bytearray(5)))
+        pi.inject(b"1111")
+        pi.inject(b"2222")
+        self.assertEqual(pi.spi_xfer(0, command)[1][1:], b"2222")
+        self.assertEqual(pi.get_stats(), (3, 2, 1))
+        callback.cancel()
+        pi.inject(b"3333")
+        self.assertEqual(len(edges), 3)
+
+    def test_run(self):
+        generator = Nrf905LoadGenerator()
+        frames = generator.synthetic_frames(100)
+        (handle, path) = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            result = generator.run(frames, rate_hz=500, capture_path=path)
+            records = Nrf905CaptureAnalyzer(path).get_records()
+        finally:
+            os.remove(path)
+        self.assertEqual(result["injected"], 100)
+        # A slow machine may lose the odd frame, but not most of them.
+        self.assertGreater(result["delivered"], 50)
+        self.assertIsNotNone(result["latency_us"][50])
+        self.assertGreaterEqual(result["latency_us"][50], 0)
+        # A frame is either replaced before it is read or read at most once.
+        self.assertLessEqual(result["delivered"] + result["overrun"], 100)
+        self.assertEqual(len(records), 100)
+        dropped = records["status"] == Nrf905Capture.DROPPED
+        self.assertEqual(int(dropped.sum()), 100 - result["delivered"])
+        with self.assertRaises(ValueError):
+            generator.run(frames)
+
+    def test_capture_frames(self):
+        (handle, path) = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            writer = Nrf905CaptureWriter(path)
+            writer.write(5000, 5100, 7, 1, length=4)
+            writer.write(6000, 6100, 7, 2, status=Nrf905Capture.ERROR)
+            writer.write(9000, 9100, 8, 1, length=30)
+            writer.close()
+            generator = Nrf905LoadGenerator()
+            (frames, times_us) = generator.capture_frames(path)
+            self.assertEqual(list(times_us), [0, 4000])
+            frame = Nrf905Frame()
+            self.assertEqual(frame.key(frames[0]), (7, 1))
+            self.assertEqual(len(frame.unpack(frames[1])[4]), frame.get_data_max())
+            result = generator.run(frames, times_us=times_us, speedup=10)
+            self.assertEqual(result["injected"], 2)
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
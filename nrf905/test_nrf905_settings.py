@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from nrf905.nrf905 import Nrf905, StateError
+
+
+class TestNrf905Settings(unittest.TestCase):
+    """ Not connected tests of the Nrf905 parameter checks. """
+
+    def test_set_frequency(self):
+        transceiver = Nrf905()
+        # Verify it works before open for frequencies the nRF905 can reach.
+        transceiver.set_frequency(433.2)
+        transceiver.set_frequency(868.2)
+        # Verify ValueError before open for frequencies out of range.
+        with self.assertRaises(ValueError):
+            transceiver.set_frequency(400.0)
+        with self.assertRaises(ValueError):
+            transceiver.set_frequency(1000.0)
+        # Set after open causes StateError.
+        transceiver.open(434)
+        with self.assertRaises(StateError):
+            transceiver.set_frequency(433.2)
+        transceiver.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -46,6 +46,50 @@ class TestNrf905SpiNc(unittest.TestCase):
         data = self.spi.configuration_register_create(frequency_mhz, rx_address, crc_mode)
         self.spi.configuration_register_print(data)
 
+    def test_frequency_to_channel(self):
+        """ Verify the conversion against values from table 24. """
+        self.assertEqual(self.spi.frequency_to_channel(433.2), (0b01101100, 0))
+        self.assertEqual(self.spi.frequency_to_channel(868.2), (0b01110101, 1))
+        self.assertEqual(self.spi.frequency_to_channel(927.8), (0b110011111, 1))
+        self.assertEqual(self.spi.channel_to_frequency(0b01101100, 0), 433.2)
+        self.assertEqual(self.spi.channel_to_frequency(0b01110101, 1), 868.2)
+        # Frequency out of range.
+        with self.assertRaises(ValueError):
+            self.spi.frequency_to_channel(400.0)
+
+    def test_set_channel_config_range(self):
+        """ Out of range values raise ValueError before any SPI access. """
+        with self.assertRaises(ValueError):
+            self.spi.set_channel_config(self.pi, 512, 0, 0)
+        with self.assertRaises(ValueError):
+            self.spi.set_channel_config(self.pi, -1, 0, 0)
+        with self.assertRaises(ValueError):
+            self.spi.set_channel_config(self.pi, 108, 2, 0)
+        with self.assertRaises(ValueError):
+            self.spi.set_channel_config(self.pi, 108, 0, 4)
+
+    def test_prepare_receive_payload(self):
+        """ The command is R_RX_PAYLOAD and a dummy byte for each of the 32
+        payload bytes, made once and reused.
+        """
+        command = self.spi.prepare_receive_payload()
+        self.assertEqual(len(command), 33)
+        self.assertEqual(command[0], Nrf905Spi.INSTRUCTION_R_RX_PAYLOAD)
+        self.assertIs(self.spi.prepare_receive_payload(), command)
+
+    def test_prepare_transmit(self):
+        """ Payloads are padded to the TX payload width and addresses are
+        sent LSB first.
+        """
+        command = self.spi.prepare_transmit_payload(b"\x01\x02")
+        self.assertEqual(command, bytes([Nrf905Spi.INSTRUCTION_W_TX_PAYLOAD, 1, 2]) + bytes(30))
+        with self.assertRaises(ValueError):
+            self.spi.prepare_transmit_payload(bytes(33))
+        command = self.spi.prepare_transmit_address(0xDDCCBBAA)
+        self.assertEqual(command, bytes([Nrf905Spi.INSTRUCTION_W_TX_ADDRESS, 0xAA, 0xBB, 0xCC, 0xDD]))
+        # 10 bit preamble, 4 byte address, 32 byte payload and 16 bit CRC.
+        self.assertEqual(self.spi.get_transmit_airtime_us(16), 6280)
+
     def test_status_register(self):
         """ Gets the last read value of the status register.  When not
         connected, this is always 0.
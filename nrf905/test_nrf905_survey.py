@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import time
+import unittest
+
+from nrf905.nrf905_gpio import Nrf905Gpio
+from nrf905.nrf905_survey import Nrf905Survey
+
+
+class Radio:
+    """ Stands in for the SPI, GPIO and pigpio instances.  CD is high on
+    the channels in busy, for the fraction of reads given.
+    """
+
+    def __init__(self, busy):
+        self.busy = busy
+        self.channel = None
+        self.calls = []
+        self.reads = dict()
+        self.times = dict()
+
+    def set_channel_config(self, pi, channel, hfreq_pll, pa_pwr):
+        self.calls.append(("channel", channel))
+        self.channel = channel
+        self.times[channel] = time.monotonic()
+
+    def set_mode_standby(self, pi):
+        self.calls.append("standby")
+
+    def set_mode_receive(self, pi):
+        self.calls.append("receive")
+
+    def wait_settled(self):
+        pass
+
+    def read(self, pin):
+        if pin != Nrf905Gpio.CARRIER_DETECT:
+            raise ValueError("not the CD pin")
+        count = self.reads.get(self.channel, 0)
+        self.reads[self.channel] = count + 1
+        self.times[self.channel, "last"] = time.monotonic()
+        # Busy for the first fraction of every 10 reads.
+        return 1 if (count % 10) < 10 * self.busy.get(self.channel, 0.0) else 0
+
+
+class TestNrf905Survey(unittest.TestCase):
+
+    def test_survey(self):
+        radio = Radio({110: 1.0, 105: 0.5})
+        survey = Nrf905Survey(radio, radio)
+        dwell_s = 0.02
+        ranked = survey.survey(radio, [100, 105, 110], dwell_s=dwell_s, sample_interval_s=0)
+        # Each channel is tuned in standby, in the order given, then sampled
+        # in receive mode.  The device is left in standby.
+        self.assertEqual(radio.calls, [
+            "standby", ("channel", 100), "receive",
+            "standby", ("channel", 105), "receive",
+            "standby", ("channel", 110), "receive",
+            "standby"])
+        for channel in (100, 105, 110):
+            self.assertGreaterEqual(radio.times[channel, "last"] - radio.times[channel],
+                                    dwell_s * 0.9)
+        self.assertEqual([channel for (channel, occupancy) in ranked], [100, 105, 110])
+        occupancy = dict(ranked)
+        self.assertEqual(occupancy[100], 0.0)
+        self.assertEqual(occupancy[110], 1.0)
+        self.assertAlmostEqual(occupancy[105], 0.5, delta=0.1)
+        self.assertEqual(survey.quietest(2), [100, 105])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+import time
+import unittest
+
+from nrf905.nrf905_tdma import Nrf905Tdma, Nrf905TdmaCoordinator, Nrf905TdmaNode
+from nrf905.nrf905_tick_clock import Nrf905TickClock
+
+
+class TestNrf905Tdma(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Nrf905TickClock()
+        self.clock.set_reference(0xfff00000, time.time())
+        self.beacons = []
+        self.coordinator = Nrf905TdmaCoordinator(0xc0, self.beacons.append, self.clock,
+                                                 slot_count=6, slot_us=10000)
+
+    def test_assign(self):
+        coordinator = self.coordinator
+        self.assertEqual([coordinator.assign(address) for address in range(1, 8)],
+                         [1, 2, 3, 4, 5, 6, None])
+        self.assertEqual(coordinator.assign(3), 3)
+        self.assertTrue(coordinator.release(3))
+        self.assertFalse(coordinator.release(3))
+        self.assertEqual(coordinator.assign(7), 3)
+        self.assertEqual(coordinator.get_superframe_us(), 70000)
+
+    def test_beacon(self):
+        coordinator = self.coordinator
+        for address in range(1, 7):
+            coordinator.assign(address)
+        tdma = Nrf905Tdma()
+        first = tdma.unpack_beacon(coordinator.build_beacon())
+        second = tdma.unpack_beacon(coordinator.build_beacon())
+        self.assertEqual(first, (0xc0, 0, 10000, 6, [(1, 1), (2, 2), (3, 3), (4, 4)]))
+        # The next beacon carries on through the table.
+        self.assertEqual(second, (0xc0, 1, 10000, 6, [(5, 5), (6, 6), (1, 1), (2, 2)]))
+        self.assertIsNone(tdma.unpack_beacon(b"\x01\x02"))
+        self.assertIsNone(tdma.unpack_beacon(bytes(32)))
+
+    def test_drift(self):
+        """ The node measures the superframe length and predicts its slot
+        from it.
+        """
+        node = Nrf905TdmaNode(4, None, self.clock, frame_us=1000)
+        tdma = Nrf905Tdma()
+        self.assertIsNone(node.next_slot_tick(0))
+        # The coordinator's clock runs 100ppm fast compared with ours.
+        superframe_us = 70000 * 1.0001
+        start = 0xfffe0000
+        for superframe in range(40):
+            tick = (start + round(superframe * superframe_us) + 1000) % (1 << 32)
+            data = tdma.pack_beacon(0xc0, superframe, 10000, 6, [(4, 4)])
+            self.assertTrue(node.beacon_received(data, tick))
+        self.assertEqual(node.get_slot(), 4)
+        self.assertAlmostEqual(node.get_superframe_us(), superframe_us, delta=1)
+        self.assertLess(abs(node.get_sync_error_us()), 2)
+        # Ten superframes after the last beacon, the slot is still on time.
+        last = (start + round(39 * superframe_us)) % (1 << 32)
+        expected = (start + round(49 * superframe_us) + 40000) % (1 << 32)
+        tick = node.next_slot_tick((last + round(9 * superframe_us) + 50000) % (1 << 32))
+        self.assertLess(abs(self.clock.difference(expected, tick)), 2)
+        self.assertEqual(node.get_frames_per_slot(), 9)
+        self.assertFalse(node.beacon_received(b"\x01\x02\x03", 0))
+
+    def test_slot_lost(self):
+        node = Nrf905TdmaNode(4, None, self.clock, frame_us=1000)
+        tdma = Nrf905Tdma()
+        node.beacon_received(tdma.pack_beacon(0xc0, 0, 10000, 6, [(4, 2)]), 1000)
+        self.assertEqual(node.get_slot(), 2)
+        node.beacon_received(tdma.pack_beacon(0xc0, 1, 10000, 6, [(5, 2)]), 71000)
+        self.assertIsNone(node.get_slot())
+
+    def test_send_in_slot(self):
+        """ Frames are held until the node's slot. """
+        sent = []
+        beacon_ticks = []
+        node = None
+
+        def deliver(data):
+            beacon_ticks.append(self.clock.current_tick())
+            node.beacon_received(data, beacon_ticks[-1])
+
+        def transmit(data):
+            sent.append((data, self.clock.current_tick()))
+
+        coordinator = Nrf905TdmaCoordinator(0xc0, deliver, self.clock, slot_count=3, slot_us=10000)
+        coordinator.assign(9)
+        node = Nrf905TdmaNode(9, transmit, self.clock, frame_us=1)
+        node.start()
+        for index in range(3):
+            self.assertTrue(node.send(bytes([index])))
+        coordinator.start()
+        deadline = time.monotonic() + 2
+        while len(sent) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        coordinator.stop()
+        node.stop()
+        self.assertEqual([item[0] for item in sent], [b"\x00", b"\x01", b"\x02"])
+        self.assertEqual(node.get_stats()[:2], (3, 1))
+        # Slot 1 starts one slot after the beacon.
+        self.assertGreaterEqual(self.clock.difference(beacon_ticks[0], sent[0][1]), 10000 - 1)
+
+    def test_restart(self):
+        """ A node stopped while waiting for its slot sends after start(). """
+        sent = []
+        node = Nrf905TdmaNode(9, sent.append, self.clock, frame_us=1)
+        self.assertTrue(node.send(b"a"))
+        node.start()
+        time.sleep(0.01)
+        node.stop()
+        node.start()
+        tdma = Nrf905Tdma()
+        node.beacon_received(tdma.pack_beacon(0xc0, 0, 10000, 3, [(9, 1)]),
+                             self.clock.current_tick())
+        self.assertTrue(node.send(b"b"))
+        deadline = time.monotonic() + 2
+        while not sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        node.stop()
+        self.assertEqual(sent, [b"b"])
+
+    def test_arguments(self):
+        with self.assertRaises(ValueError):
+            Nrf905TdmaCoordinator(0, None, self.clock, slot_count=0, slot_us=1000)
+        with self.assertRaises(ValueError):
+            Nrf905TdmaCoordinator(0, None, self.clock, slot_count=4, slot_us=70000)
+        with self.assertRaises(ValueError):
+            Nrf905TdmaNode(0, None, self.clock, frame_us=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
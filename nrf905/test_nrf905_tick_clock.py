@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from nrf905.nrf905_tick_clock import Nrf905TickClock
+
+
+class FakePi:
+    """ Returns a fixed tick instead of asking the pigpio daemon. """
+
+    def __init__(self, tick):
+        self.tick = tick
+
+    def get_current_tick(self):
+        return self.tick
+
+
+class TestNrf905TickClock(unittest.TestCase):
+
+    def test_calibrate(self):
+        times = iter([1000.0, 1000.002])
+        clock = Nrf905TickClock(lambda: next(times))
+        self.assertFalse(clock.is_calibrated())
+        with self.assertRaises(ValueError):
+            clock.to_time(0)
+        clock.calibrate(FakePi(5000000))
+        # The tick is taken half way through the round trip.
+        self.assertAlmostEqual(clock.to_time(5000000), 1000.001)
+        self.assertAlmostEqual(clock.to_time(5250000), 1000.251)
+        self.assertAlmostEqual(clock.to_time(4000000), 999.001)
+
+    def test_wraparound(self):
+        clock = Nrf905TickClock()
+        clock.set_reference(0xffffff00, 2000.0)
+        # 0x100 microseconds after the reference, after the wrap.
+        self.assertAlmostEqual(clock.to_time(0x00000000), 2000.000256)
+        self.assertEqual(clock.difference(0xffffff00, 0x10), 0x110)
+        self.assertEqual(clock.difference(0x10, 0xffffff00), -0x110)
+        self.assertFalse(clock.needs_calibration(0x10))
+        self.assertTrue(clock.needs_calibration(0xffffff00 + 61000000 - (1 << 32)))
+
+    def test_current_tick(self):
+        now = [3000.0]
+        monotonic = [50.0]
+        clock = Nrf905TickClock(lambda: now[0], lambda: monotonic[0])
+        with self.assertRaises(ValueError):
+            clock.current_tick()
+        clock.set_reference(0xfffff000, 3000.0)
+        now[0] = 3000.008
+        monotonic[0] = 50.008
+        self.assertEqual(clock.current_tick(), 0x00000f40)
+        # A step in the wall clock does not move the tick.
+        now[0] = 4000.0
+        self.assertEqual(clock.current_tick(), 0x00000f40)
+
+    def test_extend(self):
+        clock = Nrf905TickClock()
+        self.assertEqual(clock.extend(0xfffffff0), 0xfffffff0)
+        self.assertEqual(clock.extend(0x10), (1 << 32) + 0x10)
+        self.assertEqual(clock.extend(0x20), (1 << 32) + 0x20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from nrf905.nrf905_gpio import Nrf905Gpio
+from nrf905.nrf905_timing import Nrf905Timing
+
+
+class FakeClock:
+    """ Tick source that only moves when told to. """
+
+    def __init__(self, tick):
+        self.tick = tick
+
+    def get_tick(self):
+        return self.tick
+
+
+class FakePi:
+    """ Accepts the pin calls Nrf905Gpio makes. """
+
+    def set_mode(self, gpio, mode):
+        pass
+
+    def write(self, gpio, level):
+        pass
+
+    def gpio_trigger(self, gpio, pulse_len, level):
+        pass
+
+
+class TestNrf905Timing(unittest.TestCase):
+
+    def test_remaining_us(self):
+        # Start just before the 32 bit wrap to check tickDiff is used.
+        clock = FakeClock(0xffffff00)
+        timing = Nrf905Timing(Nrf905Gpio.TRANSITIONS_US, clock.get_tick)
+        timing.entered(Nrf905Gpio.STANDBY)
+        self.assertEqual(timing.remaining_us(), 0)
+        timing.entered(Nrf905Gpio.SHOCKBURST_RX)
+        self.assertEqual(timing.remaining_us(), 650)
+        clock.tick = (clock.tick + 600) & 0xffffffff
+        self.assertEqual(timing.remaining_us(), 50)
+        # Entering the same mode again does not restart the settling time.
+        timing.entered(Nrf905Gpio.SHOCKBURST_RX)
+        self.assertEqual(timing.remaining_us(), 50)
+        clock.tick = (clock.tick + 50) & 0xffffffff
+        self.assertEqual(timing.remaining_us(), 0)
+
+    def test_no_wait_for_lower_modes(self):
+        timing = Nrf905Timing(Nrf905Gpio.TRANSITIONS_US)
+        timing.entered(Nrf905Gpio.POWER_DOWN)
+        timing.entered(Nrf905Gpio.STANDBY)
+        timing.entered(Nrf905Gpio.SHOCKBURST_RX)
+        # Dropping back to standby does not wait for RX to settle.
+        timing.prepare(Nrf905Gpio.STANDBY)
+        self.assertEqual(timing.get_wait_stats(), (0, 0))
+        timing.entered(Nrf905Gpio.STANDBY)
+        self.assertEqual(timing.remaining_us(), 0)
+
+    def test_wait_us(self):
+        timing = Nrf905Timing(Nrf905Gpio.TRANSITIONS_US)
+        start = timing.local_tick()
+        timing.wait_us(1500)
+        self.assertGreaterEqual((timing.local_tick() - start) & 0xffffffff, 1500)
+        self.assertEqual(timing.get_wait_stats(), (1, 1500))
+
+    def test_hold_us(self):
+        clock = FakeClock(1000)
+        timing = Nrf905Timing(Nrf905Gpio.TRANSITIONS_US, clock.get_tick)
+        timing.entered(Nrf905Gpio.STANDBY)
+        timing.entered(Nrf905Gpio.SHOCKBURST_TX)
+        # A packet on air holds the mode for longer than it takes to settle.
+        timing.hold_us(7000)
+        self.assertEqual(timing.remaining_us(), 7000)
+        clock.tick += 100
+        # A shorter hold does not cut the first one short.
+        timing.hold_us(10)
+        self.assertEqual(timing.remaining_us(), 6900)
+
+    def test_hold_before_any_mode(self):
+        """ A held mode is waited for even by changes that need no settling
+        time of their own, e.g. TX to standby.
+        """
+        timing = Nrf905Timing(Nrf905Gpio.TRANSITIONS_US)
+        timing.entered(Nrf905Gpio.STANDBY)
+        timing.entered(Nrf905Gpio.SHOCKBURST_TX)
+        timing.hold_us(2000)
+        start = timing.local_tick()
+        timing.prepare(Nrf905Gpio.STANDBY)
+        self.assertGreaterEqual((timing.local_tick() - start) & 0xffffffff, 1900)
+        timing.entered(Nrf905Gpio.STANDBY)
+        # Once the hold is over, dropping back does not wait again.
+        timing.entered(Nrf905Gpio.SHOCKBURST_RX)
+        count = timing.get_wait_stats()[0]
+        timing.prepare(Nrf905Gpio.STANDBY)
+        self.assertEqual(timing.get_wait_stats()[0], count)
+
+    def test_transmit_then_standby(self):
+        """ set_mode_standby() straight after start_transmit() waits for the
+        packet to leave.
+        """
+        pi = FakePi()
+        gpio = Nrf905Gpio(pi)
+        gpio.set_mode_standby(pi)
+        gpio.wait_settled()
+        gpio.start_transmit(pi, 2000)
+        start = gpio.get_timing().local_tick()
+        gpio.set_mode_standby(pi)
+        elapsed = (gpio.get_timing().local_tick() - start) & 0xffffffff
+        self.assertGreaterEqual(elapsed, Nrf905Gpio.STANDBY_TO_ACTIVE_US + 1900)
+        self.assertEqual(gpio.get_timing().remaining_us(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import time
+import unittest
+
+from nrf905.nrf905_io_thread import Nrf905IoThread
+from nrf905.nrf905_transmit_pipeline import Nrf905TransmitPipeline
+
+
+class FakeHardware:
+    """ Stands in for Nrf905Hardware.  Each frame is 'on air' for
+    airtime_s and frames are sent one at a time on an I/O thread.
+    """
+
+    def __init__(self, airtime_s):
+        self.airtime_s = airtime_s
+        self.io = Nrf905IoThread(None)
+        self.io.start()
+        self.sent = []
+        self.prepared_during_airtime = 0
+        self.on_air_until = 0.0
+
+    def prepare_transmit(self, data, address=None):
+        if time.monotonic() < self.on_air_until:
+            self.prepared_during_airtime += 1
+        return (address, bytes(data))
+
+    def transmit_prepared(self, frame):
+        return self.io.submit(self.__transmit, frame)
+
+    def __transmit(self, pi, frame):
+        delay = self.on_air_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.sent.append(frame)
+        self.on_air_until = time.monotonic() + self.airtime_s
+
+
+class TestNrf905TransmitPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.hardware = FakeHardware(0.005)
+        self.pipeline = Nrf905TransmitPipeline(self.hardware)
+        self.pipeline.start()
+
+    def tearDown(self):
+        self.pipeline.stop()
+        self.hardware.io.stop()
+
+    def test_fragment(self):
+        message = bytes(range(70))
+        self.pipeline.send(message, 0x1234)
+        self.pipeline.flush()
+        self.assertEqual(self.hardware.sent, [
+            (0x1234, message[0:32]), (0x1234, message[32:64]), (0x1234, message[64:])])
+        self.assertEqual(self.pipeline.get_stats()[:2], (1, 3))
+
+    def test_overlap(self):
+        """ Frames are prepared while the previous one is on air and sent
+        back to back.
+        """
+        start = time.monotonic()
+        for index in range(10):
+            self.pipeline.send(bytes([index]) * 32)
+        self.pipeline.flush()
+        elapsed = time.monotonic() - start
+        self.assertEqual(len(self.hardware.sent), 10)
+        self.assertGreater(self.hardware.prepared_during_airtime, 5)
+        # Ten frames take ten airtimes, less the last one, plus a little.
+        self.assertLess(elapsed, 10 * self.hardware.airtime_s + 0.05)
+        self.assertGreater(self.pipeline.get_stats()[2], 0)
+
+    def test_encode_function(self):
+        pipeline = Nrf905TransmitPipeline(
+            self.hardware, lambda message: [b"A" + message, b"B" + message])
+        pipeline.start()
+        pipeline.send(b"x")
+        pipeline.send(b"y", 7)
+        pipeline.flush()
+        pipeline.stop()
+        self.assertEqual(self.hardware.sent, [
+            (None, b"Ax"), (None, b"Bx"), (7, b"Ay"), (7, b"By")])
+
+    def test_encode_error(self):
+        def encode(message):
+            raise ValueError("too long")
+        pipeline = Nrf905TransmitPipeline(self.hardware, encode)
+        pipeline.start()
+        pipeline.send(b"x")
+        pipeline.flush()
+        pipeline.stop()
+        self.assertEqual(pipeline.get_stats(), (0, 0, 0, 1))
+
+    def test_arguments(self):
+        with self.assertRaises(ValueError):
+            Nrf905TransmitPipeline(self.hardware, depth=0)
+        with self.assertRaises(ValueError):
+            Nrf905TransmitPipeline(self.hardware, payload_width=33)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,4 +3,15 @@
 
 #DEBUG = -v
 
-python3 -m unittest ${DEBUG} nrf905.test_nrf905_gpio nrf905.test_nrf905_spi_nc
+python3 -m unittest ${DEBUG} nrf905.test_nrf905_gpio nrf905.test_nrf905_spi_nc \
+    nrf905.test_nrf905_hopper nrf905.test_nrf905_dispatcher \
+    nrf905.test_nrf905_executor nrf905.test_nrf905_timing \
+    nrf905.test_nrf905_codec nrf905.test_nrf905_fec \
+    nrf905.test_nrf905_capture nrf905.test_nrf905_gateway \
+    nrf905.test_nrf905_io_thread nrf905.test_nrf905_tick_clock \
+    nrf905.test_nrf905_transmit_pipeline nrf905.test_nrf905_dedup \
+    nrf905.test_nrf905_tdma nrf905.test_nrf905_frame \
+    nrf905.test_nrf905_replay nrf905.test_nrf905_relay \
+    nrf905.test_nrf905_profile nrf905.test_nrf905_survey \
+    nrf905.test_nrf905_duty_cycle nrf905.test_nrf905_hardware \
+    nrf905.test_nrf905_settings